@@ -90,7 +90,7 @@ on Wikipedia.</p>'''.replace('\n', ' ')
         if filetype == 'PEM':
             data = obj.pub
         elif filetype == 'DER':
-            data = obj.x509.public_bytes(encoding=Encoding.DER)
+            data = obj.dump_certificate(Encoding.DER)
         else:
             return HttpResponseBadRequest()
 
@@ -171,6 +171,10 @@ on Wikipedia.</p>'''.replace('\n', ' ')
         return self.output_extension(obj.crlDistributionPoints())
     cRLDistributionPoints.short_description = _('CRL Distribution Points')
 
+    def freshestCRL(self, obj):
+        return self.output_extension(obj.freshestCRL())
+    freshestCRL.short_description = _('Freshest CRL')
+
     def subjectAltName(self, obj):
         return self.output_extension(obj.subjectAltName())
     subjectAltName.short_description = _('subjectAltName')
@@ -214,7 +218,7 @@ class CertificateAuthorityAdmin(CertificateMixin, admin.ModelAdmin):
         }),
         (_('Details'), {
             'description': _('Information to add to newly signed certificates.'),
-            'fields': ['crl_url', 'issuer_url', 'ocsp_url', 'issuer_alt_name', ],
+            'fields': ['crl_url', 'delta_crl_url', 'issuer_url', 'ocsp_url', 'issuer_alt_name', ],
         }),
         (_('Certificate'), {
             'fields': ['serial', 'pub', 'expires'],
@@ -20,3 +20,9 @@ from django.utils.translation import ugettext_lazy as _
 class DjangoCAConfig(AppConfig):
     name = 'django_ca'
     verbose_name = _('Certificate Authority')
+
+    def ready(self):
+        # connect signal handlers
+        from . import crl  # NOQA
+        from . import ocsp  # NOQA
+        from . import publish  # NOQA
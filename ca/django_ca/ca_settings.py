@@ -16,6 +16,7 @@
 import os
 
 from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import ec
 
 from django.conf import settings
 from django.core.exceptions import ImproperlyConfigured
@@ -139,6 +140,28 @@ CA_DEFAULT_EXPIRES = getattr(settings, 'CA_DEFAULT_EXPIRES', 730)
 CA_DEFAULT_PROFILE = getattr(settings, 'CA_DEFAULT_PROFILE', 'webserver')
 CA_NOTIFICATION_DAYS = getattr(settings, 'CA_NOTIFICATION_DAYS', [14, 7, 3, 1, ])
 
+# CRLs generated in advance, the defaults match the views added by django_ca.urls
+CA_CRL_PROFILES = getattr(settings, 'CA_CRL_PROFILES', {
+    'user': {'encodings': ['DER'], 'algorithm': 'SHA512', 'expires': 600, 'base': True},
+    'user-delta': {'encodings': ['DER'], 'algorithm': 'SHA512', 'expires': 600, 'delta': True},
+    'ca': {'encodings': ['DER'], 'algorithm': 'SHA512', 'expires': 600, 'ca_crl': True},
+})
+
+# Publish CRLs, CA certificates and (optionally) OCSP responses to this directory
+CA_PUBLISH_DIR = getattr(settings, 'CA_PUBLISH_DIR', None)
+CA_PUBLISH_OCSP = getattr(settings, 'CA_PUBLISH_OCSP', False)
+
+# Keep index files for "openssl ocsp" up to date in this directory
+CA_OCSP_INDEX_DIR = getattr(settings, 'CA_OCSP_INDEX_DIR', None)
+
+# Cache private keys of certificate authorities per process
+CA_KEY_CACHE = getattr(settings, 'CA_KEY_CACHE', True)
+CA_KEY_CACHE_SIZE = getattr(settings, 'CA_KEY_CACHE_SIZE', 16)
+CA_KEY_CACHE_TIMEOUT = getattr(settings, 'CA_KEY_CACHE_TIMEOUT', 3600)
+
+# Directory with spare private keys generated in advance by "manage.py fill_key_pool"
+CA_KEY_POOL_DIR = getattr(settings, 'CA_KEY_POOL_DIR', None)
+
 # Undocumented options, e.g. to share values between different parts of code
 CA_MIN_KEY_SIZE = getattr(settings, 'CA_MIN_KEY_SIZE', 2048)
 CA_PROVIDE_GENERIC_CRL = getattr(settings, 'CA_PROVIDE_GENERIC_CRL', True)
@@ -148,3 +171,9 @@ try:
     CA_DIGEST_ALGORITHM = getattr(hashes, CA_DIGEST_ALGORITHM)()
 except AttributeError:
     raise ImproperlyConfigured('Unkown CA_DIGEST_ALGORITHM: %s' % settings.CA_DIGEST_ALGORITHM)
+
+CA_DEFAULT_ECC_CURVE = getattr(settings, 'CA_DEFAULT_ECC_CURVE', 'SECP256R1').strip().upper()
+try:
+    CA_DEFAULT_ECC_CURVE = getattr(ec, CA_DEFAULT_ECC_CURVE)()
+except AttributeError:
+    raise ImproperlyConfigured('Unkown CA_DEFAULT_ECC_CURVE: %s' % settings.CA_DEFAULT_ECC_CURVE)
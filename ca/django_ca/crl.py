@@ -13,30 +13,86 @@
 # You should have received a copy of the GNU General Public License along with django-ca.  If not,
 # see <http://www.gnu.org/licenses/>.
 
+import logging
+import time
 from datetime import datetime
 from datetime import timedelta
 
 from cryptography import x509
 from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.serialization import Encoding
 
+from django.core.cache import cache
+from django.dispatch import receiver
 from django.utils import timezone
 
+from django_ca import ca_settings
+from django_ca.keys import get_signature_algorithm
 from django_ca.models import Certificate
 from django_ca.models import CertificateAuthority
+from django_ca.signals import post_revoke_cert
 
+log = logging.getLogger(__name__)
 
-def get_crl(ca, encoding, expires, algorithm, password, ca_crl=False):
+
+def get_revoked_certificate(serial, revoked_date, revoked_reason=None):
+    """Get a revoked certificate entry for a CRL.
+
+    Parameters
+    ----------
+
+    serial : int
+        The serial of the revoked certificate.
+    revoked_date : datetime
+        When the certificate was revoked.
+    revoked_reason : str, optional
+        The name of a :py:class:`~cryptography:cryptography.x509.ReasonFlags` member.
+
+    Returns
+    -------
+
+    :py:class:`~cryptography:cryptography.x509.RevokedCertificate`
+    """
+    builder = x509.RevokedCertificateBuilder().serial_number(serial).revocation_date(revoked_date)
+
+    if revoked_reason:
+        reason_flag = getattr(x509.ReasonFlags, revoked_reason)
+        builder = builder.add_extension(x509.CRLReason(reason_flag), critical=False)
+
+    return builder.build(default_backend())
+
+
+def get_crl(ca, encoding, expires, algorithm, password, ca_crl=False, delta=False, base=False):
     """Function to generate a Certificate Revocation List (CRL).
 
-    All keyword arguments are passed as-is to :py:func:`OpenSSL.crypto.CRL.export`. Please see the
-    documentation of that function for details.
+    All parameters except ``encoding`` are passed to :py:func:`~django_ca.crl.build_crl`, please see
+    the documentation of that function for details.
 
     Parameters
     ----------
 
-    ca : :py:class:`~django_ca.models.CertificateAuthority`
     encoding : :py:class:`cryptography:cryptography.hazmat.primitives.serialization.Encoding`
         The encoding format for the CRL.
+
+    Returns
+    -------
+
+    bytes
+        The CRL in the requested format.
+    """
+    crl = build_crl(ca, expires=expires, algorithm=algorithm, password=password, ca_crl=ca_crl, delta=delta,
+                    base=base)
+    return crl.public_bytes(encoding)
+
+
+def build_crl(ca, expires, algorithm, password, ca_crl=False, delta=False, base=False):
+    """Function to build and sign a Certificate Revocation List (CRL).
+
+    Parameters
+    ----------
+
+    ca : :py:class:`~django_ca.models.CertificateAuthority`
     expires : int
         The time in seconds until a new CRL will be generated
     algorithm : :py:class:`cryptography:cryptography.hazmat.primitives import hashes`
@@ -46,27 +102,325 @@ def get_crl(ca, encoding, expires, algorithm, password, ca_crl=False):
         assumed to be unencrypted.
     ca_crl : boolean, optional
         If ``True``, add revoked child CAs instead of revoked certificates.
+    delta : boolean, optional
+        If ``True``, generate a delta CRL that only contains certificates revoked since the base CRL.
+        Delta CRLs are not supported for child CAs.
+    base : boolean, optional
+        If ``True``, the complete CRL becomes the base CRL that delta CRLs refer to. Only pass this for the
+        complete CRL that is actually published to clients (e.g. via the CRL distribution point of
+        certificates), otherwise delta CRLs refer to a CRL that clients cannot get.
 
     Returns
     -------
 
-    bytes
-        The CRL in the requested format.
+    :py:class:`~cryptography:cryptography.x509.CertificateRevocationList`
+        The signed CRL.
     """
+    if delta is True:
+        if ca_crl is True:
+            raise ValueError('Delta CRLs are not supported for child CAs.')
+        if base is True:
+            raise ValueError('A delta CRL cannot be a base CRL.')
+        if ca.base_crl_number is None:
+            raise ValueError('%s: No base CRL was issued yet.' % ca.name)
+    elif base is True and ca_crl is True:
+        raise ValueError('Delta CRLs are not supported for child CAs.')
+
     now = datetime.utcnow()
-    builder = x509.CertificateRevocationListBuilder()
+    issued = timezone.now()
+    number = ca.get_next_crl_number()
+
+    if ca_crl is True:
+        qs = CertificateAuthority.objects.filter(parent=ca, expires__gt=issued)
+    else:
+        qs = Certificate.objects.filter(ca=ca, expires__gt=issued)
+
+    if delta is True:
+        qs = qs.filter(revoked_date__gte=ca.base_crl_date)
+
+    # Build entries directly from the database columns, so that no certificate has to be parsed. Entries are
+    # passed to the constructor at once, as adding them one by one copies the list every time.
+    qs = qs.revoked().values_list('serial_hex', 'revoked_date', 'revoked_reason')
+    revoked = [get_revoked_certificate(int(serial, 16), revoked_date, revoked_reason)
+               for serial, revoked_date, revoked_reason in qs.iterator()]
+
+    builder = x509.CertificateRevocationListBuilder(revoked_certificates=revoked)
     builder = builder.issuer_name(ca.x509.subject)
     builder = builder.last_update(now)
     builder = builder.next_update(now + timedelta(seconds=expires))
+    builder = builder.add_extension(x509.CRLNumber(number), critical=False)
+
+    if delta is True:
+        builder = builder.add_extension(x509.DeltaCRLIndicator(ca.base_crl_number), critical=True)
+
+    private_key = ca.key(password)
+    crl = builder.sign(private_key=private_key, algorithm=get_signature_algorithm(private_key, algorithm),
+                       backend=default_backend())
+
+    # Delta CRLs list all revocations since the base CRL
+    if base is True:
+        CertificateAuthority.objects.filter(pk=ca.pk).update(base_crl_number=number, base_crl_date=issued)
+        ca.base_crl_number = number
+        ca.base_crl_date = issued
+
+    return crl
 
+
+def get_crl_cache_key(serial, encoding, algorithm, ca_crl=False, delta=False):
+    """Get the cache key used for caching a CRL.
+
+    Parameters
+    ----------
+
+    serial : str
+        The serial of the CA.
+    encoding : :py:class:`cryptography:cryptography.hazmat.primitives.serialization.Encoding`
+    algorithm : :py:class:`cryptography:cryptography.hazmat.primitives.hashes.HashAlgorithm`
+    ca_crl : boolean, optional
+    delta : boolean, optional
+    """
+    cache_key = 'crl_%s_%s_%s' % (serial, encoding, algorithm.name)
     if ca_crl is True:
-        qs = CertificateAuthority.objects.filter(parent=ca, expires__gt=timezone.now())
+        cache_key += '_ca'
+    if delta is True:
+        cache_key += '_delta'
+    return cache_key
+
+
+def set_cached_crl(cache_key, crl, expires, lock_timeout=10):
+    """Store a CRL in the cache.
+
+    The CRL is stored twice: Under ``cache_key`` until shortly before it expires, so that it is regenerated
+    in time, and under a secondary key until it actually expires. The secondary copy is served while another
+    process regenerates the CRL, see :py:func:`~django_ca.crl.get_cached_crl`.
+
+    Parameters
+    ----------
+
+    cache_key : str
+    crl : bytes
+        The encoded CRL.
+    expires : int
+        Seconds until the CRL expires.
+    lock_timeout : int, optional
+        Seconds before expiry that the CRL should be regenerated.
+    """
+    timeout = expires
+    if expires > lock_timeout * 2:
+        timeout = expires - lock_timeout
+
+    cache.set(cache_key, crl, timeout)
+    cache.set('%s_stale' % cache_key, crl, expires)
+
+
+def get_cached_crl(cache_key, generate, expires, lock_timeout=10):
+    """Get a CRL from the cache and make sure that only one process regenerates it if it is not found.
+
+    If the CRL is not found in the cache, a lock is acquired (using ``cache.add()``) and ``generate`` is
+    called to generate a new CRL. Concurrent callers that cannot acquire the lock get the previous CRL if it
+    is still valid. If there is none, they wait up to ``lock_timeout`` seconds for the CRL to be generated
+    before generating it themselves.
+
+    Parameters
+    ----------
+
+    cache_key : str
+    generate : callable
+        Function called without arguments that returns the encoded CRL.
+    expires : int
+        Seconds until the generated CRL expires.
+    lock_timeout : int, optional
+        Maximum time in seconds to wait for another process to generate the CRL.
+
+    Returns
+    -------
+
+    bytes
+        The encoded CRL.
+    """
+    crl = cache.get(cache_key)
+    if crl is not None:
+        return crl
+
+    lock_key = '%s_lock' % cache_key
+    if cache.add(lock_key, True, lock_timeout):
+        try:
+            crl = generate()
+            set_cached_crl(cache_key, crl, expires, lock_timeout=lock_timeout)
+        finally:
+            cache.delete(lock_key)
+        return crl
+
+    # Another process is generating the CRL, use the previous one if it is still valid
+    crl = cache.get('%s_stale' % cache_key)
+    if crl is not None:
+        return crl
+
+    deadline = time.time() + lock_timeout
+    while time.time() < deadline:
+        time.sleep(0.05)
+        crl = cache.get(cache_key)
+        if crl is not None:
+            return crl
+
+    log.warning('%s: Timeout waiting for CRL to be generated.', cache_key)
+    crl = generate()
+    set_cached_crl(cache_key, crl, expires, lock_timeout=lock_timeout)
+    return crl
+
+
+def get_crl_profiles(ca_crl=None):
+    """Get the CRL profiles configured in the ``CA_CRL_PROFILES`` setting.
+
+    Complete CRLs are returned before delta CRLs, as delta CRLs refer to the last complete CRL.
+
+    Parameters
+    ----------
+
+    ca_crl : boolean, optional
+        If given, only return profiles for CRLs of child CAs (``True``) or certificates (``False``).
+
+    Returns
+    -------
+
+    list of (str, dict)
+        Profile names and normalized profiles. ``algorithm`` is an instance of
+        :py:class:`~cryptography:cryptography.hazmat.primitives.hashes.HashAlgorithm` and ``encodings``
+        is a list of :py:class:`~cryptography:cryptography.hazmat.primitives.serialization.Encoding`.
+    """
+    profiles = []
+    for name, profile in sorted(ca_settings.CA_CRL_PROFILES.items()):
+        profile = {
+            'encodings': [Encoding[e] for e in profile.get('encodings', ['DER'])],
+            'algorithm': getattr(hashes, profile.get('algorithm', 'SHA512').upper())(),
+            'expires': profile.get('expires', 600),
+            'ca_crl': profile.get('ca_crl', False),
+            'delta': profile.get('delta', False),
+            'base': profile.get('base', False),
+        }
+
+        if ca_crl is None or profile['ca_crl'] == ca_crl:
+            profiles.append((name, profile))
+
+    return sorted(profiles, key=lambda p: p[1]['delta'])
+
+
+def build_crls(ca, password=None, profiles=None):
+    """Build and sign CRLs of the given CA for the given profiles.
+
+    Delta CRLs are skipped for CRLs of child CAs and if no base CRL was issued yet.
+
+    Parameters
+    ----------
+
+    ca : :py:class:`~django_ca.models.CertificateAuthority`
+    password : bytes, optional
+        Password used to load the private key of the certificate authority.
+    profiles : list of (str, dict), optional
+        The profiles as returned by :py:func:`~django_ca.crl.get_crl_profiles`. By default, all configured
+        profiles are used.
+
+    Returns
+    -------
+
+    list of (dict, :py:class:`~cryptography:cryptography.x509.CertificateRevocationList`)
+        The profile and the signed CRL for every generated CRL.
+    """
+    if profiles is None:
+        profiles = get_crl_profiles()
+
+    crls = []
+    for name, profile in profiles:
+        # Delta CRLs are not supported for child CAs and require a base CRL to refer to
+        if profile['delta'] is True and (profile['ca_crl'] is True or ca.base_crl_number is None):
+            continue
+
+        crl = build_crl(ca, expires=profile['expires'], algorithm=profile['algorithm'], password=password,
+                        ca_crl=profile['ca_crl'], delta=profile['delta'], base=profile['base'])
+        crls.append((profile, crl))
+    return crls
+
+
+def cache_crls(ca, password=None, profiles=None, crls=None):
+    """Generate CRLs for the given CA and store them in the cache.
+
+    CRLs are stored under the same cache keys used by
+    :py:class:`~django_ca.views.CertificateRevocationListView`, so the view serves them without having to
+    generate them first.
+
+    Parameters
+    ----------
+
+    ca : :py:class:`~django_ca.models.CertificateAuthority`
+    password : bytes, optional
+        Password used to load the private key of the certificate authority.
+    profiles : list of (str, dict), optional
+        The profiles as returned by :py:func:`~django_ca.crl.get_crl_profiles`. By default, all configured
+        profiles are used.
+    crls : list, optional
+        CRLs as returned by :py:func:`~django_ca.crl.build_crls`. If passed, these CRLs are stored instead of
+        generating new ones.
+
+    Returns
+    -------
+
+    int
+        The number of CRLs stored in the cache.
+    """
+    if crls is None:
+        crls = build_crls(ca, password=password, profiles=profiles)
+
+    count = 0
+    for profile, crl in crls:
+        for encoding in profile['encodings']:
+            cache_key = get_crl_cache_key(ca.serial, encoding, profile['algorithm'],
+                                          ca_crl=profile['ca_crl'], delta=profile['delta'])
+            set_cached_crl(cache_key, crl.public_bytes(encoding), profile['expires'])
+            count += 1
+
+    return count
+
+
+@receiver(post_revoke_cert)
+def _refresh_crls(sender, cert, **kwargs):
+    """Refresh the cached (and published) CRLs that list the revoked certificate or child CA.
+
+    Every CRL is built only once and then both stored in the cache and (if ``CA_PUBLISH_DIR`` is set)
+    written to the filesystem, so that cached and published CRLs have the same CRL numbers.
+    """
+
+    if sender == Certificate:
+        ca_id = cert.ca_id
+        profiles = get_crl_profiles(ca_crl=False)
     else:
-        qs = CertificateAuthority.objects.filter(parent=ca, expires__gt=timezone.now())
-        qs = Certificate.objects.filter(ca=ca, expires__gt=timezone.now())
+        ca_id = cert.parent_id
+        profiles = get_crl_profiles(ca_crl=True)
 
-    for cert in qs.revoked():
-        builder = builder.add_revoked_certificate(cert.get_revocation())
+    if ca_id is None or not profiles:
+        return
 
-    crl = builder.sign(private_key=ca.key(password), algorithm=algorithm, backend=default_backend())
-    return crl.public_bytes(encoding)
+    # load the CA from the database so that we have the current CRL numbers
+    ca = CertificateAuthority.objects.get(pk=ca_id)
+
+    # We do not know the password of encrypted keys here. Loading an encrypted key without a password fails
+    # right away, while an unencrypted key is kept by the instance and used for signing below.
+    try:
+        ca.key(None)
+    except TypeError:
+        log.warning('%s: Private key is encrypted, CRLs are not refreshed. Use regenerate_crls to '
+                    'refresh them.', ca.serial)
+        return
+
+    # Refresh delta CRLs first, so that they still refer to the base CRL that clients already have.
+    profiles = sorted(profiles, key=lambda p: not p[1]['delta'])
+
+    try:
+        crls = build_crls(ca, profiles=profiles)
+        cache_crls(ca, crls=crls)
+
+        if ca_settings.CA_PUBLISH_DIR:
+            # imported here because django_ca.publish imports this module
+            from .publish import publish_crls
+            publish_crls(ca, ca_settings.CA_PUBLISH_DIR, crls=crls)
+    except Exception as e:
+        log.exception('%s: Could not refresh CRLs: %s', ca.serial, e)
@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of django-ca (https://github.com/mathiasertl/django-ca).
+#
+# django-ca is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# django-ca is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with django-ca.  If not,
+# see <http://www.gnu.org/licenses/>.
+
+"""Functions to generate private keys for certificate authorities.
+
+Generating large RSA or DSA keys may take a long time, so keys can be generated in a worker process and
+they can be generated in advance and stored in a pool of spare keys (see the ``CA_KEY_POOL_DIR``
+setting).
+"""
+
+import os
+import time
+import uuid
+from distutils.version import LooseVersion
+from multiprocessing import Pool
+
+import cryptography
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives.asymmetric import dsa
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.hazmat.primitives.serialization import Encoding
+from cryptography.hazmat.primitives.serialization import NoEncryption
+from cryptography.hazmat.primitives.serialization import PrivateFormat
+from cryptography.hazmat.primitives.serialization import load_pem_private_key
+
+from . import ca_settings
+from .utils import write_file
+
+try:
+    from cryptography.hazmat.primitives.asymmetric import ed25519
+except ImportError:  # pragma: no cover - cryptography<2.6
+    ed25519 = None
+
+# cryptography 2.6 and 2.7 already know Ed25519 keys, but cannot sign certificates with them
+if LooseVersion(cryptography.__version__) < LooseVersion('2.8'):  # pragma: no cover
+    ed25519 = None
+
+#: Supported key types. Ed25519 requires cryptography>=2.8.
+KEY_TYPES = ['RSA', 'DSA', 'ECC']
+if ed25519 is not None:  # pragma: no branch
+    KEY_TYPES.append('Ed25519')
+
+
+def generate_private_key(key_size, key_type, ecc_curve=None):
+    """Generate a private key.
+
+    Parameters
+    ----------
+
+    key_size : int
+        Size of the key in bits, ignored for ECC and Ed25519 keys.
+    key_type : str
+        One of ``"RSA"``, ``"DSA"``, ``"ECC"`` or ``"Ed25519"``.
+    ecc_curve : :py:class:`~cryptography:cryptography.hazmat.primitives.asymmetric.ec.EllipticCurve`, optional
+        The curve for ECC keys, the default is the ``CA_DEFAULT_ECC_CURVE`` setting.
+    """
+    if key_type == 'DSA':
+        return dsa.generate_private_key(key_size=key_size, backend=default_backend())
+    elif key_type == 'ECC':
+        if ecc_curve is None:
+            ecc_curve = ca_settings.CA_DEFAULT_ECC_CURVE
+        return ec.generate_private_key(ecc_curve, default_backend())
+    elif key_type == 'Ed25519':
+        if ed25519 is None:  # pragma: no cover
+            raise ValueError('Ed25519 keys require cryptography>=2.8.')
+        return ed25519.Ed25519PrivateKey.generate()
+    return rsa.generate_private_key(public_exponent=65537, key_size=key_size, backend=default_backend())
+
+
+def get_signature_algorithm(private_key, algorithm):
+    """Get the hash algorithm to pass when signing with ``private_key``.
+
+    Ed25519 keys do not use a separate hash algorithm, so ``None`` is returned for them.
+    """
+    if ed25519 is not None and isinstance(private_key, ed25519.Ed25519PrivateKey):
+        return None
+    return algorithm
+
+
+def get_private_format(private_key):
+    """Get the format to store ``private_key`` in.
+
+    Ed25519 keys can only be stored as PKCS8, other keys are stored in the traditional OpenSSL format.
+    """
+    if ed25519 is not None and isinstance(private_key, ed25519.Ed25519PrivateKey):
+        return PrivateFormat.PKCS8
+    return PrivateFormat.TraditionalOpenSSL
+
+
+def _dump_private_key(key):
+    return key.private_bytes(encoding=Encoding.PEM, format=PrivateFormat.PKCS8,
+                             encryption_algorithm=NoEncryption())
+
+
+def _load_private_key(pem):
+    return load_pem_private_key(pem, None, default_backend())
+
+
+def _generate_private_key_pem(args):
+    # called in worker processes, private keys cannot be pickled
+    return _dump_private_key(generate_private_key(*args))
+
+
+def generate_private_key_in_process(key_size, key_type, ecc_curve=None, timeout=None, progress=None,
+                                    interval=1):
+    """Generate a private key in a worker process.
+
+    The calling process only waits for the worker process, so it can report progress or abort key generation
+    after a timeout.
+
+    Parameters
+    ----------
+
+    key_size : int
+        Size of the key in bits.
+    key_type : str
+        One of ``"RSA"``, ``"DSA"``, ``"ECC"`` or ``"Ed25519"``.
+    ecc_curve : :py:class:`~cryptography:cryptography.hazmat.primitives.asymmetric.ec.EllipticCurve`, optional
+        The curve for ECC keys.
+    timeout : int, optional
+        Raise ``RuntimeError`` if the key is not generated within ``timeout`` seconds.
+    progress : function, optional
+        Called every ``interval`` seconds with the number of seconds elapsed so far.
+    interval : int, optional
+        How often to call ``progress``.
+    """
+    pool = Pool(1)
+    try:
+        result = pool.apply_async(_generate_private_key_pem, ((key_size, key_type, ecc_curve), ))
+        start = time.time()
+        elapsed = 0
+
+        while True:
+            wait = interval
+            if timeout is not None:
+                wait = max(min(interval, timeout - elapsed), 0)
+            result.wait(wait)
+            elapsed = time.time() - start
+
+            if result.ready():
+                break
+            elif timeout is not None and elapsed >= timeout:
+                raise RuntimeError('Private key was not generated within %s seconds.' % timeout)
+            elif progress is not None:
+                progress(elapsed)
+
+        pem = result.get()
+    finally:
+        pool.terminate()
+
+    return _load_private_key(pem)
+
+
+def get_key_pool_path(key_size, key_type, path=None):
+    """Get the directory where spare keys of the given size and type are stored.
+
+    ``path`` is the directory of the pool, the default is the ``CA_KEY_POOL_DIR`` setting.
+    """
+    if path is None:
+        path = ca_settings.CA_KEY_POOL_DIR
+    return os.path.join(path, '%s-%s' % (key_type.lower(), key_size))
+
+
+def count_pooled_keys(key_size, key_type, path=None):
+    """Get the number of spare keys of the given size and type."""
+
+    path = get_key_pool_path(key_size, key_type, path=path)
+    if not os.path.exists(path):
+        return 0
+    return len([f for f in os.listdir(path) if f.endswith('.pem')])
+
+
+def add_pooled_key(key_size, key_type, pem, path=None):
+    """Add a key (as unencrypted PEM) to the pool of spare keys."""
+
+    path = os.path.join(get_key_pool_path(key_size, key_type, path=path), '%s.pem' % uuid.uuid4().hex)
+    write_file(path, pem, mode=0o600)
+    return path
+
+
+def fill_key_pool(key_size, key_type, count, processes=None, path=None):
+    """Generate keys in ``processes`` worker processes until ``count`` spare keys are available.
+
+    Returns the number of keys generated.
+    """
+    missing = count - count_pooled_keys(key_size, key_type, path=path)
+    if missing <= 0:
+        return 0
+
+    pool = Pool(min(processes or missing, missing))
+    try:
+        for pem in pool.imap_unordered(_generate_private_key_pem, [(key_size, key_type)] * missing):
+            add_pooled_key(key_size, key_type, pem, path=path)
+    finally:
+        pool.terminate()
+
+    return missing
+
+
+def get_pooled_key(key_size, key_type, path=None):
+    """Get a key from the pool of spare keys.
+
+    The key is removed from the pool, so it is used only once even if several processes take keys from the
+    same pool. Returns ``None`` if no key of the given type and size is available.
+    """
+    path = get_key_pool_path(key_size, key_type, path=path)
+    if not os.path.exists(path):
+        return None
+
+    for filename in sorted(os.listdir(path)):
+        if not filename.endswith('.pem'):
+            continue
+
+        # Rename the file first, so that no other process can use the same key
+        claimed = os.path.join(path, '%s.%s' % (filename, uuid.uuid4().hex))
+        try:
+            os.rename(os.path.join(path, filename), claimed)
+        except OSError:  # another process was faster
+            continue
+
+        try:
+            with open(claimed, 'rb') as stream:
+                return _load_private_key(stream.read())
+        finally:
+            os.remove(claimed)
+
+    return None
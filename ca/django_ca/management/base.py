@@ -22,10 +22,12 @@ from datetime import datetime
 from datetime import timedelta
 
 from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import ec
 from cryptography.hazmat.primitives.serialization import Encoding
 
 from django.conf import settings
 from django.core.management.base import BaseCommand as _BaseCommand
+from django.core.management.base import CommandError
 from django.core.management.base import OutputWrapper
 from django.core.management.color import no_style
 from django.core.validators import URLValidator
@@ -74,6 +76,15 @@ class AlgorithmAction(argparse.Action):
         setattr(namespace, self.dest, value)
 
 
+class KeyCurveAction(argparse.Action):
+    def __call__(self, parser, namespace, value, option_string=None):
+        curve = getattr(ec, value.upper().strip(), None)
+        if not isinstance(curve, type) or not issubclass(curve, ec.EllipticCurve):
+            parser.error('Unknown elliptic curve: %s' % value)
+
+        setattr(namespace, self.dest, curve())
+
+
 class KeySizeAction(argparse.Action):
     def __call__(self, parser, namespace, value, option_string=None):
         option_string = option_string or 'key size'
@@ -189,6 +200,22 @@ class ExpiresAction(argparse.Action):
         setattr(namespace, self.dest, self._get_delta(value))
 
 
+class DateAction(argparse.Action):
+    """Parse a date in the format ``YYYY-MM-DD``."""
+
+    def __call__(self, parser, namespace, value, option_string=None):
+        try:
+            value = datetime.strptime(value, '%Y-%m-%d')
+        except ValueError:
+            raise parser.error('%s: Date must be in the format YYYY-MM-DD.' % value)
+
+        # If USE_TZ is True, we make the object timezone aware, otherwise comparing goes wrong.
+        if settings.USE_TZ:
+            value = timezone.make_aware(value)
+
+        setattr(namespace, self.dest, value)
+
+
 class MultipleURLAction(argparse.Action):
     def __call__(self, parser, namespace, value, option_string=None):
         validator = URLValidator()
@@ -219,6 +246,9 @@ class BinaryOutputWrapper(OutputWrapper):
 class BaseCommand(_BaseCommand):
     binary_output = False
 
+    chunk_size = 1000
+    """Number of lines written at once by :py:meth:`write_chunked`."""
+
     # TODO/Django1.9: Only necessary in Django 1.8
     requires_system_checks = True
 
@@ -286,6 +316,44 @@ class BaseCommand(_BaseCommand):
             help = 'Password used for accessing the private key of the CA.'
         parser.add_argument('-p', '--password', nargs='?', action=PasswordAction, help=help)
 
+    def get_cas(self, identifiers):
+        """Get the certificate authorities named by ``identifiers`` (serials or common names).
+
+        If no identifiers are given, all enabled CAs that are neither expired nor revoked are returned.
+        """
+        if not identifiers:
+            return CertificateAuthority.objects.enabled().filter(expires__gt=timezone.now(), revoked=False)
+
+        cas = []
+        for identifier in identifiers:
+            try:
+                cas.append(CertificateAuthority.objects.get_by_serial_or_cn(identifier))
+            except CertificateAuthority.DoesNotExist:
+                raise CommandError('%s: Certificate authority not found.' % identifier)
+            except CertificateAuthority.MultipleObjectsReturned:
+                raise CommandError('%s: Multiple Certificate authorities match.' % identifier)
+        return cas
+
+    def write_chunked(self, lines, write=None):
+        """Write ``lines`` in chunks of :py:attr:`chunk_size` lines.
+
+        Writing every line on its own is slow for large outputs. ``write`` receives the joined lines of every
+        chunk, the default is to write to stdout.
+        """
+        if write is None:
+            def write(data):
+                self.stdout.write(data, ending='')
+
+        chunk = []
+        for line in lines:
+            chunk.append(line)
+            if len(chunk) >= self.chunk_size:
+                write(''.join(chunk))
+                chunk = []
+
+        if chunk:
+            write(''.join(chunk))
+
     def indent(self, s, prefix='    '):
         if isinstance(s, list):
             return ''.join(['%s* %s\n' % (prefix, l) for l in s])
@@ -340,6 +408,10 @@ class CertificateAuthorityDetailMixin(object):
             '--crl-url', metavar='URL', action=MultipleURLAction, default=[],
             help='URL to a certificate revokation list. Can be given multiple times.'
         )
+        group.add_argument(
+            '--delta-crl-url', metavar='URL', action=MultipleURLAction,
+            help='URL to a delta certificate revokation list. Can be given multiple times.'
+        )
         group.add_argument(
             '--ocsp-url', metavar='URL', action=URLAction,
             help='URL of an OCSP responder.'
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of django-ca (https://github.com/mathiasertl/django-ca).
+#
+# django-ca is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# django-ca is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with django-ca.  If not,
+# see <http://www.gnu.org/licenses/>.
+
+from django.db import transaction
+
+from django_ca.management.base import BaseCommand
+from django_ca.models import Certificate
+from django_ca.models import CertificateAuthority
+
+# fields set by the x509 property that where added after certificates where already stored
+METADATA_FIELDS = [
+    'valid_from', 'distinguished_name', 'subject_alt_names', 'key_type', 'key_size', 'fingerprint_sha256',
+    'subject_key_identifier', 'authority_key_identifier',
+]
+
+
+class Command(BaseCommand):
+    help = """Store values of certificates (e.g. the distinguished name or fingerprint) in the database for
+all certificates and certificate authorities that where added by an older version of django-ca, so that these
+values can be displayed without parsing the certificate."""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000, metavar='N',
+            help='Update at most N rows per transaction (default: %(default)s).')
+
+    def handle(self, batch_size, **options):
+        for model in [CertificateAuthority, Certificate]:
+            # rows are updated in batches, so the query only returns rows not updated in earlier batches
+            qs = model.objects.filter(fingerprint_sha256='').order_by('pk')
+            count = 0
+
+            while True:
+                with transaction.atomic():
+                    objs = list(qs[:batch_size])
+                    for obj in objs:
+                        obj.x509 = obj.x509
+                        obj.save(update_fields=METADATA_FIELDS)
+
+                if not objs:
+                    break
+                count += len(objs)
+
+            if options['verbosity'] >= 2:
+                self.stdout.write('%s: Updated %s rows.' % (model._meta.verbose_name_plural, count))
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of django-ca (https://github.com/mathiasertl/django-ca).
+#
+# django-ca is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# django-ca is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with django-ca.  If not,
+# see <http://www.gnu.org/licenses/>.
+
+from django.db.models import F
+from django.db.models import Func
+from django.db.models import Value
+
+from django_ca.management.base import BaseCommand
+from django_ca.models import Certificate
+from django_ca.models import CertificateAuthority
+
+
+class Command(BaseCommand):
+    help = """Set the normalized serial (used for fast lookups) for all certificates and certificate
+authorities that do not have one yet, e.g. because they where added by an older version of django-ca while the
+database was migrated."""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000, metavar='N',
+            help='Update at most N rows per query (default: %(default)s).')
+
+    def handle(self, batch_size, **options):
+        serial_hex = Func(F('serial'), Value(':'), Value(''), function='REPLACE')
+
+        for model in [CertificateAuthority, Certificate]:
+            qs = model.objects.filter(serial_hex='')
+            count = 0
+
+            while True:
+                pks = list(qs.values_list('pk', flat=True)[:batch_size])
+                if not pks:
+                    break
+                count += model.objects.filter(pk__in=pks).update(serial_hex=serial_hex)
+
+            if options['verbosity'] >= 2:
+                self.stdout.write('%s: Updated %s rows.' % (model._meta.verbose_name_plural, count))
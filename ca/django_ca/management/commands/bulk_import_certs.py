@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of django-ca (https://github.com/mathiasertl/django-ca).
+#
+# django-ca is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# django-ca is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with django-ca.  If not,
+# see <http://www.gnu.org/licenses/>.
+
+import itertools
+import os
+import re
+import tarfile
+from multiprocessing import Pool
+from multiprocessing import cpu_count
+
+from cryptography import x509
+from cryptography.hazmat.backends import default_backend
+
+from django.core.management.base import CommandError
+from django.db import transaction
+
+from django_ca.management.base import BaseCommand
+from django_ca.models import Certificate
+from django_ca.models import CertificateAuthority
+from django_ca.utils import format_name
+from django_ca.utils import write_file
+
+PEM_REGEX = re.compile(b'-----BEGIN CERTIFICATE-----.*?-----END CERTIFICATE-----', re.DOTALL)
+
+# fields not set by the x509 property
+EXCLUDED_FIELDS = ('id', 'ca_id', 'created')
+
+
+def split_certificates(name, data):
+    """Split a PEM bundle into single certificates, data without any PEM certificate is assumed to be DER."""
+
+    matches = PEM_REGEX.findall(data)
+    if not matches:
+        yield name, data
+    elif len(matches) == 1:
+        yield name, matches[0]
+    else:
+        for i, match in enumerate(matches):
+            yield '%s[%s]' % (name, i), match
+
+
+def iter_certificates(path):
+    """Yield ``(name, data)`` for every certificate found in a directory, tarball or file."""
+
+    if os.path.isdir(path):
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for filename in sorted(files):
+                filename = os.path.join(root, filename)
+                with open(filename, 'rb') as stream:
+                    for item in split_certificates(filename, stream.read()):
+                        yield item
+    elif tarfile.is_tarfile(path):
+        # "r|*" reads the tarball as a stream, so it does not have to be loaded at once
+        with tarfile.open(path, 'r|*') as tar:
+            for member in tar:
+                if not member.isfile():
+                    continue
+                for item in split_certificates(member.name, tar.extractfile(member).read()):
+                    yield item
+    else:
+        with open(path, 'rb') as stream:
+            for item in split_certificates(path, stream.read()):
+                yield item
+
+
+def parse_certificate(item):
+    """Parse a certificate, called in worker processes.
+
+    Returns the name of the item, a dictionary of field values (or ``None`` if the certificate could not be
+    parsed) and the distinguished name of the issuer.
+    """
+    name, data = item
+    backend = default_backend()
+    try:
+        if data.startswith(b'-----BEGIN'):
+            parsed = x509.load_pem_x509_certificate(data, backend)
+        else:
+            parsed = x509.load_der_x509_certificate(data, backend)
+
+        cert = Certificate()
+        cert.x509 = parsed
+        issuer = format_name(parsed.issuer)
+    except Exception:
+        return name, None, None
+
+    values = {f.attname: getattr(cert, f.attname) for f in Certificate._meta.concrete_fields
+              if f.attname not in EXCLUDED_FIELDS}
+    return name, values, issuer
+
+
+class Command(BaseCommand):
+    help = """Import many existing certificates at once.
+
+Certificates are read from a directory, a tarball or a single file, each file may contain any number of PEM
+encoded certificates or a single DER encoded certificate. The authorities that signed the certificates must
+exist in the database. Certificates that already exist in the database are skipped."""
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Directory, tarball or file to import certificates from.')
+        self.add_ca(parser, no_default=True, allow_disabled=True,
+                    help='Authority that signed all certificates (default: detected for every certificate).')
+        parser.add_argument(
+            '--batch-size', type=int, default=1000, metavar='N',
+            help='Insert N certificates per transaction (default: %(default)s).')
+        parser.add_argument(
+            '--processes', type=int, default=cpu_count(), metavar='N',
+            help='Parse certificates in N processes (default: %(default)s).')
+        parser.add_argument(
+            '--checkpoint', metavar='FILE',
+            help='Record progress in FILE. If the file exists, continue after the last imported batch.')
+
+    def get_authorities(self):
+        by_key_id = {}
+        by_name = {}
+        for ca in CertificateAuthority.objects.all():
+            key_id = ca.subject_key_identifier
+            if not key_id:  # not yet backfilled
+                ski = ca.subjectKeyIdentifier()
+                key_id = ski[1] if ski else ''
+
+            if key_id:
+                by_key_id[key_id] = ca
+            by_name[ca.distinguishedName()] = ca
+        return by_key_id, by_name
+
+    def insert(self, batch, ca):
+        """Insert a batch of parsed certificates, returns the number of certificates inserted."""
+
+        certs = {}
+        for name, values, issuer in batch:
+            if values is None:
+                self.stderr.write('%s: Unable to load certificate.' % name)
+                continue
+
+            issuing_ca = ca
+            if issuing_ca is None:
+                issuing_ca = self.by_key_id.get(values['authority_key_identifier'], self.by_name.get(issuer))
+            if issuing_ca is None:
+                self.stderr.write('%s: Issuing certificate authority not found.' % name)
+                continue
+
+            # a certificate may be included more than once
+            certs[values['serial_hex']] = Certificate(ca=issuing_ca, **values)
+
+        with transaction.atomic():
+            existing = Certificate.objects.filter(serial_hex__in=certs.keys())
+            for serial in existing.values_list('serial_hex', flat=True):
+                del certs[serial]
+            Certificate.objects.bulk_create(certs.values())
+
+        return len(certs)
+
+    def handle(self, path, ca, batch_size, processes, checkpoint, **options):
+        if not os.path.exists(path):
+            raise CommandError('%s: No such file or directory.' % path)
+
+        self.by_key_id, self.by_name = self.get_authorities()
+
+        done = 0
+        if checkpoint and os.path.exists(checkpoint):
+            with open(checkpoint) as stream:
+                done = int(stream.read().strip() or 0)
+
+        items = itertools.islice(iter_certificates(path), done, None)
+        pool = None
+        if processes > 1:
+            pool = Pool(processes)
+            results = pool.imap(parse_certificate, items, chunksize=100)
+        else:
+            results = (parse_certificate(item) for item in items)
+
+        imported = 0
+        try:
+            while True:
+                batch = list(itertools.islice(results, batch_size))
+                if not batch:
+                    break
+
+                imported += self.insert(batch, ca)
+                done += len(batch)
+
+                if checkpoint:
+                    write_file(checkpoint, str(done).encode('utf-8'))
+                if options['verbosity'] >= 2:
+                    self.stdout.write('%s certificates processed, %s imported.' % (done, imported))
+        finally:
+            if pool is not None:
+                pool.terminate()
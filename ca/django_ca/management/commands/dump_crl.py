@@ -31,6 +31,12 @@ class Command(BaseCommand):
                             help='Path for the output file. Use "-" for stdout.')
         parser.add_argument('--ca-crl', action='store_true', default=False,
                             help="Generate the CRL for revoked child CAs.")
+        parser.add_argument(
+            '--delta', action='store_true', default=False,
+            help="Generate a delta CRL with certificates revoked since the base CRL.")
+        parser.add_argument(
+            '--base', action='store_true', default=False,
+            help="Make this CRL the base CRL that delta CRLs refer to. Use this for the CRL you publish.")
         self.add_algorithm(parser)
         self.add_format(parser)
         self.add_ca(parser, allow_disabled=True)
@@ -44,6 +50,8 @@ class Command(BaseCommand):
             'algorithm': options['algorithm'],
             'password': options['password'],
             'ca_crl': options['ca_crl'],
+            'delta': options['delta'],
+            'base': options['base'],
         }
 
         try:
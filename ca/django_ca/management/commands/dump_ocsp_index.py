@@ -27,9 +27,7 @@ class Command(BaseCommand):
 
     def handle(self, ca, path, **options):
         if path == '-':
-            for line in get_index(ca):
-                self.stdout.write(line)
+            self.write_chunked(get_index(ca))
         else:
             with open(path, 'w') as stream:
-                for line in get_index(ca):
-                    stream.write(line)
+                self.write_chunked(get_index(ca), write=stream.write)
@@ -39,6 +39,8 @@ class Command(BaseCommand, CertificateAuthorityDetailMixin):
             ca.ocsp_url = options['ocsp_url']
         if options['crl_url'] is not None:
             ca.crl_url = '\n'.join(options['crl_url'])
+        if options['delta_crl_url'] is not None:
+            ca.delta_crl_url = '\n'.join(options['delta_crl_url'])
 
         if options.get('enable') is True:
             ca.enabled = True
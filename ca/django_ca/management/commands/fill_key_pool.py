@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of django-ca (https://github.com/mathiasertl/django-ca).
+#
+# django-ca is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# django-ca is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with django-ca.  If not,
+# see <http://www.gnu.org/licenses/>.
+
+from multiprocessing import cpu_count
+
+from django.core.management.base import CommandError
+
+from django_ca import ca_settings
+from django_ca.keys import fill_key_pool
+from django_ca.management.base import BaseCommand
+from django_ca.management.base import KeySizeAction
+
+
+class Command(BaseCommand):
+    help = """Generate private keys in advance and store them in the directory configured by the
+CA_KEY_POOL_DIR setting, so that new certificate authorities can be created without waiting for a new key."""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--key-type', choices=['RSA', 'DSA'], default='RSA',
+            help="Key type of the keys to generate (default: %(default)s).")
+        parser.add_argument(
+            '--key-size', type=int, action=KeySizeAction, default=4096,
+            metavar='{2048,4096,8192,...}',
+            help="Size of the keys to generate (default: %(default)s).")
+        parser.add_argument(
+            '--count', type=int, default=1, metavar='N',
+            help='Generate keys until N spare keys are available (default: %(default)s).')
+        parser.add_argument(
+            '--processes', type=int, default=cpu_count(), metavar='N',
+            help='Generate keys in N processes (default: %(default)s).')
+        parser.add_argument(
+            '--path', metavar='DIR', default=ca_settings.CA_KEY_POOL_DIR,
+            help='Directory to store keys in (default: %(default)s).')
+
+    def handle(self, key_type, key_size, count, processes, path, **options):
+        if not path:
+            raise CommandError('No directory given and CA_KEY_POOL_DIR is not set.')
+
+        generated = fill_key_pool(key_size, key_type, count, processes=processes, path=path)
+
+        if options['verbosity'] >= 2:
+            self.stdout.write('Generated %s %s keys with %s bits.' % (generated, key_type, key_size))
@@ -20,11 +20,11 @@ from cryptography import x509
 from cryptography.hazmat.backends import default_backend
 from cryptography.hazmat.primitives import serialization
 from cryptography.hazmat.primitives.serialization import Encoding
-from cryptography.hazmat.primitives.serialization import PrivateFormat
 
 from django.core.management.base import CommandError
 
 from django_ca import ca_settings
+from django_ca.keys import get_private_format
 from django_ca.management.base import BaseCommand
 from django_ca.models import CertificateAuthority
 
@@ -65,9 +65,11 @@ Note that the private key will be copied to the directory configured by the CA_D
         pem_data = pem.read()
         key_data = key.read()
         crl_url = '\n'.join(options['crl_url'])
+        delta_crl_url = '\n'.join(options['delta_crl_url'] or [])
 
         ca = CertificateAuthority(name=name, parent=parent, issuer_url=options['issuer_url'],
-                                  issuer_alt_name=options['issuer_alt_name'], crl_url=crl_url)
+                                  issuer_alt_name=options['issuer_alt_name'], crl_url=crl_url,
+                                  delta_crl_url=delta_crl_url)
 
         # load public key
         try:
@@ -97,7 +99,7 @@ Note that the private key will be copied to the directory configured by the CA_D
         # write private key to file
         oldmask = os.umask(247)
         pem = key_loaded.private_bytes(encoding=Encoding.PEM,
-                                       format=PrivateFormat.TraditionalOpenSSL,
+                                       format=get_private_format(key_loaded),
                                        encryption_algorithm=encryption)
         with open(ca.private_key_path, 'wb') as key_file:
             key_file.write(pem)
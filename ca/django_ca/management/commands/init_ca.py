@@ -23,7 +23,9 @@ import os
 from django.core.management.base import CommandError
 
 from django_ca import ca_settings
+from django_ca.keys import KEY_TYPES
 from django_ca.management.base import BaseCommand
+from django_ca.management.base import KeyCurveAction
 from django_ca.management.base import KeySizeAction
 from django_ca.models import CertificateAuthority
 
@@ -41,12 +43,19 @@ class Command(BaseCommand, CertificateAuthorityDetailMixin):
         self.add_algorithm(parser)
 
         parser.add_argument(
-            '--key-type', choices=['RSA', 'DSA'], default='RSA',
+            '--key-type', choices=KEY_TYPES, default='RSA',
             help="Key type for the CA private key (default: %(default)s).")
         parser.add_argument(
             '--key-size', type=int, action=KeySizeAction, default=4096,
             metavar='{2048,4096,8192,...}',
-            help="Size of the key to generate (default: %(default)s).")
+            help="Size of the key to generate for RSA and DSA keys (default: %(default)s).")
+        parser.add_argument(
+            '--ecc-curve', action=KeyCurveAction, metavar='CURVE',
+            default=ca_settings.CA_DEFAULT_ECC_CURVE,
+            help="Elliptic curve used for ECC keys (default: %s)." % ca_settings.CA_DEFAULT_ECC_CURVE.name)
+        parser.add_argument(
+            '--key-timeout', type=int, metavar='SECONDS',
+            help="Abort if the private key is not generated within SECONDS seconds.")
 
         parser.add_argument(
             '--expires', metavar='DAYS', action=ExpiresAction, default=365 * 10,
@@ -122,9 +131,14 @@ class Command(BaseCommand, CertificateAuthorityDetailMixin):
         subject.setdefault('CN', name)
         subject = {k: v for k, v in subject.items() if v}
 
+        # The key is generated in a worker process, so we can report progress
+        def progress(elapsed):
+            if options['verbosity'] >= 2:
+                self.stdout.write('Generating private key (%d seconds)...' % elapsed)
+
         try:
             CertificateAuthority.objects.init(
-                key_size=options['key_size'], key_type=options['key_type'],
+                key_size=options['key_size'], key_type=options['key_type'], ecc_curve=options['ecc_curve'],
                 algorithm=options['algorithm'],
                 expires=options['expires'],
                 parent=parent,
@@ -132,13 +146,15 @@ class Command(BaseCommand, CertificateAuthorityDetailMixin):
                 issuer_url=options['issuer_url'],
                 issuer_alt_name=options['issuer_alt_name'],
                 crl_url=options['crl_url'],
+                delta_crl_url=options['delta_crl_url'],
                 ocsp_url=options['ocsp_url'],
                 ca_issuer_url=options['ca_issuer_url'],
                 ca_crl_url=options['ca_crl_url'],
                 ca_ocsp_url=options['ca_ocsp_url'],
                 name_constraints=options['name_constraint'],
                 name=name, subject=subject, password=options['password'],
-                parent_password=options['parent_password']
+                parent_password=options['parent_password'],
+                key_process=True, key_timeout=options['key_timeout'], key_progress=progress,
             )
         except Exception as e:
             raise CommandError(e)
@@ -13,10 +13,37 @@
 # You should have received a copy of the GNU General Public License along with django-ca.  If not,
 # see <http://www.gnu.org/licenses/>.
 
+import csv
+import json
+from datetime import datetime
+from datetime import timedelta
+
+from django.core.management.base import CommandError
+from django.utils import six
 from django.utils import timezone
+from django.utils.encoding import force_str
 
 from ...models import Certificate
 from ..base import BaseCommand
+from ..base import DateAction
+
+# Fields available with --fields and the database column they are read from
+FIELDS = {
+    'serial': 'serial',
+    'cn': 'cn',
+    'ca': 'ca__serial',
+    'valid_from': 'valid_from',
+    'expires': 'expires',
+    'revoked': 'revoked',
+    'revoked_date': 'revoked_date',
+    'revoked_reason': 'revoked_reason',
+    'distinguished_name': 'distinguished_name',
+    'subject_alt_names': 'subject_alt_names',
+    'key_type': 'key_type',
+    'key_size': 'key_size',
+    'fingerprint_sha256': 'fingerprint_sha256',
+}
+DEFAULT_FIELDS = ['serial', 'cn', 'expires', 'revoked']
 
 
 class Command(BaseCommand):
@@ -30,24 +57,110 @@ class Command(BaseCommand):
         parser.add_argument('--revoked', default=False, action='store_true',
                             help='Also list revoked certificates.')
 
-    def handle(self, *args, **options):
+        group = parser.add_argument_group('Filters')
+        group.add_argument('--since', action=DateAction, metavar='YYYY-MM-DD',
+                           help='Only list certificates valid from the given date or later.')
+        group.add_argument('--until', action=DateAction, metavar='YYYY-MM-DD',
+                           help='Only list certificates valid from before the given date.')
+        group.add_argument('--expires-within', type=int, metavar='DAYS',
+                           help='Only list certificates that expire within the given number of days.')
+
+        group = parser.add_argument_group('Output')
+        group.add_argument('--format', choices=['text', 'json', 'csv', 'tsv'], default='text',
+                           help='Output format (default: %(default)s).')
+        group.add_argument(
+            '--fields', metavar='FIELD[,FIELD...]',
+            help='Comma-separated list of fields for JSON, CSV or TSV output (default: %s). Available: %s.'
+                 % (','.join(DEFAULT_FIELDS), ', '.join(sorted(FIELDS))))
+
+    def get_queryset(self, now, options):
         certs = Certificate.objects.all()
 
         if not options['expired']:
-            certs = certs.filter(expires__gt=timezone.now())
+            certs = certs.filter(expires__gt=now)
         if not options['revoked']:
             certs = certs.filter(revoked=False)
-
         if options['ca'] is not None:
             certs = certs.filter(ca=options['ca'])
+        if options['since'] is not None:
+            certs = certs.filter(valid_from__gte=options['since'])
+        if options['until'] is not None:
+            certs = certs.filter(valid_from__lt=options['until'])
+        if options['expires_within'] is not None:
+            certs = certs.filter(expires__lte=now + timedelta(days=options['expires_within']))
+
+        return certs.order_by('expires', 'pk')
 
-        for cert in certs:
-            if cert.revoked is True:
+    def format_text(self, rows, now):
+        for serial, cn, expires, revoked in rows:
+            if revoked is True:
                 info = 'revoked'
             else:
                 word = 'expires'
-                if cert.expires < timezone.now():
+                if expires < now:
                     word = 'expired'
 
-                info = '%s: %s' % (word, cert.expires.strftime('%Y-%m-%d'))
-            self.stdout.write('%s - %s (%s)' % (cert.serial, cert.cn, info))
+                info = '%s: %s' % (word, expires.strftime('%Y-%m-%d'))
+            yield '%s - %s (%s)\n' % (serial, cn, info)
+
+    def get_value(self, field, value):
+        if field == 'subject_alt_names':
+            return [v for v in value.splitlines() if v]
+        elif isinstance(value, datetime):
+            return value.isoformat()
+        return value
+
+    def format_json(self, rows, fields):
+        # Write a JSON array with one object per line, so that the output can be streamed
+        sep = '[\n'
+        for row in rows:
+            yield sep + json.dumps({f: self.get_value(f, v) for f, v in zip(fields, row)}, sort_keys=True)
+            sep = ',\n'
+
+        if sep == '[\n':
+            yield '[]\n'
+        else:
+            yield '\n]\n'
+
+    def format_csv(self, rows, fields, delimiter):
+        stream = six.StringIO()
+        writer = csv.writer(stream, delimiter=delimiter, lineterminator='\n')
+
+        writer.writerow(fields)
+        yield stream.getvalue()
+
+        for row in rows:
+            stream.seek(0)
+            stream.truncate()
+
+            row = [self.get_value(f, v) for f, v in zip(fields, row)]
+            row = [','.join(v) if isinstance(v, list) else ('' if v is None else v) for v in row]
+            if six.PY2:  # pragma: only py2
+                row = [force_str(v) for v in row]
+            writer.writerow(row)
+            yield stream.getvalue()
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        certs = self.get_queryset(now, options)
+
+        if options['format'] == 'text':
+            if options['fields']:
+                raise CommandError('--fields is only supported with --format json, csv or tsv.')
+
+            rows = certs.values_list('serial', 'cn', 'expires', 'revoked').iterator()
+            self.write_chunked(self.format_text(rows, now))
+            return
+
+        fields = DEFAULT_FIELDS
+        if options['fields']:
+            fields = [f.strip() for f in options['fields'].split(',') if f.strip()]
+            unknown = [f for f in fields if f not in FIELDS]
+            if unknown:
+                raise CommandError('%s: Unknown field.' % ', '.join(unknown))
+
+        rows = certs.values_list(*[FIELDS[f] for f in fields]).iterator()
+        if options['format'] == 'json':
+            self.write_chunked(self.format_json(rows, fields))
+        else:
+            self.write_chunked(self.format_csv(rows, fields, ',' if options['format'] == 'csv' else '\t'))
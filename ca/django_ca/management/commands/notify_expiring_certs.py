@@ -13,15 +13,22 @@
 # You should have received a copy of the GNU General Public License along with django-ca.  If not,
 # see <http://www.gnu.org/licenses/>.
 
+from collections import OrderedDict
 from datetime import datetime
 from datetime import timedelta
 
 from django.conf import settings
-from django.core.mail import send_mail
+from django.core.mail import get_connection
+from django.core.mail import send_mass_mail
 from django.core.management.base import BaseCommand
+from django.db import IntegrityError
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
 
 from django_ca import ca_settings
 from django_ca.models import Certificate
+from django_ca.models import ExpiryNotification
 
 
 class Command(BaseCommand):
@@ -31,19 +38,98 @@ class Command(BaseCommand):
         parser.add_argument('--days', type=int, default=14,
                             help='Warn DAYS days ahead of time (default: %(default)s).')
 
-    def handle(self, *args, **options):
-        now = datetime.utcnow()
-        expires = now + timedelta(days=options['days'] + 1)  # add a day to avoid one-of errors
+    def get_thresholds(self, days):
+        return sorted(set([d for d in ca_settings.CA_NOTIFICATION_DAYS if d <= days]))
 
-        qs = Certificate.objects.valid().filter(expires__lt=expires)
-        for cert in qs:
-            days = (cert.expires - now).days
+    def get_queryset(self, now, thresholds):
+        # A certificate crossed a threshold if it expires in that many (whole) days or less. For every
+        # threshold, select certificates between this and the previous threshold that have not yet been
+        # notified of this or a lower threshold, so that only the unsent window is read.
+        query = Q()
+        start = now
+        for threshold in thresholds:
+            end = now + timedelta(days=threshold + 1)
+            query |= Q(expires__gte=start, expires__lt=end) & ~Q(
+                expiry_notifications__threshold__lte=threshold)
+            start = end
 
-            if days not in ca_settings.CA_NOTIFICATION_DAYS:
-                continue
+        if not query:
+            return Certificate.objects.none()
 
+        return Certificate.objects.valid().filter(query).only('cn', 'expires').prefetch_related(
+            'watchers').order_by('expires', 'pk')
+
+    def get_message(self, certs):
+        if len(certs) == 1:
+            cert = certs[0]
             timestamp = cert.expires.strftime('%Y-%m-%d')
             subj = 'Certificate expiration for %s on %s' % (cert.cn, timestamp)
             msg = 'The certificate for %s will expire on %s.' % (cert.cn, timestamp)
-            to = list(cert.watchers.values_list('mail', flat=True))
-            send_mail(subj, msg, settings.DEFAULT_FROM_EMAIL, to)
+        else:
+            subj = 'Certificate expiration for %s certificates' % len(certs)
+            msg = 'The following certificates will expire soon:\n\n%s' % '\n'.join([
+                '* %s on %s' % (cert.cn, cert.expires.strftime('%Y-%m-%d')) for cert in certs
+            ])
+        return subj, msg
+
+    def claim(self, notifications):
+        """Save ``notifications`` and return the ones that were not already saved by another run.
+
+        Must be called inside a transaction, so that claimed notifications are released again if sending
+        mails fails.
+        """
+        try:
+            with transaction.atomic():
+                ExpiryNotification.objects.bulk_create(notifications)
+            return notifications
+        except IntegrityError:
+            pass
+
+        # Another run recorded some of the notifications in the meantime, so save them one by one
+        claimed = []
+        for notification in notifications:
+            try:
+                with transaction.atomic():
+                    claimed.append(ExpiryNotification.objects.create(
+                        cert=notification.cert, threshold=notification.threshold))
+            except IntegrityError:
+                pass
+        return claimed
+
+    def handle(self, *args, **options):
+        if settings.USE_TZ:
+            now = timezone.now()
+        else:
+            now = datetime.utcnow()
+
+        thresholds = self.get_thresholds(options['days'])
+        certs = list(self.get_queryset(now, thresholds))
+        if not certs:
+            return
+
+        notifications = []
+        for cert in certs:
+            days = (cert.expires - now).days
+            threshold = [t for t in thresholds if t >= days][0]
+            notifications.append(ExpiryNotification(cert=cert, threshold=threshold))
+
+        # Notifications are recorded before mails are sent, so that runs of this command that overlap only
+        # send mails for the certificates they claimed. If sending fails, the transaction is rolled back and
+        # the notifications are retried by the next run.
+        with transaction.atomic():
+            notifications = self.claim(notifications)
+
+            # Group certificates by watcher, so that every watcher receives only a single mail
+            watchers = OrderedDict()
+            for notification in notifications:
+                for watcher in notification.cert.watchers.all():
+                    watchers.setdefault(watcher.mail, []).append(notification.cert)
+
+            messages = []
+            for mail, certs in watchers.items():
+                subj, msg = self.get_message(certs)
+                messages.append((subj, msg, settings.DEFAULT_FROM_EMAIL, [mail]))
+
+            # Use a single connection for all mails
+            if messages:
+                send_mass_mail(messages, connection=get_connection())
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of django-ca (https://github.com/mathiasertl/django-ca).
+#
+# django-ca is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# django-ca is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with django-ca.  If not,
+# see <http://www.gnu.org/licenses/>.
+
+from django.core.management.base import CommandError
+
+from django_ca import ca_settings
+from django_ca.management.base import BaseCommand
+from django_ca.publish import publish_ca_cert
+from django_ca.publish import publish_crls
+from django_ca.publish import publish_ocsp_responses
+
+
+class Command(BaseCommand):
+    help = """Write CRLs, CA certificates and (optionally) pre-signed OCSP responses to a directory, so that
+they can be served by a webserver. Files are laid out like the URLs provided by django_ca.urls. Run this
+command more often than CRLs expire."""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'serial', nargs='*',
+            help='Serials or names of certificate authorities (default: all enabled and valid CAs).')
+        parser.add_argument(
+            '--path', default=ca_settings.CA_PUBLISH_DIR,
+            help='Directory to write files to (default: the CA_PUBLISH_DIR setting, %(default)s).')
+        parser.add_argument(
+            '--ocsp', action='store_true', default=ca_settings.CA_PUBLISH_OCSP,
+            help='Also write pre-signed OCSP responses for all certificates.')
+        self.add_password(parser)
+
+    def handle(self, serial, path, ocsp, **options):
+        if not path:
+            raise CommandError('No path given and the CA_PUBLISH_DIR setting is not set.')
+
+        for ca in self.get_cas(serial):
+            try:
+                count = publish_ca_cert(ca, path)
+                count += publish_crls(ca, path, password=options['password'])
+                if ocsp is True:
+                    count += publish_ocsp_responses(ca, path)
+            except Exception as e:
+                raise CommandError('%s: %s' % (ca.serial, e))
+
+            if options['verbosity'] >= 2:
+                self.stdout.write('%s: Published %s files.' % (ca.serial, count))
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of django-ca (https://github.com/mathiasertl/django-ca).
+#
+# django-ca is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# django-ca is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with django-ca.  If not,
+# see <http://www.gnu.org/licenses/>.
+
+from django.core.management.base import CommandError
+
+from django_ca.crl import cache_crls
+from django_ca.crl import get_crl_profiles
+from django_ca.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = """Generate CRLs for the profiles configured in the CA_CRL_PROFILES setting and store them in the
+cache. Run this command more often than CRLs expire, so that CRLs never have to be generated on request."""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'serial', nargs='*',
+            help='Serials or names of certificate authorities (default: all enabled and valid CAs).')
+        parser.add_argument(
+            '--profile', action='append', dest='profiles', metavar='PROFILE',
+            help='Only generate CRLs for the given profile. Can be given multiple times.')
+        self.add_password(parser)
+
+    def handle(self, serial, **options):
+        profiles = get_crl_profiles()
+        if options['profiles']:
+            unknown = set(options['profiles']) - set(name for name, profile in profiles)
+            if unknown:
+                raise CommandError('%s: Unknown CRL profile.' % ', '.join(sorted(unknown)))
+            profiles = [(name, profile) for name, profile in profiles if name in options['profiles']]
+
+        for ca in self.get_cas(serial):
+            try:
+                count = cache_crls(ca, password=options['password'], profiles=profiles)
+            except Exception as e:
+                raise CommandError('%s: %s' % (ca.serial, e))
+
+            if options['verbosity'] >= 2:
+                self.stdout.write('%s: Stored %s CRLs.' % (ca.serial, count))
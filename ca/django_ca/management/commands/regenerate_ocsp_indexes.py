@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of django-ca (https://github.com/mathiasertl/django-ca).
+#
+# django-ca is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# django-ca is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with django-ca.  If not,
+# see <http://www.gnu.org/licenses/>.
+
+from django.core.management.base import CommandError
+
+from django_ca import ca_settings
+from django_ca.management.base import BaseCommand
+from django_ca.ocsp import OCSPIndexFile
+from django_ca.ocsp import get_index_path
+
+
+class Command(BaseCommand):
+    help = """Rebuild the index files for "openssl ocsp" in the CA_OCSP_INDEX_DIR directory. Index files are
+updated whenever a certificate is issued or revoked, this command removes expired certificates and should
+run regularly (e.g. once a day)."""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'serial', nargs='*',
+            help='Serials or names of certificate authorities (default: all enabled and valid CAs).')
+
+    def handle(self, serial, **options):
+        if not ca_settings.CA_OCSP_INDEX_DIR:
+            raise CommandError('CA_OCSP_INDEX_DIR is not set.')
+
+        for ca in self.get_cas(serial):
+            path = get_index_path(ca)
+            try:
+                count = OCSPIndexFile(path).rebuild(ca)
+            except Exception as e:
+                raise CommandError('%s: %s' % (ca.serial, e))
+
+            if options['verbosity'] >= 2:
+                self.stdout.write('%s: Wrote %s certificates to %s.' % (ca.serial, count, path))
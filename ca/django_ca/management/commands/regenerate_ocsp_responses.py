@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of django-ca (https://github.com/mathiasertl/django-ca).
+#
+# django-ca is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# django-ca is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with django-ca.  If not,
+# see <http://www.gnu.org/licenses/>.
+
+from django.conf import settings
+from django.core.management.base import CommandError
+
+from ...models import CertificateAuthority
+from ...ocsp import get_responder_cert
+from ...ocsp import get_responder_key
+from ...ocsp import get_response_store
+from ...ocsp import store_responses
+from ...views import OCSPView
+from ..base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = """Pre-generate signed OCSP responses for OCSP responders configured with a response store.
+
+This command should run more often than the responses expire (e.g. via a cron job)."""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'name', nargs='*',
+            help='Names of responders in the CA_OCSP_URLS setting (default: all with a response store).')
+
+    def handle(self, name, **options):
+        responders = getattr(settings, 'CA_OCSP_URLS', {})
+        if not name:
+            name = sorted([k for k, v in responders.items()
+                           if v.get('response_store') and not v.get('ca_ocsp')])
+
+        for responder in name:
+            if responder not in responders:
+                raise CommandError('%s: OCSP responder not found.' % responder)
+
+            kwargs = responders[responder]
+            if not kwargs.get('response_store'):
+                raise CommandError('%s: OCSP responder has no response store.' % responder)
+            if kwargs.get('ca_ocsp'):
+                raise CommandError('%s: Responses for child CAs cannot be pre-generated.' % responder)
+
+            try:
+                ca = CertificateAuthority.objects.get_by_serial_or_cn(kwargs.get('ca', responder))
+                responder_key = get_responder_key(kwargs['responder_key'])
+                responder_cert = get_responder_cert(kwargs['responder_cert'])
+            except Exception as e:
+                raise CommandError('%s: %s' % (responder, e))
+
+            store = get_response_store(kwargs['response_store'])
+            count = store_responses(ca, store, responder_key, responder_cert,
+                                    expires=kwargs.get('expires', OCSPView.expires))
+            if options['verbosity'] >= 2:
+                self.stdout.write('%s: Stored %s responses.' % (responder, count))
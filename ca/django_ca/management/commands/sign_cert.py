@@ -73,10 +73,8 @@ default profile, currently %s.""" % ca_settings.CA_DEFAULT_PROFILE
         self.add_algorithm(parser)
         self.add_ca(parser)
         self.add_password(parser)
+        self.add_expires(parser)
 
-        parser.add_argument(
-            '--expires', default=ca_settings.CA_DEFAULT_EXPIRES, action=ExpiresAction,
-            help='Sign the certificate for DAYS days (default: %(default)s)')
         parser.add_argument(
             '--csr', metavar='FILE',
             help='The path to the certificate to sign, if ommitted, you will be be prompted.')
@@ -85,13 +83,25 @@ default profile, currently %s.""" % ca_settings.CA_DEFAULT_PROFILE
         parser.add_argument(
             '--alt', metavar='DOMAIN', action='append', default=[],
             help='Add a subjectAltName to the certificate (may be given multiple times)')
-        parser.add_argument(
-            '--watch', metavar='EMAIL', action='append', default=[],
-            help='Email EMAIL when this certificate expires (may be given multiple times)')
+        self.add_watch(parser)
         parser.add_argument(
             '--out', metavar='FILE',
             help='Save signed certificate to FILE. If omitted, print to stdout.')
 
+        self.add_extensions_group(parser)
+        self.add_profiles(parser)
+
+    def add_expires(self, parser):
+        parser.add_argument(
+            '--expires', default=ca_settings.CA_DEFAULT_EXPIRES, action=ExpiresAction,
+            help='Sign the certificate for DAYS days (default: %(default)s)')
+
+    def add_watch(self, parser):
+        parser.add_argument(
+            '--watch', metavar='EMAIL', action='append', default=[],
+            help='Email EMAIL when this certificate expires (may be given multiple times)')
+
+    def add_extensions_group(self, parser):
         group = parser.add_argument_group(
             'X509 v3 certificate extensions',
             'Values for more complex x509 extensions. This is for advanced usage only, the profiles already '
@@ -107,6 +117,7 @@ default profile, currently %s.""" % ca_settings.CA_DEFAULT_PROFILE
         group.add_argument(
             '--tls-features', metavar='VALUES', help='TLS Feature extensions.')
 
+    def add_profiles(self, parser):
         group = parser.add_argument_group(
             'profiles', """Sign certificate based on the given profile. A profile only sets the
 the default values, options like --key-usage still override the profile.""")
@@ -120,15 +131,14 @@ the default values, options like --key-usage still override the profile.""")
             return True, value[9:]
         return False, value
 
-    def handle(self, *args, **options):
-        ca = options['ca']
-        if ca.expires < options['expires']:
+    def check_expires(self, ca, expires):
+        if ca.expires < expires:
             max_days = (ca.expires - timezone.now()).days
             raise CommandError(
                 'Certificate would outlive CA, maximum expiry for this CA is %s days.' % max_days)
 
-        # get list of watchers
-        watchers = [Watcher.from_addr(addr) for addr in options['watch']]
+    def get_sign_kwargs(self, options):
+        """Get keyword arguments for signing certificates from the given command line options."""
 
         # get keyUsage and extendedKeyUsage flags based on profiles
         kwargs = get_cert_profile_kwargs(options['profile'])
@@ -150,6 +160,15 @@ the default values, options like --key-usage still override the profile.""")
 
         # filter empty values
         kwargs['subject'] = OrderedDict([(k, v) for k, v in kwargs['subject'].items() if v])
+        return kwargs
+
+    def handle(self, *args, **options):
+        ca = options['ca']
+        self.check_expires(ca, options['expires'])
+
+        # get list of watchers
+        watchers = [Watcher.from_addr(addr) for addr in options['watch']]
+        kwargs = self.get_sign_kwargs(options)
 
         if not kwargs['subject'].get('CN') and not options['alt']:
             raise CommandError(
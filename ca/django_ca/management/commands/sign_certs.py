@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of django-ca (https://github.com/mathiasertl/django-ca).
+#
+# django-ca is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# django-ca is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with django-ca.  If not,
+# see <http://www.gnu.org/licenses/>.
+
+import os
+import re
+import sys
+from multiprocessing import cpu_count
+
+from django.core.management.base import CommandError
+from django.utils.encoding import force_bytes
+
+from ...models import Certificate
+from ...models import Watcher
+from ...utils import write_file
+from .sign_cert import Command as SignCertCommand
+
+CSR_REGEX = re.compile(
+    b'-----BEGIN (?:NEW )?CERTIFICATE REQUEST-----.*?-----END (?:NEW )?CERTIFICATE REQUEST-----', re.DOTALL)
+
+
+def read_csrs(data):
+    """Split a file into single CSRs, a file without any PEM encoded CSR is assumed to be one CSR."""
+
+    matches = CSR_REGEX.findall(data)
+    if matches:
+        return matches
+    return [data]
+
+
+class Command(SignCertCommand):
+    help = """Sign many CSRs at once. CSRs are read from all files in a directory, a file or from stdin
+(if PATH is "-"), a file may contain any number of PEM encoded CSRs. The CommonName of each CSR is used,
+unless you name a CommonName with --subject."""
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', metavar='PATH', help='Directory or file to read CSRs from.')
+        self.add_subject_group(parser)
+        self.add_cn_in_san(parser)
+        self.add_algorithm(parser)
+        self.add_ca(parser)
+        self.add_password(parser)
+        self.add_expires(parser)
+        self.add_format(parser, opts=['--csr-format'],
+                        help_text='Format of the CSRs ("ASN1" is an alias for "DER", default: %(default)s)')
+        self.add_watch(parser)
+        parser.add_argument(
+            '--out', metavar='DIR',
+            help='Save signed certificates as <serial>.pem to DIR. If omitted, print to stdout.')
+        parser.add_argument(
+            '--threads', type=int, default=cpu_count(), metavar='N',
+            help='Sign certificates in N threads (default: %(default)s).')
+
+        self.add_extensions_group(parser)
+        self.add_profiles(parser)
+
+    def read_csrs(self, path):
+        if path == '-':
+            return read_csrs(force_bytes(sys.stdin.read()))
+        elif os.path.isdir(path):
+            csrs = []
+            for filename in sorted(os.listdir(path)):
+                filename = os.path.join(path, filename)
+                if os.path.isfile(filename):
+                    with open(filename, 'rb') as stream:
+                        csrs += read_csrs(stream.read())
+            return csrs
+        elif os.path.exists(path):
+            with open(path, 'rb') as stream:
+                return read_csrs(stream.read())
+        else:
+            raise CommandError('%s: No such file or directory.' % path)
+
+    def handle(self, path, **options):
+        ca = options['ca']
+        self.check_expires(ca, options['expires'])
+
+        watchers = [Watcher.from_addr(addr) for addr in options['watch']]
+        kwargs = self.get_sign_kwargs(options)
+        csrs = self.read_csrs(path)
+
+        try:
+            certs = Certificate.objects.bulk_init(
+                ca=ca, csrs=csrs, algorithm=options['algorithm'], expires=options['expires'],
+                threads=options['threads'], **kwargs)
+        except Exception as e:
+            raise CommandError(e)
+
+        if watchers:
+            Through = Certificate.watchers.through
+            Through.objects.bulk_create([Through(certificate_id=c.pk, watcher_id=w.pk)
+                                         for c in certs for w in watchers])
+
+        for cert in certs:
+            if options['out']:
+                write_file(os.path.join(options['out'], '%s.pem' % cert.serial_hex),
+                           cert.pub.encode('utf-8'))
+            else:
+                self.stdout.write(cert.pub)
@@ -14,26 +14,32 @@
 # see <http://www.gnu.org/licenses/>.
 
 import os
+from collections import OrderedDict
+from multiprocessing.pool import ThreadPool
 
 import idna
 
 from cryptography import x509
 from cryptography.hazmat.backends import default_backend
 from cryptography.hazmat.primitives import serialization
-from cryptography.hazmat.primitives.asymmetric import dsa
-from cryptography.hazmat.primitives.asymmetric import rsa
 from cryptography.hazmat.primitives.serialization import Encoding
-from cryptography.hazmat.primitives.serialization import PrivateFormat
 from cryptography.x509 import TLSFeature
 from cryptography.x509.oid import AuthorityInformationAccessOID
 from cryptography.x509.oid import ExtensionOID
+from cryptography.x509.oid import NameOID
 
 from django.db import models
+from django.db import transaction
 from django.utils import six
 from django.utils.encoding import force_bytes
 from django.utils.encoding import force_text
 
 from . import ca_settings
+from .keys import generate_private_key
+from .keys import generate_private_key_in_process
+from .keys import get_pooled_key
+from .keys import get_private_format
+from .keys import get_signature_algorithm
 from .signals import post_create_ca
 from .signals import post_issue_cert
 from .signals import pre_create_ca
@@ -48,15 +54,17 @@ from .utils import x509_name
 
 
 class CertificateManagerMixin(object):
+    def get_distribution_points(self, urls):
+        if isinstance(urls, six.string_types):
+            urls = [url.strip() for url in urls.split()]
+        urls = [x509.UniformResourceIdentifier(force_text(c)) for c in urls]
+        return [x509.DistributionPoint(full_name=[c], relative_name=None, crl_issuer=None, reasons=None)
+                for c in urls]
+
     def get_common_extensions(self, issuer_url=None, crl_url=None, ocsp_url=None):
         extensions = []
         if crl_url:
-            if isinstance(crl_url, six.string_types):
-                crl_url = [url.strip() for url in crl_url.split()]
-            urls = [x509.UniformResourceIdentifier(force_text(c)) for c in crl_url]
-            dps = [x509.DistributionPoint(full_name=[c], relative_name=None, crl_issuer=None, reasons=None)
-                   for c in urls]
-            extensions.append((False, x509.CRLDistributionPoints(dps)))
+            extensions.append((False, x509.CRLDistributionPoints(self.get_distribution_points(crl_url))))
         auth_info_access = []
         if ocsp_url:
             uri = x509.UniformResourceIdentifier(force_text(ocsp_url))
@@ -75,16 +83,18 @@ class CertificateAuthorityManager(CertificateManagerMixin, models.Manager):
     def init(self, name, key_size, key_type, algorithm, expires, parent, subject, pathlen=None,
              issuer_url=None, issuer_alt_name=None, crl_url=None, ocsp_url=None,
              ca_issuer_url=None, ca_crl_url=None, ca_ocsp_url=None, name_constraints=None,
-             password=None, parent_password=None):
+             password=None, parent_password=None, delta_crl_url=None, key_process=False, key_timeout=None,
+             key_progress=None, ecc_curve=None):
         """Create a new certificate authority.
 
         Parameters
         ----------
 
         key_size : int
-            Integer, must be a power of two (e.g. 2048, 4096, ...)
+            Integer, must be a power of two (e.g. 2048, 4096, ...). Ignored for ECC and Ed25519 keys.
         key_type: str, optional
-            Either ``"RSA"`` or ``"DSA"`` for a RSA or DSA key, with ``"RSA"`` being the default.
+            One of ``"RSA"``, ``"DSA"``, ``"ECC"`` or ``"Ed25519"``, with ``"RSA"`` being the default.
+            Ed25519 keys require cryptography>=2.8.
         algorithm : :py:class:`~cryptography:cryptography.hazmat.primitives.hashes.HashAlgorithm`
             Hash algorithm used when signing the certificate. Must be an instance of
             :py:class:`~cryptography:cryptography.hazmat.primitives.hashes.HashAlgorithm`, e.g.
@@ -101,12 +111,27 @@ class CertificateAuthorityManager(CertificateManagerMixin, models.Manager):
             Password to encrypt the private key with.
         parent_password : bytes, optional
             Password that the private key of the parent CA is encrypted with.
+        delta_crl_url : list of str, optional
+            URLs where delta CRLs can be retrieved, added as FreshestCRL extension to signed certificates.
+        key_process : bool, optional
+            Generate the private key in a worker process, see
+            :py:func:`~django_ca.keys.generate_private_key_in_process`. This is implied by ``key_timeout``
+            and ``key_progress``.
+        key_timeout : int, optional
+            Raise ``RuntimeError`` if the private key is not generated within the given number of seconds.
+        key_progress : function, optional
+            Called every second while the private key is generated with the number of seconds elapsed so far.
+        ecc_curve : :py:class:`~cryptography:cryptography.hazmat.primitives.asymmetric.ec.EllipticCurve`
+            The curve for ECC keys, the default is the ``CA_DEFAULT_ECC_CURVE`` setting.
+
+        If the ``CA_KEY_POOL_DIR`` setting is set and a spare key of the requested type and size is available,
+        it is used instead of generating a new private key.
         """
         # NOTE: This is already verified by KeySizeAction, so none of these checks should ever be
         #       True in the real world. None the less they are here as a safety precaution.
-        if not is_power2(key_size):
+        if key_type not in ('ECC', 'Ed25519') and not is_power2(key_size):
             raise RuntimeError("%s: Key size must be a power of two." % key_size)
-        elif key_size < ca_settings.CA_MIN_KEY_SIZE:
+        elif key_type not in ('ECC', 'Ed25519') and key_size < ca_settings.CA_MIN_KEY_SIZE:
             raise RuntimeError("%s: Key size must be least %s bits."
                                % (key_size, ca_settings.CA_MIN_KEY_SIZE))
 
@@ -115,13 +140,16 @@ class CertificateAuthorityManager(CertificateManagerMixin, models.Manager):
             expires=expires, parent=parent, subject=subject, pathlen=pathlen, issuer_url=issuer_url,
             issuer_alt_name=issuer_alt_name, crl_url=crl_url, ocsp_url=ocsp_url, ca_issuer_url=ca_issuer_url,
             ca_crl_url=ca_crl_url, ca_ocsp_url=ca_ocsp_url, name_constraints=name_constraints,
-            password=password, parent_password=parent_password)
-
-        if key_type == 'DSA':
-            private_key = dsa.generate_private_key(key_size=key_size, backend=default_backend())
-        else:
-            private_key = rsa.generate_private_key(public_exponent=65537, key_size=key_size,
-                                                   backend=default_backend())
+            password=password, parent_password=parent_password, delta_crl_url=delta_crl_url)
+
+        private_key = None
+        if ca_settings.CA_KEY_POOL_DIR and key_type in ('RSA', 'DSA'):  # other keys are generated quickly
+            private_key = get_pooled_key(key_size, key_type)
+        if private_key is None and (key_process or key_timeout is not None or key_progress is not None):
+            private_key = generate_private_key_in_process(key_size, key_type, ecc_curve=ecc_curve,
+                                                          timeout=key_timeout, progress=key_progress)
+        elif private_key is None:
+            private_key = generate_private_key(key_size, key_type, ecc_curve=ecc_curve)
         public_key = private_key.public_key()
         subject = x509_name(subject)
 
@@ -170,14 +198,17 @@ class CertificateAuthorityManager(CertificateManagerMixin, models.Manager):
             builder = builder.add_extension(x509.NameConstraints(
                 permitted_subtrees=permitted, excluded_subtrees=excluded), critical=True)
 
-        certificate = builder.sign(private_key=private_sign_key, algorithm=algorithm,
+        certificate = builder.sign(private_key=private_sign_key,
+                                   algorithm=get_signature_algorithm(private_sign_key, algorithm),
                                    backend=default_backend())
 
         if crl_url is not None:
             crl_url = '\n'.join(crl_url)
+        if delta_crl_url is not None:
+            delta_crl_url = '\n'.join(delta_crl_url)
 
         ca = self.model(name=name, issuer_url=issuer_url, issuer_alt_name=issuer_alt_name,
-                        ocsp_url=ocsp_url, crl_url=crl_url, parent=parent)
+                        ocsp_url=ocsp_url, crl_url=crl_url, delta_crl_url=delta_crl_url, parent=parent)
         ca.x509 = certificate
         ca.private_key_path = os.path.join(ca_settings.CA_DIR, '%s.key' % ca.serial)
         ca.save()
@@ -190,7 +221,7 @@ class CertificateAuthorityManager(CertificateManagerMixin, models.Manager):
         # write private key to file
         oldmask = os.umask(247)
         pem = private_key.private_bytes(encoding=Encoding.PEM,
-                                        format=PrivateFormat.TraditionalOpenSSL,
+                                        format=get_private_format(private_key),
                                         encryption_algorithm=encryption)
         with open(ca.private_key_path, 'wb') as key_file:
             key_file.write(pem)
@@ -217,8 +248,9 @@ class CertificateManager(CertificateManagerMixin, models.Manager):
 
         ca : :py:class:`~django_ca.models.CertificateAuthority`
             The certificate authority to sign the certificate with.
-        csr : str
-            A valid CSR. The format is given by the ``csr_format`` parameter.
+        csr : str or :py:class:`~cryptography:cryptography.x509.CertificateSigningRequest`
+            A valid CSR. The format is given by the ``csr_format`` parameter, unless the CSR is already
+            loaded.
         expires : int
             When the certificate should expire (passed to :py:func:`~django_ca.utils.get_cert_builder`).
         algorithm : {'sha512', 'sha256', ...}
@@ -276,7 +308,9 @@ class CertificateManager(CertificateManagerMixin, models.Manager):
                 if cn_name not in subjectAltName:
                     subjectAltName.insert(0, cn_name)
 
-        if csr_format == Encoding.PEM:
+        if isinstance(csr, x509.CertificateSigningRequest):
+            req = csr
+        elif csr_format == Encoding.PEM:
             req = x509.load_pem_x509_csr(force_bytes(csr), default_backend())
         elif csr_format == Encoding.DER:
             req = x509.load_der_x509_csr(force_bytes(csr), default_backend())
@@ -306,6 +340,11 @@ class CertificateManager(CertificateManagerMixin, models.Manager):
         for critical, ext in self.get_common_extensions(ca.issuer_url, ca.crl_url, ca.ocsp_url):
             builder = builder.add_extension(ext, critical=critical)
 
+        # Let clients discover delta CRLs (RFC 5280, section 4.2.1.15)
+        if ca.delta_crl_url:
+            builder = builder.add_extension(
+                x509.FreshestCRL(self.get_distribution_points(ca.delta_crl_url)), critical=False)
+
         if subjectAltName:
             builder = builder.add_extension(x509.SubjectAlternativeName(subjectAltName), critical=False)
 
@@ -339,7 +378,9 @@ class CertificateManager(CertificateManagerMixin, models.Manager):
             builder = builder.add_extension(x509.IssuerAlternativeName(
                 [parse_general_name(ca.issuer_alt_name)]), critical=False)
 
-        return builder.sign(private_key=ca.key(password), algorithm=algorithm, backend=default_backend()), req
+        private_key = ca.key(password)
+        algorithm = get_signature_algorithm(private_key, algorithm)
+        return builder.sign(private_key=private_key, algorithm=algorithm, backend=default_backend()), req
 
     def init(self, ca, csr, *args, **kwargs):
         if args:
@@ -353,3 +394,87 @@ class CertificateManager(CertificateManagerMixin, models.Manager):
 
         post_issue_cert.send(sender=self.model, cert=c)
         return c
+
+    def bulk_init(self, ca, csrs, threads=None, batch_size=None, **kwargs):
+        """Sign many CSRs at once.
+
+        The private key of the certificate authority is loaded only once and certificates are signed in a
+        pool of ``threads`` threads (the default is the number of CPUs). All certificates are saved in a
+        single transaction using ``bulk_create()``. If neither a CommonName nor a subjectAltName is given,
+        the CommonName of each CSR is used.
+
+        Parameters
+        ----------
+
+        ca : :py:class:`~django_ca.models.CertificateAuthority`
+            The certificate authority to sign the certificates with.
+        csrs : list
+            The CSRs to sign, see :py:meth:`~django_ca.managers.CertificateManager.sign_cert`.
+        threads : int, optional
+            Number of threads used to sign certificates.
+        batch_size : int, optional
+            Passed to ``bulk_create()``.
+        **kwargs
+            All other parameters are passed to
+            :py:meth:`~django_ca.managers.CertificateManager.sign_cert`.
+
+        Returns
+        -------
+
+        list of :py:class:`~django_ca.models.Certificate`
+            The signed certificates, in the order of the CSRs.
+        """
+        csrs = list(csrs)
+        password = kwargs.pop('password', None)
+        csr_format = kwargs.pop('csr_format', Encoding.PEM)
+        subject = kwargs.pop('subject', None) or OrderedDict()
+
+        # load the private key and certificate of the CA once and not in every thread
+        ca.key(password)
+        ca.x509
+
+        for csr in csrs:
+            pre_issue_cert.send(sender=self.model, ca=ca, csr=csr, subject=subject, **kwargs)
+
+        def sign(csr):
+            if isinstance(csr, x509.CertificateSigningRequest):
+                req = csr
+            elif csr_format == Encoding.PEM:
+                req = x509.load_pem_x509_csr(force_bytes(csr), default_backend())
+            elif csr_format == Encoding.DER:
+                req = x509.load_der_x509_csr(force_bytes(csr), default_backend())
+            else:
+                raise ValueError('Unknown CSR format passed: %s' % csr_format)
+
+            csr_subject = OrderedDict(subject)  # sign_cert() modifies the subject
+            if not csr_subject.get('CN') and not kwargs.get('subjectAltName'):
+                cn = req.subject.get_attributes_for_oid(NameOID.COMMON_NAME)
+                if cn:
+                    csr_subject['CN'] = cn[0].value
+
+            c = self.model(ca=ca)
+            c.x509, req = self.sign_cert(ca, req, subject=csr_subject, password=password, **kwargs)
+            c.csr = req.public_bytes(Encoding.PEM).decode('utf-8')
+            return c
+
+        pool = ThreadPool(threads)
+        try:
+            certs = pool.map(sign, csrs)
+        finally:
+            pool.close()
+
+        with transaction.atomic():
+            self.bulk_create(certs, batch_size=batch_size)
+
+        # Only some database backends set the primary key in bulk_create()
+        missing = [c for c in certs if c.pk is None]
+        if missing:
+            pks = dict(self.filter(serial_hex__in=[c.serial_hex for c in missing]).values_list(
+                'serial_hex', 'pk'))
+            for c in missing:
+                c.pk = pks[c.serial_hex]
+                c._state.adding = False
+
+        for c in certs:
+            post_issue_cert.send(sender=self.model, cert=c)
+        return certs
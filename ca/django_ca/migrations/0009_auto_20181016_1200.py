@@ -0,0 +1,34 @@
+# Generated by Django 2.1 on 2018-10-16 12:00
+
+from django.db import migrations, models
+import django_ca.utils
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_ca', '0008_auto_20171203_2001'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='certificateauthority',
+            name='base_crl_date',
+            field=models.DateTimeField(blank=True, help_text='When the last complete CRL was issued by this CA.', null=True),
+        ),
+        migrations.AddField(
+            model_name='certificateauthority',
+            name='base_crl_number',
+            field=models.PositiveIntegerField(blank=True, help_text='Number of the last complete CRL issued by this CA.', null=True),
+        ),
+        migrations.AddField(
+            model_name='certificateauthority',
+            name='crl_number',
+            field=models.PositiveIntegerField(default=0, help_text='Number of the last CRL issued by this CA.'),
+        ),
+        migrations.AddField(
+            model_name='certificateauthority',
+            name='delta_crl_url',
+            field=models.TextField(blank=True, help_text='URLs, one per line, where you can retrieve the delta CRL.', null=True, validators=[django_ca.utils.multiline_url_validator], verbose_name='Delta CRL URLs'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 2.1 on 2018-10-17 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_ca', '0009_auto_20181016_1200'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='certificate',
+            index=models.Index(fields=['ca', 'revoked', 'expires'], name='django_ca_c_ca_id_be3bcb_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='certificate',
+            index=models.Index(fields=['expires'], name='django_ca_c_expires_140bcb_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 2.1 on 2018-10-18 12:00
+
+from django.db import migrations, models
+from django.db.models import F
+from django.db.models import Func
+from django.db.models import Value
+
+
+def backfill_serial_hex(apps, schema_editor):
+    # Update all rows with a single query, REPLACE() is supported by all databases supported by Django.
+    serial_hex = Func(F('serial'), Value(':'), Value(''), function='REPLACE')
+
+    for model in ['Certificate', 'CertificateAuthority']:
+        Model = apps.get_model('django_ca', model)
+        Model.objects.filter(serial_hex='').update(serial_hex=serial_hex)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_ca', '0010_auto_20181017_1200'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='certificate',
+            name='serial_hex',
+            field=models.CharField(db_index=True, default='', editable=False, help_text='The serial as hex without colons, used for fast lookups.', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='certificateauthority',
+            name='serial_hex',
+            field=models.CharField(db_index=True, default='', editable=False, help_text='The serial as hex without colons, used for fast lookups.', max_length=64),
+        ),
+        migrations.RunPython(backfill_serial_hex, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,125 @@
+# Generated by Django 2.1 on 2018-10-19 12:00
+
+from django.db import migrations, models
+
+REVOCATION_REASON_CODES = {
+    'unspecified': 0,
+    'key_compromise': 1,
+    'ca_compromise': 2,
+    'affiliation_changed': 3,
+    'superseded': 4,
+    'cessation_of_operation': 5,
+    'certificate_hold': 6,
+    'remove_from_crl': 8,
+    'privilege_withdrawn': 9,
+    'aa_compromise': 10,
+}
+
+
+def set_revoked_reason_codes(apps, schema_editor):
+    # Other fields require parsing the certificate and are set by "manage.py backfill_metadata" instead.
+    for model in ['Certificate', 'CertificateAuthority']:
+        Model = apps.get_model('django_ca', model)
+        for reason, code in REVOCATION_REASON_CODES.items():
+            Model.objects.filter(revoked_reason=reason).update(revoked_reason_code=code)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_ca', '0011_auto_20181018_1200'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='certificate',
+            name='authority_key_identifier',
+            field=models.CharField(blank=True, default='', editable=False, max_length=128, verbose_name='Authority Key Identifier'),
+        ),
+        migrations.AddField(
+            model_name='certificate',
+            name='distinguished_name',
+            field=models.TextField(blank=True, default='', editable=False, verbose_name='Distinguished Name'),
+        ),
+        migrations.AddField(
+            model_name='certificate',
+            name='fingerprint_sha256',
+            field=models.CharField(blank=True, default='', editable=False, max_length=95, verbose_name='SHA-256 fingerprint'),
+        ),
+        migrations.AddField(
+            model_name='certificate',
+            name='key_size',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Key size'),
+        ),
+        migrations.AddField(
+            model_name='certificate',
+            name='key_type',
+            field=models.CharField(blank=True, default='', editable=False, max_length=8, verbose_name='Key type'),
+        ),
+        migrations.AddField(
+            model_name='certificate',
+            name='revoked_reason_code',
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, null=True, verbose_name='Reason code for revocation'),
+        ),
+        migrations.AddField(
+            model_name='certificate',
+            name='subject_alt_names',
+            field=models.TextField(blank=True, default='', editable=False, help_text='Subject alternative names, one per line.'),
+        ),
+        migrations.AddField(
+            model_name='certificate',
+            name='subject_key_identifier',
+            field=models.CharField(blank=True, default='', editable=False, max_length=128, verbose_name='Subject Key Identifier'),
+        ),
+        migrations.AddField(
+            model_name='certificate',
+            name='valid_from',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Valid from'),
+        ),
+        migrations.AddField(
+            model_name='certificateauthority',
+            name='authority_key_identifier',
+            field=models.CharField(blank=True, default='', editable=False, max_length=128, verbose_name='Authority Key Identifier'),
+        ),
+        migrations.AddField(
+            model_name='certificateauthority',
+            name='distinguished_name',
+            field=models.TextField(blank=True, default='', editable=False, verbose_name='Distinguished Name'),
+        ),
+        migrations.AddField(
+            model_name='certificateauthority',
+            name='fingerprint_sha256',
+            field=models.CharField(blank=True, default='', editable=False, max_length=95, verbose_name='SHA-256 fingerprint'),
+        ),
+        migrations.AddField(
+            model_name='certificateauthority',
+            name='key_size',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Key size'),
+        ),
+        migrations.AddField(
+            model_name='certificateauthority',
+            name='key_type',
+            field=models.CharField(blank=True, default='', editable=False, max_length=8, verbose_name='Key type'),
+        ),
+        migrations.AddField(
+            model_name='certificateauthority',
+            name='revoked_reason_code',
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, null=True, verbose_name='Reason code for revocation'),
+        ),
+        migrations.AddField(
+            model_name='certificateauthority',
+            name='subject_alt_names',
+            field=models.TextField(blank=True, default='', editable=False, help_text='Subject alternative names, one per line.'),
+        ),
+        migrations.AddField(
+            model_name='certificateauthority',
+            name='subject_key_identifier',
+            field=models.CharField(blank=True, default='', editable=False, max_length=128, verbose_name='Subject Key Identifier'),
+        ),
+        migrations.AddField(
+            model_name='certificateauthority',
+            name='valid_from',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Valid from'),
+        ),
+        migrations.RunPython(set_revoked_reason_codes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 2.1 on 2018-10-20 12:00
+
+import base64
+
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def pem_to_der(pem):
+    lines = [l for l in pem.strip().splitlines() if l and not l.startswith('-----')]
+    return base64.b64decode(''.join(lines))
+
+
+def convert_to_der(apps, schema_editor):
+    for model in ['Certificate', 'CertificateAuthority']:
+        Model = apps.get_model('django_ca', model)
+        qs = Model.objects.filter(der__isnull=True).order_by('pk')
+        last_pk = 0
+
+        # Convert in batches, so that not all certificates are loaded into memory at once
+        while True:
+            rows = list(qs.filter(pk__gt=last_pk).values_list('pk', 'pub')[:BATCH_SIZE])
+            if not rows:
+                break
+
+            for pk, pub in rows:
+                Model.objects.filter(pk=pk).update(der=pem_to_der(pub))
+            last_pk = rows[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_ca', '0012_auto_20181019_1200'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='certificate',
+            name='der',
+            field=models.BinaryField(help_text='The certificate in DER format.', null=True),
+        ),
+        migrations.AddField(
+            model_name='certificateauthority',
+            name='der',
+            field=models.BinaryField(help_text='The certificate in DER format.', null=True),
+        ),
+        migrations.RunPython(convert_to_der, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 2.1 on 2018-10-21 12:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_ca', '0013_auto_20181020_1200'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExpiryNotification',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('threshold', models.PositiveSmallIntegerField(help_text='Number of days before expiry that triggered the notification.', verbose_name='Threshold')),
+                ('sent', models.DateTimeField(auto_now_add=True, verbose_name='Sent')),
+                ('cert', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='expiry_notifications', to='django_ca.Certificate', verbose_name='Certificate')),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='expirynotification',
+            unique_together={('cert', 'threshold')},
+        ),
+    ]
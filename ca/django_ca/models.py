@@ -16,7 +16,11 @@
 import base64
 import binascii
 import hashlib
+import hmac
+import os
 import re
+import threading
+import time
 from collections import OrderedDict
 from datetime import datetime
 from datetime import timedelta
@@ -26,6 +30,9 @@ import pytz
 from cryptography import x509
 from cryptography.hazmat.backends import default_backend
 from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import dsa
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.hazmat.primitives.asymmetric import rsa
 from cryptography.hazmat.primitives.serialization import Encoding
 from cryptography.hazmat.primitives.serialization import PublicFormat
 from cryptography.hazmat.primitives.serialization import load_pem_private_key
@@ -35,6 +42,9 @@ from cryptography.x509.oid import ExtensionOID
 
 from django.conf import settings
 from django.db import models
+from django.db import transaction
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
 from django.utils import timezone
 from django.utils.encoding import force_bytes
 from django.utils.encoding import force_str
@@ -54,8 +64,39 @@ from .utils import add_colons
 from .utils import format_general_name
 from .utils import format_general_names
 from .utils import format_name
+from .utils import hex_to_int
 from .utils import int_to_hex
 from .utils import multiline_url_validator
+from .utils import normalize_serial
+
+try:
+    from cryptography.hazmat.primitives.asymmetric import ed25519
+except ImportError:  # pragma: no cover - cryptography<2.6, new Ed25519 CAs require >=2.8 (see django_ca.keys)
+    ed25519 = None
+
+# Per-process cache for private keys of certificate authorities, see CertificateAuthority.key(). Keys are
+# stored by serial together with the path and mtime of the key file, a digest of the password and the time
+# when the key was loaded. The most recently used keys are at the end of the dictionary.
+_key_cache = OrderedDict()
+_key_cache_lock = threading.Lock()
+
+
+def _password_digest(password):
+    if password is None:
+        return b''
+    return hashlib.sha256(b'password:' + force_bytes(password)).digest()
+
+
+def clear_key_cache(serial=None):
+    """Clear the per-process cache of private keys.
+
+    If ``serial`` is given, only the key of the certificate authority with the given serial is removed.
+    """
+    with _key_cache_lock:
+        if serial is None:
+            _key_cache.clear()
+        else:
+            _key_cache.pop(serial, None)
 
 
 class Watcher(models.Model):
@@ -103,12 +144,29 @@ class X509CertMixin(models.Model):
         ('unspecified', _('Unspecified')),
     )
 
+    # reason codes as defined in RFC 5280, section 5.3.1
+    REVOCATION_REASON_CODES = {
+        'unspecified': 0,
+        'key_compromise': 1,
+        'ca_compromise': 2,
+        'affiliation_changed': 3,
+        'superseded': 4,
+        'cessation_of_operation': 5,
+        'certificate_hold': 6,
+        'remove_from_crl': 8,
+        'privilege_withdrawn': 9,
+        'aa_compromise': 10,
+    }
+
     created = models.DateTimeField(auto_now=True)
     expires = models.DateTimeField(null=False, blank=False)
 
     pub = models.TextField(verbose_name=_('Public key'))
+    der = models.BinaryField(null=True, help_text=_('The certificate in DER format.'))
     cn = models.CharField(max_length=128, verbose_name=_('CommonName'))
     serial = models.CharField(max_length=64, unique=True)
+    serial_hex = models.CharField(max_length=64, db_index=True, default='', editable=False,
+                                  help_text=_('The serial as hex without colons, used for fast lookups.'))
 
     # revocation information
     revoked = models.BooleanField(default=False)
@@ -116,19 +174,50 @@ class X509CertMixin(models.Model):
     revoked_reason = models.CharField(
         max_length=32, null=True, blank=True, verbose_name=_('Reason for revokation'),
         choices=REVOCATION_REASONS)
+    revoked_reason_code = models.PositiveSmallIntegerField(
+        null=True, blank=True, editable=False, verbose_name=_('Reason code for revocation'))
+
+    # Values of the certificate stored in the database so they can be read without parsing the certificate.
+    # They are set whenever the x509 property is set, use "manage.py backfill_metadata" for older rows.
+    valid_from = models.DateTimeField(null=True, blank=True, editable=False, verbose_name=_('Valid from'))
+    distinguished_name = models.TextField(blank=True, default='', editable=False,
+                                          verbose_name=_('Distinguished Name'))
+    subject_alt_names = models.TextField(blank=True, default='', editable=False,
+                                         help_text=_('Subject alternative names, one per line.'))
+    key_type = models.CharField(max_length=8, blank=True, default='', editable=False,
+                                verbose_name=_('Key type'))
+    key_size = models.PositiveIntegerField(null=True, blank=True, editable=False, verbose_name=_('Key size'))
+    fingerprint_sha256 = models.CharField(max_length=95, blank=True, default='', editable=False,
+                                          verbose_name=_('SHA-256 fingerprint'))
+    subject_key_identifier = models.CharField(max_length=128, blank=True, default='', editable=False,
+                                              verbose_name=_('Subject Key Identifier'))
+    authority_key_identifier = models.CharField(max_length=128, blank=True, default='', editable=False,
+                                                verbose_name=_('Authority Key Identifier'))
 
     _x509 = None
 
+    def _get_der(self):
+        # Most database backends return a memoryview for BinaryFields, but cryptography (before 2.5) and
+        # asn1crypto only load certificates from bytes. Convert the buffer only once, so that x509 and
+        # dump_certificate() do not copy it again on every call.
+        if self.der is not None and not isinstance(self.der, bytes):
+            self.der = bytes(self.der)
+        return self.der
+
     @property
     def x509(self):
         if self._x509 is None:
             backend = default_backend()
-            self._x509 = x509.load_pem_x509_certificate(force_bytes(self.pub), backend)
+            if self.der is not None:
+                self._x509 = x509.load_der_x509_certificate(self._get_der(), backend)
+            else:
+                self._x509 = x509.load_pem_x509_certificate(force_bytes(self.pub), backend)
         return self._x509
 
     @x509.setter
     def x509(self, value):
         self._x509 = value
+        self.der = value.public_bytes(encoding=Encoding.DER)
         self.pub = force_str(self.dump_certificate(Encoding.PEM))
         self.cn = self.subject['CN']
         self.expires = self.not_after
@@ -136,7 +225,49 @@ class X509CertMixin(models.Model):
             self.expires = timezone.make_aware(self.expires, timezone=pytz.utc)
 
         self.serial = int_to_hex(value.serial_number)
+        self.serial_hex = normalize_serial(value.serial_number)
+
+        self.valid_from = value.not_valid_before
+        if settings.USE_TZ:
+            self.valid_from = timezone.make_aware(self.valid_from, timezone=pytz.utc)
+        self.distinguished_name = format_name(value.subject)
+        self.fingerprint_sha256 = add_colons(binascii.hexlify(value.fingerprint(hashes.SHA256())).upper()
+                                             .decode('utf-8'))
+
+        public_key = value.public_key()
+        if isinstance(public_key, rsa.RSAPublicKey):
+            self.key_type, self.key_size = 'RSA', public_key.key_size
+        elif isinstance(public_key, dsa.DSAPublicKey):
+            self.key_type, self.key_size = 'DSA', public_key.key_size
+        elif isinstance(public_key, ec.EllipticCurvePublicKey):
+            self.key_type, self.key_size = 'ECC', public_key.curve.key_size
+        elif ed25519 is not None and isinstance(public_key, ed25519.Ed25519PublicKey):
+            self.key_type, self.key_size = 'Ed25519', 256
+        else:  # pragma: no cover - we only support the above key types
+            self.key_type, self.key_size = '', None
 
+        try:
+            ext = value.extensions.get_extension_for_oid(ExtensionOID.SUBJECT_ALTERNATIVE_NAME)
+            self.subject_alt_names = '\n'.join([format_general_name(name) for name in ext.value])
+        except x509.ExtensionNotFound:
+            self.subject_alt_names = ''
+
+        try:
+            ext = value.extensions.get_extension_for_oid(ExtensionOID.SUBJECT_KEY_IDENTIFIER)
+            self.subject_key_identifier = add_colons(
+                binascii.hexlify(ext.value.digest).upper().decode('utf-8'))
+        except x509.ExtensionNotFound:
+            self.subject_key_identifier = ''
+
+        try:
+            ext = value.extensions.get_extension_for_oid(ExtensionOID.AUTHORITY_KEY_IDENTIFIER)
+            self.authority_key_identifier = add_colons(
+                binascii.hexlify(ext.value.key_identifier or b'').upper().decode('utf-8'))
+        except x509.ExtensionNotFound:
+            self.authority_key_identifier = ''
+
+    # NOTE: subject and issuer still parse the certificate: The stored distinguished name does not preserve
+    #       the order and quoting of the subject and the issuer is not stored at all.
     @property
     def subject(self):
         return OrderedDict([(OID_NAME_MAPPINGS[s.oid], s.value) for s in self.x509.subject])
@@ -147,7 +278,11 @@ class X509CertMixin(models.Model):
 
     @property
     def not_before(self):
-        return self.x509.not_valid_before
+        if self.valid_from is None:
+            return self.x509.not_valid_before
+        if timezone.is_aware(self.valid_from):
+            return timezone.make_naive(self.valid_from, timezone=pytz.utc)
+        return self.valid_from
 
     @property
     def not_after(self):
@@ -164,10 +299,16 @@ class X509CertMixin(models.Model):
                 yield name, str(ext.value)
 
     def distinguishedName(self):
+        if self.distinguished_name:
+            return self.distinguished_name
         return format_name(self.x509.subject)
     distinguishedName.short_description = 'Distinguished Name'
 
     def subjectAltName(self):
+        # django-ca never adds a critical subjectAltName, so the stored names are sufficient
+        if self.subject_alt_names:
+            return False, self.subject_alt_names.splitlines()
+
         try:
             ext = self.x509.extensions.get_extension_for_oid(ExtensionOID.SUBJECT_ALTERNATIVE_NAME)
         except x509.ExtensionNotFound:
@@ -175,9 +316,9 @@ class X509CertMixin(models.Model):
 
         return ext.critical, [format_general_name(name) for name in ext.value]
 
-    def crlDistributionPoints(self):
+    def _distribution_points(self, oid):
         try:
-            ext = self.x509.extensions.get_extension_for_oid(ExtensionOID.CRL_DISTRIBUTION_POINTS)
+            ext = self.x509.extensions.get_extension_for_oid(oid)
         except x509.ExtensionNotFound:
             return None
 
@@ -190,6 +331,12 @@ class X509CertMixin(models.Model):
 
         return ext.critical, value
 
+    def crlDistributionPoints(self):
+        return self._distribution_points(ExtensionOID.CRL_DISTRIBUTION_POINTS)
+
+    def freshestCRL(self):
+        return self._distribution_points(ExtensionOID.FRESHEST_CRL)
+
     def authorityInfoAccess(self):
         try:
             ext = self.x509.extensions.get_extension_for_oid(ExtensionOID.AUTHORITY_INFORMATION_ACCESS)
@@ -247,6 +394,10 @@ class X509CertMixin(models.Model):
         return ext.critical, [EXTENDED_KEY_USAGE_REVERSED[u] for u in ext.value]
 
     def subjectKeyIdentifier(self):
+        # RFC 5280, section 4.2.1.2: The extension MUST be marked as non-critical
+        if self.subject_key_identifier:
+            return False, self.subject_key_identifier
+
         try:
             ext = self.x509.extensions.get_extension_for_oid(ExtensionOID.SUBJECT_KEY_IDENTIFIER)
         except x509.ExtensionNotFound:  # pragma: no cover - extension should always be present
@@ -264,6 +415,10 @@ class X509CertMixin(models.Model):
         return ext.critical, format_general_names(ext.value)
 
     def authorityKeyIdentifier(self):
+        # RFC 5280, section 4.2.1.1: The extension MUST be marked as non-critical
+        if self.authority_key_identifier:
+            return False, 'keyid:%s' % self.authority_key_identifier
+
         try:
             ext = self.x509.extensions.get_extension_for_oid(ExtensionOID.AUTHORITY_KEY_IDENTIFIER)
         except x509.ExtensionNotFound:  # pragma: no cover - extension should always be present
@@ -290,6 +445,9 @@ class X509CertMixin(models.Model):
         return ext.critical, features
 
     def get_digest(self, algo):
+        if algo.upper() == 'SHA256' and self.fingerprint_sha256:
+            return self.fingerprint_sha256
+
         algo = getattr(hashes, algo.upper())()
         return add_colons(binascii.hexlify(self.x509.fingerprint(algo)).upper().decode('utf-8'))
 
@@ -303,6 +461,8 @@ class X509CertMixin(models.Model):
         return base64.b64encode(public_key_hash).decode('utf-8')
 
     def dump_certificate(self, encoding=Encoding.PEM):
+        if encoding == Encoding.DER and self.der is not None:
+            return self._get_der()  # no need to parse the certificate
         return self.x509.public_bytes(encoding=encoding)
 
     def revoke(self, reason=None):
@@ -311,6 +471,7 @@ class X509CertMixin(models.Model):
         self.revoked = True
         self.revoked_date = timezone.now()
         self.revoked_reason = reason
+        self.revoked_reason_code = self.REVOCATION_REASON_CODES.get(reason)
         self.save()
 
         post_revoke_cert.send(sender=self.__class__, cert=self)
@@ -322,7 +483,7 @@ class X509CertMixin(models.Model):
             raise ValueError('Certificate is not revoked.')
 
         revoked_cert = x509.RevokedCertificateBuilder().serial_number(
-            self.x509.serial_number).revocation_date(self.revoked_date)
+            hex_to_int(self.serial)).revocation_date(self.revoked_date)
 
         if self.revoked_reason:
             reason_flag = getattr(x509.ReasonFlags, self.revoked_reason)
@@ -356,6 +517,9 @@ class CertificateAuthority(X509CertMixin):
     crl_url = models.TextField(blank=True, null=True, validators=[multiline_url_validator],
                                verbose_name=_('CRL URLs'),
                                help_text=_("URLs, one per line, where you can retrieve the CRL."))
+    delta_crl_url = models.TextField(
+        blank=True, null=True, validators=[multiline_url_validator], verbose_name=_('Delta CRL URLs'),
+        help_text=_("URLs, one per line, where you can retrieve the delta CRL."))
     issuer_url = models.URLField(blank=True, null=True, verbose_name=_('Issuer URL'),
                                  help_text=_("URL to the certificate of this CA (in DER format)."))
     ocsp_url = models.URLField(blank=True, null=True, verbose_name=_('OCSP responder URL'),
@@ -363,16 +527,74 @@ class CertificateAuthority(X509CertMixin):
     issuer_alt_name = models.URLField(blank=True, null=True, verbose_name=_('issuerAltName'),
                                       help_text=_("URL for your CA."))
 
+    # CRL numbers, see RFC 5280, section 5.2.3 and 5.2.4
+    crl_number = models.PositiveIntegerField(
+        default=0, help_text=_("Number of the last CRL issued by this CA."))
+    base_crl_number = models.PositiveIntegerField(
+        null=True, blank=True, help_text=_("Number of the last complete CRL issued by this CA."))
+    base_crl_date = models.DateTimeField(
+        null=True, blank=True, help_text=_("When the last complete CRL was issued by this CA."))
+
     _key = None
 
     def key(self, password):
-        if self._key is None:
-            with open(self.private_key_path, 'rb') as f:
-                key_data = f.read()
+        """Get the private key of this certificate authority.
 
-            self._key = load_pem_private_key(key_data, password, default_backend())
+        Unless the ``CA_KEY_CACHE`` setting is ``False``, loaded keys are also cached per process until the
+        key file is modified or ``CA_KEY_CACHE_TIMEOUT`` seconds have passed. A cached key is only returned
+        if the same password is passed.
+        """
+        if self._key is None:
+            if ca_settings.CA_KEY_CACHE:
+                self._key = self._get_cached_key(password)
+            else:
+                self._key = self._load_key(password)
         return self._key
 
+    def _load_key(self, password):
+        with open(self.private_key_path, 'rb') as f:
+            key_data = f.read()
+
+        return load_pem_private_key(key_data, password, default_backend())
+
+    def _get_cached_key(self, password):
+        mtime = os.path.getmtime(self.private_key_path)
+        digest = _password_digest(password)
+        now = time.time()
+
+        with _key_cache_lock:
+            cached = _key_cache.pop(self.serial, None)
+            if cached is not None:
+                path, cached_mtime, cached_digest, loaded, key = cached
+                if path == self.private_key_path and cached_mtime == mtime \
+                        and now - loaded < ca_settings.CA_KEY_CACHE_TIMEOUT \
+                        and hmac.compare_digest(cached_digest, digest):
+                    _key_cache[self.serial] = cached  # now the most recently used key
+                    return key
+
+        # Load the key without holding the lock, decrypting the key may take a long time
+        key = self._load_key(password)
+
+        with _key_cache_lock:
+            _key_cache[self.serial] = (self.private_key_path, mtime, digest, now, key)
+            while len(_key_cache) > ca_settings.CA_KEY_CACHE_SIZE:
+                _key_cache.popitem(last=False)
+        return key
+
+    def get_next_crl_number(self):
+        """Increment the CRL number of this CA and return the new value.
+
+        The counter is stored in the database, so CRL numbers are monotonically increasing even if CRLs are
+        generated by multiple processes.
+        """
+        with transaction.atomic():
+            number = CertificateAuthority.objects.select_for_update().values_list(
+                'crl_number', flat=True).get(pk=self.pk) + 1
+            CertificateAuthority.objects.filter(pk=self.pk).update(crl_number=number)
+
+        self.crl_number = number
+        return number
+
     @property
     def pathlen(self):
         try:
@@ -428,6 +650,11 @@ class CertificateAuthority(X509CertMixin):
         return self.name
 
 
+@receiver(post_delete, sender=CertificateAuthority)
+def _invalidate_cached_key(sender, instance, **kwargs):
+    clear_key_cache(instance.serial)
+
+
 class Certificate(X509CertMixin):
     objects = CertificateManager.from_queryset(CertificateQuerySet)()
 
@@ -468,5 +695,33 @@ class Certificate(X509CertMixin):
 
         return Certificate.objects.init(self.ca, self.csr, **kwargs)
 
+    class Meta:
+        indexes = [
+            # used by CRLs and OCSP responders (certificates of a CA by revocation status)
+            models.Index(fields=['ca', 'revoked', 'expires']),
+            # used by valid()/expired() and when looking for expiring certificates
+            models.Index(fields=['expires']),
+        ]
+
     def __str__(self):
         return self.cn
+
+
+class ExpiryNotification(models.Model):
+    """Records that watchers of a certificate were notified that it will expire soon.
+
+    ``threshold`` is the value from :ref:`CA_NOTIFICATION_DAYS <settings-ca-notification-days>` that
+    triggered the notification.
+    """
+
+    cert = models.ForeignKey(Certificate, on_delete=models.CASCADE, related_name='expiry_notifications',
+                             verbose_name=_('Certificate'))
+    threshold = models.PositiveSmallIntegerField(verbose_name=_('Threshold'), help_text=_(
+        'Number of days before expiry that triggered the notification.'))
+    sent = models.DateTimeField(auto_now_add=True, verbose_name=_('Sent'))
+
+    class Meta:
+        unique_together = (('cert', 'threshold'), )
+
+    def __str__(self):
+        return '%s (%s days)' % (self.cert, self.threshold)
@@ -13,35 +13,942 @@
 # You should have received a copy of the GNU General Public License along with django-ca.  If not,
 # see <http://www.gnu.org/licenses/>.
 
+import binascii
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime
+from datetime import timedelta
+
+from asn1crypto import core
+from asn1crypto import ocsp
+from asn1crypto import x509
+from asn1crypto.util import timezone as asn1_timezone
+from cryptography.hazmat.primitives.serialization import Encoding
+from oscrypto import asymmetric
+from oscrypto.asymmetric import load_certificate
+from oscrypto.asymmetric import load_private_key
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db.models import Case
+from django.db.models import TextField
+from django.db.models import Value
+from django.db.models import When
+from django.db.models.signals import post_delete
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.encoding import force_text
+from django.urls import get_resolver
+from django.utils.module_loading import import_string
+
+from . import ca_settings
+from .models import Certificate
+from .models import CertificateAuthority
+from .signals import post_create_ca
+from .signals import post_issue_cert
+from .signals import post_revoke_cert
+from .utils import hex_to_int
+from .utils import normalize_serial
+
+try:
+    import anydbm as dbm  # pragma: only py2
+except ImportError:  # pragma: only py3
+    import dbm
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+log = logging.getLogger(__name__)
 
 # We need a two-letter year, otherwise OCSP doesn't work
 date_format = '%y%m%d%H%M%SZ'
 
+# Per-process caches for parsed responder keys/certificates, CAs and CA certificates. Keys loaded from files
+# are stored together with the mtime of the file, so they are reloaded as soon as the file changes.
+_responder_keys = {}
+_responder_certs = {}
+_cas = {}
+_ca_certs = {}
+_status_indexes = {}
+_status_indexes_lock = threading.Lock()
+
+# Response stores used by any OCSPView, see register_response_store()
+_response_stores = {}
+_warned_cache_aliases = set()
+
+
+def clear_caches():
+    """Clear all cached responder keys/certificates, CAs and CA certificates."""
+
+    _responder_keys.clear()
+    _responder_certs.clear()
+    _cas.clear()
+    _ca_certs.clear()
+    _status_indexes.clear()
+
+
+def _load_file(cache, path, loader):
+    mtime = os.path.getmtime(path)
+    cached = cache.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    with open(path, 'rb') as stream:
+        loaded = loader(stream.read())
+
+    cache[path] = (mtime, loaded)
+    return loaded
+
+
+def _load_responder_key(data):
+    # oscrypto cannot sign with any other key type (e.g. Ed25519)
+    msg = 'OCSP responder keys must be RSA, DSA or elliptic curve keys'
+
+    try:
+        key = load_private_key(data)
+    except (KeyError, ValueError) as e:  # asn1crypto<1.0 raises KeyError for unknown key types
+        raise ValueError('%s: %s' % (msg, e))
+
+    if key.algorithm not in ('rsa', 'dsa', 'ec'):  # pragma: no cover - oscrypto does not load other keys
+        raise ValueError('%s: %s' % (msg, key.algorithm))
+    return key
+
+
+def get_responder_key(path):
+    """Get the private key used for signing OCSP responses.
+
+    The key is loaded from ``path`` and cached until the file is modified. Only RSA, DSA and elliptic curve
+    keys are supported, a ``ValueError`` is raised for any other key type (e.g. Ed25519).
+    """
+    return _load_file(_responder_keys, path, _load_responder_key)
+
+
+def get_responder_cert(value):
+    """Get the certificate used for signing OCSP responses.
+
+    ``value`` may either be a path to a file or the serial of a certificate in the database. Certificates
+    loaded from a file are cached until the file is modified, certificates from the database are cached until
+    the certificate is modified.
+    """
+    if os.path.exists(value):
+        return _load_file(_responder_certs, value, load_certificate)
+
+    serial = normalize_serial(value)
+    cached = _responder_certs.get(serial)
+    if cached is None:
+        cert = Certificate.objects.get(serial_hex=serial)
+        cached = _responder_certs[serial] = (None, load_certificate(cert.dump_certificate(Encoding.DER)))
+    return cached[1]
+
+
+def get_ca_cert(ca):
+    """Get the certificate of the given CA as loaded by oscrypto.
+
+    The parsed certificate is cached for as long as the public key stored in the database does not change.
+    """
+    cached = _ca_certs.get(ca.serial)
+    if cached is None or cached[0] != ca.pub:
+        cached = _ca_certs[ca.serial] = (ca.pub, load_certificate(ca.dump_certificate(Encoding.DER)))
+    return cached[1]
+
+
+def get_ca(identifier, timeout=60):
+    """Get the certificate authority identified by ``identifier`` (a serial or common name).
+
+    The CA is cached per process for ``timeout`` seconds. Saving or deleting a CA in this process clears the
+    cache right away, changes made by other processes are used once the cached CA has expired.
+    """
+    cached = _cas.get(identifier)
+    if cached is None or cached[0] + timeout <= time.time():
+        ca = CertificateAuthority.objects.get_by_serial_or_cn(identifier)
+        cached = _cas[identifier] = (time.time(), ca)
+    return cached[1]
+
+
+def get_ocsp_status(revoked, revoked_reason):
+    """Get the OCSP status from the database columns, see ``X509CertMixin.ocsp_status``."""
+
+    if revoked is False:
+        return 'good'
+    return revoked_reason or 'revoked'
+
+
+def get_cert_statuses(ca, serials, ca_ocsp=False):
+    """Get the OCSP status of the given certificates with a single database query.
+
+    No model instances are created, only the required columns are fetched.
+
+    Parameters
+    ----------
+
+    ca : :py:class:`~django_ca.models.CertificateAuthority`
+    serials : list of str
+        The hex serials (as returned by :py:func:`~django_ca.utils.normalize_serial`) to look up.
+    ca_ocsp : bool, optional
+        Look up child CAs instead of certificates.
+
+    Returns
+    -------
+
+    dict
+        A dictionary mapping the hex serial to a ``(status, revocation_date)`` tuple. Unknown serials are not
+        included.
+    """
+    # Certificates are selected by serial only and the CA is compared in Python, as some databases would
+    # otherwise use the (ca, revoked, expires) index and scan all certificates of the CA.
+    if ca_ocsp is True:
+        qs = CertificateAuthority.objects.values_list('parent_id', 'serial_hex', 'revoked', 'revoked_date',
+                                                      'revoked_reason')
+    else:
+        qs = Certificate.objects.values_list('ca_id', 'serial_hex', 'revoked', 'revoked_date',
+                                             'revoked_reason')
+    qs = qs.filter(serial_hex__in=serials)
+    return {serial: (get_ocsp_status(revoked, revoked_reason), revoked_date)
+            for ca_id, serial, revoked, revoked_date, revoked_reason in qs if ca_id == ca.pk}
+
+
+class StatusIndex(object):
+    """Per-process in-memory index of the OCSP status of all certificates (or child CAs) of a CA.
+
+    The index stores the serials of all known certificates as integers and the revocation reason and date of
+    revoked certificates, so the status of a certificate can be looked up without accessing the database.
+    The index is updated when a certificate is issued, revoked or deleted in this process and reloaded from
+    the database every ``timeout`` seconds to include changes made by other processes.
+
+    Parameters
+    ----------
+
+    ca_id : int
+        The primary key of the certificate authority.
+    ca_ocsp : bool, optional
+        Index child CAs instead of certificates.
+    timeout : int, optional
+        Seconds after which the index is reloaded from the database.
+    """
+
+    def __init__(self, ca_id, ca_ocsp=False, timeout=60):
+        self.ca_id = ca_id
+        self.ca_ocsp = ca_ocsp
+        self.timeout = timeout
+        self.serials = set()
+        self.revoked = {}
+        self.loaded = None
+        self._lock = threading.Lock()
+
+    def get_queryset(self):
+        if self.ca_ocsp is True:
+            return CertificateAuthority.objects.filter(parent_id=self.ca_id)
+        return Certificate.objects.filter(ca_id=self.ca_id)
+
+    def load(self):
+        """Load the index from the database.
+
+        The new index replaces the previous one only when it is completely loaded, so other threads can
+        continue to use the previous index in the meantime.
+        """
+        loaded = time.time()
+        serials = set()
+        revoked = {}
+
+        qs = self.get_queryset().values_list('serial_hex', 'revoked', 'revoked_date', 'revoked_reason')
+        for serial, is_revoked, revoked_date, revoked_reason in qs.iterator():
+            serial = int(serial, 16)
+            serials.add(serial)
+            if is_revoked is True:
+                revoked[serial] = (get_ocsp_status(is_revoked, revoked_reason), revoked_date)
+
+        self.serials, self.revoked, self.loaded = serials, revoked, loaded
+
+    def reconcile(self):
+        """Reload the index if it was loaded more than ``timeout`` seconds ago.
+
+        Only one thread reloads the index, other threads continue to use the current index. If the index was
+        never loaded, all threads wait for it to be loaded.
+        """
+        if self.loaded is not None and self.loaded + self.timeout > time.time():
+            return
+
+        if self._lock.acquire(self.loaded is None):
+            try:
+                if self.loaded is None or self.loaded + self.timeout <= time.time():
+                    self.load()
+            finally:
+                self._lock.release()
+
+    def add(self, cert):
+        """Add or update the given certificate or child CA."""
+
+        serial = hex_to_int(cert.serial)
+        self.serials.add(serial)
+        if cert.revoked is True:
+            self.revoked[serial] = (cert.ocsp_status, cert.revoked_date)
+        else:
+            self.revoked.pop(serial, None)
+
+    def remove(self, cert):
+        """Remove the given certificate or child CA."""
+
+        serial = hex_to_int(cert.serial)
+        self.serials.discard(serial)
+        self.revoked.pop(serial, None)
+
+    def get_statuses(self, serials):
+        """Get the OCSP status of the given certificates.
+
+        Returns the same values as :py:func:`~django_ca.ocsp.get_cert_statuses`.
+        """
+        self.reconcile()
+
+        statuses = {}
+        for serial_hex in serials:
+            serial = int(serial_hex, 16)
+            if serial in self.serials:
+                statuses[serial_hex] = self.revoked.get(serial, ('good', None))
+        return statuses
+
+
+def get_status_index(ca, ca_ocsp=False, timeout=60):
+    """Get the in-memory status index for the given CA, see :py:class:`~django_ca.ocsp.StatusIndex`.
+
+    The index is created once per process and loaded from the database when it is first used.
+    """
+    key = (ca.pk, ca_ocsp)
+    index = _status_indexes.get(key)
+    if index is None:
+        with _status_indexes_lock:
+            index = _status_indexes.get(key)
+            if index is None:
+                index = _status_indexes[key] = StatusIndex(ca.pk, ca_ocsp=ca_ocsp, timeout=timeout)
+    return index
+
+
+def _make_extension(name, value):
+    return {
+        'extn_id': name,
+        'critical': False,
+        'extn_value': value,
+    }
+
+
+def get_cert_status(status, revocation_date):
+    """Get the ``CertStatus`` for the given OCSP status (see ``X509CertMixin.ocsp_status``)."""
+
+    if status == 'good':
+        return ocsp.CertStatus(name='good', value=core.Null())
+    elif status == 'unknown':
+        return ocsp.CertStatus(name='unknown', value=core.Null())
+
+    return ocsp.CertStatus(name='revoked', value={
+        'revocation_time': revocation_date,
+        'revocation_reason': status if status != 'revoked' else 'unspecified',
+    })
+
+
+def build_response(statuses, ca_cert, responder_key, responder_cert, expires, nonce=None,
+                   hash_algo='sha256', key_hash_algo='sha1'):
+    """Build a signed OCSP response with a ``SingleResponse`` for every given certificate.
+
+    This mostly does the same as :py:class:`ocspbuilder.OCSPResponseBuilder`, except that any number of
+    certificates are included in the response, so a request for multiple certificates requires just a single
+    signature.
+
+    Parameters
+    ----------
+
+    statuses : list
+        A list of ``(serial, status, revocation_date)`` tuples, where ``serial`` is the serial as ``int``
+        and ``status`` is the value of :py:attr:`~django_ca.models.X509CertMixin.ocsp_status`.
+    ca_cert : :py:class:`oscrypto.asymmetric.Certificate`
+        The certificate of the CA that issued the certificates.
+    responder_key : :py:class:`oscrypto.asymmetric.PrivateKey`
+        The private key used for signing the response, must be an RSA, DSA or elliptic curve key.
+    responder_cert : :py:class:`oscrypto.asymmetric.Certificate`
+        The certificate of the responder, it is included in the response.
+    expires : int
+        Seconds until the response expires.
+    nonce : bytes, optional
+        The nonce received in the request.
+
+    Returns
+    -------
+
+    :py:class:`asn1crypto.ocsp.OCSPResponse`
+    """
+    ca_cert = ca_cert.asn1
+    responder_cert = responder_cert.asn1
+
+    issuer_name_hash = getattr(ca_cert.subject, key_hash_algo)
+    issuer_key_hash = getattr(ca_cert.public_key, key_hash_algo)
+    single_extensions = [_make_extension('certificate_issuer', [
+        x509.GeneralName(name='directory_name', value=ca_cert.subject),
+    ])]
+
+    this_update = datetime.now(asn1_timezone.utc)
+    next_update = this_update + timedelta(seconds=expires)
+
+    responses = []
+    for serial, status, revocation_date in statuses:
+        responses.append({
+            'cert_id': {
+                'hash_algorithm': {'algorithm': key_hash_algo},
+                'issuer_name_hash': issuer_name_hash,
+                'issuer_key_hash': issuer_key_hash,
+                'serial_number': serial,
+            },
+            'cert_status': get_cert_status(status, revocation_date),
+            'this_update': this_update,
+            'next_update': next_update,
+            'single_extensions': single_extensions,
+        })
+
+    response_extensions = None
+    if nonce is not None:
+        response_extensions = [_make_extension('nonce', nonce)]
+
+    response_data = ocsp.ResponseData({
+        'responder_id': ocsp.ResponderId(name='by_key',
+                                         value=getattr(responder_cert.public_key, key_hash_algo)),
+        'produced_at': this_update,
+        'responses': responses,
+        'response_extensions': response_extensions,
+    })
+
+    if responder_key.algorithm == 'rsa':
+        sign_func = asymmetric.rsa_pkcs1v15_sign
+        signature_algo = 'rsa'
+    elif responder_key.algorithm == 'dsa':
+        sign_func = asymmetric.dsa_sign
+        signature_algo = 'dsa'
+    elif responder_key.algorithm == 'ec':
+        sign_func = asymmetric.ecdsa_sign
+        signature_algo = 'ecdsa'
+    else:
+        raise ValueError('%s: Unsupported algorithm for OCSP responder keys.' % responder_key.algorithm)
+
+    return ocsp.OCSPResponse({
+        'response_status': 'successful',
+        'response_bytes': {
+            'response_type': 'basic_ocsp_response',
+            'response': {
+                'tbs_response_data': response_data,
+                'signature_algorithm': {'algorithm': '%s_%s' % (hash_algo, signature_algo)},
+                'signature': sign_func(responder_key, response_data.dump(), hash_algo),
+                'certs': [responder_cert],
+            },
+        },
+    })
+
+
+def get_issuer_key_hash(ca):
+    """Get the SHA1 hash of the public key of the CA, as used in the ``CertID`` of OCSP requests."""
+
+    return get_ca_cert(ca).asn1.public_key.sha1
+
+
+class ResponseStore(object):
+    """Base class for stores of pre-generated OCSP responses.
+
+    Responses are identified by the hash of the issuers public key (as sent by the client in the OCSP
+    request) and the serial of the certificate, so no database query is required to find a response.
+    """
+
+    def __init__(self, **options):
+        self.options = options
+
+    def get_key(self, issuer_key_hash, serial):
+        return '%s_%x' % (binascii.hexlify(issuer_key_hash).decode('utf-8'), serial)
+
+    def get(self, issuer_key_hash, serial):  # pragma: no cover
+        """Get the DER encoded response, or ``None`` if no (valid) response is stored."""
+        raise NotImplementedError
+
+    def set(self, issuer_key_hash, serial, response, expires):  # pragma: no cover
+        """Store a DER encoded response that is valid for ``expires`` seconds."""
+        raise NotImplementedError
+
+    def delete(self, issuer_key_hash, serial):  # pragma: no cover
+        raise NotImplementedError
+
+
+class CacheResponseStore(ResponseStore):
+    """Store responses in a Django cache.
+
+    The ``alias`` option names the cache to use (default: ``"default"``). The cache must be shared by all
+    processes (e.g. a database cache or memcached), otherwise responses stored or removed by other processes
+    (e.g. when a certificate is revoked) are not seen. A warning is logged for per-process caches.
+    """
+
+    def __init__(self, **options):
+        super(CacheResponseStore, self).__init__(**options)
+
+        alias = self.options.get('alias', 'default')
+        if alias not in _warned_cache_aliases and isinstance(caches[alias], (LocMemCache, DummyCache)):
+            _warned_cache_aliases.add(alias)
+            log.warning('%s: Cache is not shared between processes, stored OCSP responses may not be removed '
+                        'when a certificate is revoked.', alias)
+
+    @property
+    def cache(self):
+        return caches[self.options.get('alias', 'default')]
+
+    def get_key(self, issuer_key_hash, serial):
+        return 'ocsp_%s' % super(CacheResponseStore, self).get_key(issuer_key_hash, serial)
+
+    def get(self, issuer_key_hash, serial):
+        return self.cache.get(self.get_key(issuer_key_hash, serial))
+
+    def set(self, issuer_key_hash, serial, response, expires):
+        self.cache.set(self.get_key(issuer_key_hash, serial), response, expires)
+
+    def delete(self, issuer_key_hash, serial):
+        self.cache.delete(self.get_key(issuer_key_hash, serial))
+
+
+class FileSystemResponseStore(ResponseStore):
+    """Store responses as files in the directory named by the ``path`` option.
+
+    Files are replaced atomically. The modification time of a file is set to the time when the response
+    expires, so expired responses are never returned.
+    """
+
+    def get_path(self, issuer_key_hash, serial):
+        return os.path.join(self.options['path'], '%s.der' % self.get_key(issuer_key_hash, serial))
+
+    def get(self, issuer_key_hash, serial):
+        path = self.get_path(issuer_key_hash, serial)
+        try:
+            if os.path.getmtime(path) <= time.time():
+                return None
+
+            with open(path, 'rb') as stream:
+                return stream.read()
+        except (IOError, OSError):
+            return None
+
+    def set(self, issuer_key_hash, serial, response, expires):
+        path = self.get_path(issuer_key_hash, serial)
+        if not os.path.exists(self.options['path']):
+            os.makedirs(self.options['path'])
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.options['path'])
+        with os.fdopen(fd, 'wb') as stream:
+            stream.write(response)
+
+        expires = time.time() + expires
+        os.utime(tmp_path, (expires, expires))
+        os.rename(tmp_path, path)
+
+    def delete(self, issuer_key_hash, serial):
+        try:
+            os.remove(self.get_path(issuer_key_hash, serial))
+        except (IOError, OSError):
+            pass
+
+
+def get_response_store(config):
+    """Get a response store from a configuration dictionary.
+
+    The dictionary has a ``"BACKEND"`` key naming the class of the store and an optional ``"OPTIONS"`` key
+    with keyword arguments passed to the class.
+    """
+    return import_string(config['BACKEND'])(**config.get('OPTIONS', {}))
+
+
+def register_response_store(config):
+    """Register a response store, so that stored responses are removed when a certificate is revoked.
+
+    This is called by :py:meth:`OCSPView.as_view() <django_ca.views.OCSPView.as_view>` for every view
+    with a ``response_store``.
+    """
+    _response_stores[json.dumps(config, sort_keys=True, default=str)] = config
+
+
+def get_response_stores():
+    """Get all response stores used by OCSP views.
+
+    This includes stores configured in the ``CA_OCSP_URLS`` setting and stores of views in your own URL
+    configuration, which is loaded to make sure that all views registered their store.
+    """
+    for kwargs in getattr(settings, 'CA_OCSP_URLS', {}).values():
+        if kwargs.get('response_store'):
+            register_response_store(kwargs['response_store'])
+
+    try:
+        get_resolver().url_patterns  # views register their stores when the URL configuration is loaded
+    except Exception as e:
+        log.exception('Could not load URL configuration: %s', e)
+
+    return [get_response_store(config) for config in _response_stores.values()]
+
+
+def store_responses(ca, store, responder_key, responder_cert, expires, serials=None):
+    """Pre-generate signed OCSP responses for all certificates of a CA that are not yet expired.
+
+    Parameters
+    ----------
+
+    ca : :py:class:`~django_ca.models.CertificateAuthority`
+    store : :py:class:`~django_ca.ocsp.ResponseStore`
+        The store to save responses to.
+    responder_key : :py:class:`oscrypto.asymmetric.PrivateKey`
+    responder_cert : :py:class:`oscrypto.asymmetric.Certificate`
+    expires : int
+        Seconds until the responses expire.
+    serials : list of str, optional
+        Only store responses for certificates with the given serials.
+
+    Returns
+    -------
+
+    int
+        The number of responses stored.
+    """
+    ca_cert = get_ca_cert(ca)
+    issuer_key_hash = get_issuer_key_hash(ca)
+
+    qs = Certificate.objects.filter(ca=ca, expires__gt=timezone.now())
+    if serials is not None:
+        qs = qs.filter(serial_hex__in=[normalize_serial(s) for s in serials])
+    qs = qs.values_list('serial_hex', 'revoked', 'revoked_date', 'revoked_reason')
+
+    count = 0
+    for serial, revoked, revoked_date, revoked_reason in qs.iterator():
+        status = get_ocsp_status(revoked, revoked_reason)
+        serial = int(serial, 16)
+        response = build_response([(serial, status, revoked_date)], ca_cert=ca_cert,
+                                  responder_key=responder_key, responder_cert=responder_cert,
+                                  expires=expires)
+        store.set(issuer_key_hash, serial, response.dump(), expires)
+        count += 1
+
+    return count
+
+
+@receiver(post_revoke_cert)
+def _invalidate_stored_response(sender, cert, **kwargs):
+    if not isinstance(cert, Certificate):
+        return
+
+    stores = get_response_stores()
+    if stores:
+        issuer_key_hash = get_issuer_key_hash(cert.ca)
+        serial = hex_to_int(cert.serial)
+        for store in stores:
+            store.delete(issuer_key_hash, serial)
+
+
+@receiver(post_save, sender=Certificate)
+@receiver(post_delete, sender=Certificate)
+def _invalidate_responder_cert(sender, instance, **kwargs):
+    _responder_certs.pop(instance.serial_hex, None)
+
+
+@receiver(post_save, sender=CertificateAuthority)
+@receiver(post_delete, sender=CertificateAuthority)
+def _invalidate_ca_cert(sender, instance, **kwargs):
+    _ca_certs.pop(instance.serial, None)
+
+    # CAs are cached by serial or common name, so we cannot know which entries refer to this CA
+    _cas.clear()
+
+
+@receiver(post_create_ca)
+def _create_index_file(sender, ca, **kwargs):
+    if not ca_settings.CA_OCSP_INDEX_DIR:
+        return
+
+    try:
+        OCSPIndexFile(get_index_path(ca)).rebuild(ca)
+    except Exception as e:
+        log.exception('%s: Could not create OCSP index file: %s', ca.serial, e)
+
+
+@receiver(post_issue_cert)
+@receiver(post_revoke_cert)
+def _update_index_file(sender, cert, **kwargs):
+    if not ca_settings.CA_OCSP_INDEX_DIR or not isinstance(cert, Certificate):
+        return
+
+    try:
+        OCSPIndexFile(get_index_path(cert.ca)).update(cert)
+    except Exception as e:
+        log.exception('%s: Could not update OCSP index file: %s', cert.serial, e)
+
+
+def _get_loaded_status_index(cert):
+    """Get the status index containing ``cert``, or ``None`` if the index does not exist or is not loaded."""
+
+    if isinstance(cert, Certificate):
+        key = (cert.ca_id, False)
+    else:
+        key = (cert.parent_id, True)
+
+    index = _status_indexes.get(key)
+    if index is not None and index.loaded is not None:
+        return index
+
+
+@receiver(post_issue_cert)
+@receiver(post_revoke_cert)
+def _update_status_index(sender, cert, **kwargs):
+    index = _get_loaded_status_index(cert)
+    if index is not None:
+        index.add(cert)
+
+
+@receiver(post_create_ca)
+def _add_ca_to_status_index(sender, ca, **kwargs):
+    index = _get_loaded_status_index(ca)
+    if index is not None:
+        index.add(ca)
+
+
+@receiver(post_delete, sender=Certificate)
+@receiver(post_delete, sender=CertificateAuthority)
+def _remove_from_status_index(sender, instance, **kwargs):
+    index = _get_loaded_status_index(instance)
+    if index is not None:
+        index.remove(instance)
+
+    if sender == CertificateAuthority:  # drop indexes of the deleted CA itself
+        _status_indexes.pop((instance.pk, False), None)
+        _status_indexes.pop((instance.pk, True), None)
+
+
+# Columns used for index files
+_index_fields = ('expires', 'revoked', 'revoked_date', 'revoked_reason', 'serial', 'distinguished_name',
+                 'index_pub')
+
+# Revocation reasons as understood by OpenSSL. OpenSSL does not know all reasons, so only the revocation date
+# is written for the remaining ones.
+_openssl_reasons = {
+    'unspecified': 'unspecified',
+    'key_compromise': 'keyCompromise',
+    'ca_compromise': 'CACompromise',
+    'affiliation_changed': 'affiliationChanged',
+    'superseded': 'superseded',
+    'cessation_of_operation': 'cessationOfOperation',
+    'certificate_hold': 'certificateHold',
+    'remove_from_crl': 'removeFromCRL',
+}
+
+# Width of the revocation date and the longest revocation reason. Index files maintained by OCSPIndexFile
+# reserve this space in every line, so that revoking a certificate does not change the length of its line.
+_revocation_width = len(datetime(2000, 1, 1).strftime(date_format)) + 1 + max(
+    len(reason) for reason in _openssl_reasons.values())
+
+
+def _get_revocation(revoked, revoked_date, revoked_reason):
+    if not revoked:
+        return ''
+
+    revocation = revoked_date.strftime(date_format)
+    if revoked_reason in _openssl_reasons:
+        revocation += ',%s' % _openssl_reasons[revoked_reason]
+    return revocation
+
+
+def _get_index_line(status, expires, revocation, serial, filename, distinguished_name):
+    # Format see: http://pki-tutorial.readthedocs.org/en/latest/cadb.html
+    return '%s\t%s\t%s\t%s\t%s\t%s\n' % (
+        status, expires.strftime(date_format), revocation, serial.replace(':', ''), filename,
+        distinguished_name)
+
+
+def _get_index_queryset(ca, **filters):
+    # The certificate is only selected for rows where the distinguished name is not yet stored (see
+    # "manage.py backfill_metadata"), so it can be parsed without another query for every such row.
+    pub = Case(When(distinguished_name='', then='pub'), default=Value(''), output_field=TextField())
+    return Certificate.objects.filter(ca=ca, **filters).annotate(index_pub=pub).values_list(*_index_fields)
+
+
+def _get_distinguished_name(distinguished_name, pub):
+    if not distinguished_name:  # not yet stored, parse the certificate selected by _get_index_queryset()
+        distinguished_name = Certificate(pub=pub).distinguishedName()
+    return distinguished_name
+
 
 def get_index(ca):
-    now = datetime.utcnow()
+    """Generate the lines of an index file for ``openssl ocsp`` for all certificates of the given CA.
 
-    # Write index file (required by "openssl ocsp")
-    for cert in ca.certificate_set.all():
+    Certificates are streamed from the database and only the required columns are fetched, so no
+    certificate has to be parsed (unless its distinguished name was not yet stored, see
+    ``manage.py backfill_metadata``).
+    """
+    now = timezone.now()  # naive or aware, just like the dates stored in the database
+    qs = _get_index_queryset(ca)
+
+    for expires, revoked, revoked_date, revoked_reason, serial, distinguished_name, pub in qs.iterator():
         revocation = ''
-        if cert.expires < now:
+        if expires < now:
             status = 'E'
-        elif cert.revoked:
+        elif revoked:
             status = 'R'
-
-            revocation = cert.revoked_date.strftime(date_format)
-            if cert.revoked_reason:
-                revocation += ',%s' % cert.revoked_reason
+            revocation = _get_revocation(revoked, revoked_date, revoked_reason)
         else:
             status = 'V'
 
-        # Format see: http://pki-tutorial.readthedocs.org/en/latest/cadb.html
-        yield '%s\n' % '\t'.join([
-            status,
-            cert.x509.not_valid_after.strftime(date_format),
-            revocation,
-            cert.serial.replace(':', ''),
-            'unknown',  # we don't save to any file
-            cert.distinguishedName(),
-        ])
+        distinguished_name = _get_distinguished_name(distinguished_name, pub)
+        yield _get_index_line(status, expires, revocation, serial, 'unknown',  # we don't save to any file
+                              distinguished_name)
+
+
+# Suffixes that dbm implementations may add to the name of a database (e.g. ".dir" and ".dat" for dbm.dumb)
+_dbm_suffixes = ('', '.db', '.dir', '.dat', '.bak', '.pag')
+
+
+def _dbm_exists(path):
+    return any(os.path.exists('%s%s' % (path, suffix)) for suffix in _dbm_suffixes)
+
+
+def _remove_dbm(path):
+    for suffix in _dbm_suffixes:
+        if os.path.exists('%s%s' % (path, suffix)):
+            os.remove('%s%s' % (path, suffix))
+
+
+def _rename_dbm(src, dst):
+    _remove_dbm(dst)
+    for suffix in _dbm_suffixes:
+        if os.path.exists('%s%s' % (src, suffix)):
+            os.rename('%s%s' % (src, suffix), '%s%s' % (dst, suffix))
+
+
+def get_index_path(ca):
+    """Get the path of the index file for the given CA in the ``CA_OCSP_INDEX_DIR`` directory."""
+
+    return os.path.join(ca_settings.CA_OCSP_INDEX_DIR, '%s.txt' % ca.serial)
+
+
+class OCSPIndexFile(object):
+    """An index file for ``openssl ocsp`` that is updated incrementally.
+
+    Unlike the file written by ``dump_ocsp_index``, every line has a fixed length for the lifetime of the
+    certificate: The unused filename column is padded with the space required for the longest possible
+    revocation date and reason. The offset of every line is stored in a ``<path>.offsets`` database, so
+    new certificates are appended and revoked certificates are updated in place, without rewriting the
+    file. Expired certificates are removed when the file is rebuilt with :py:meth:`rebuild`.
+
+    Writes are serialized with a lock on ``<path>.lock``.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.offsets_path = '%s.offsets' % path
+        self.lock_path = '%s.lock' % path
+
+    @contextmanager
+    def lock(self):
+        with open(self.lock_path, 'a') as stream:
+            if fcntl is not None:  # pragma: no branch - not available on Windows
+                fcntl.flock(stream, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:  # pragma: no branch
+                    fcntl.flock(stream, fcntl.LOCK_UN)
+
+    def get_line(self, expires, revoked, revoked_date, revoked_reason, serial, distinguished_name):
+        """Get the line for a certificate as bytes."""
+
+        revocation = _get_revocation(revoked, revoked_date, revoked_reason)
+        filename = 'unknown' + ' ' * (_revocation_width - len(revocation))
+        line = _get_index_line('R' if revoked else 'V', expires, revocation, serial, filename,
+                               distinguished_name)
+        return line.encode('utf-8')
+
+    def rebuild(self, ca):
+        """Write the index for all certificates of the given CA that are not expired.
+
+        The file and its offsets are written to temporary files first and then moved into place, so readers
+        never see a partially written file and the existing offsets are kept if writing fails. The old
+        offsets are removed before the new files are moved into place, so if the process dies in between,
+        :py:meth:`update` rebuilds the index instead of using offsets that do not match the file.
+
+        Returns
+        -------
+
+        int
+            The number of certificates in the index.
+        """
+        now = timezone.now()
+        qs = _get_index_queryset(ca, expires__gt=now)
+        tmp_path = '%s.tmp' % self.path
+        tmp_offsets_path = '%s.tmp' % self.offsets_path
+
+        if not os.path.exists(os.path.dirname(self.path)):
+            os.makedirs(os.path.dirname(self.path))
+
+        count = 0
+        with self.lock():
+            try:
+                offsets = dbm.open(tmp_offsets_path, 'n')
+                try:
+                    with open(tmp_path, 'wb') as stream:
+                        for row in qs.iterator():
+                            expires, revoked, revoked_date, reason, serial, name, pub = row
+                            name = _get_distinguished_name(name, pub)
+                            line = self.get_line(expires, revoked, revoked_date, reason, serial, name)
+
+                            offsets[serial.replace(':', '')] = '%s,%s' % (stream.tell(), len(line))
+                            stream.write(line)
+                            count += 1
+                finally:
+                    offsets.close()
+
+                _remove_dbm(self.offsets_path)
+                os.rename(tmp_path, self.path)
+                _rename_dbm(tmp_offsets_path, self.offsets_path)
+            except Exception:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                _remove_dbm(tmp_offsets_path)
+                raise
+
+        return count
+
+    def update(self, cert):
+        """Add the given certificate to the index or update its status.
+
+        The index is rebuilt if it (or its offsets) does not exist yet.
+        """
+        if not os.path.exists(self.path) or not _dbm_exists(self.offsets_path):
+            self.rebuild(cert.ca)
+            return
+
+        serial = cert.serial.replace(':', '')
+        line = self.get_line(cert.expires, cert.revoked, cert.revoked_date, cert.revoked_reason, serial,
+                             cert.distinguishedName())
+
+        with self.lock():
+            offsets = dbm.open(self.offsets_path, 'c')
+            try:
+                with open(self.path, 'r+b') as stream:
+                    if serial in offsets:
+                        offset, length = [int(v) for v in force_text(offsets[serial]).split(',')]
+                        if length != len(line):  # pragma: no cover - only if the DN was modified
+                            rebuild = True
+                        else:
+                            stream.seek(offset)
+                            stream.write(line)
+                            rebuild = False
+                    else:
+                        stream.seek(0, os.SEEK_END)
+                        offsets[serial] = '%s,%s' % (stream.tell(), len(line))
+                        stream.write(line)
+                        rebuild = False
+            finally:
+                offsets.close()
+
+        if rebuild is True:  # pragma: no cover
+            self.rebuild(cert.ca)
@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of django-ca (https://github.com/mathiasertl/django-ca).
+#
+# django-ca is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# django-ca is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with django-ca.  If not,
+# see <http://www.gnu.org/licenses/>.
+
+"""Publish CRLs, CA certificates and OCSP responses as static files.
+
+Files are laid out like the URLs provided by ``django_ca.urls``, so a webserver can serve them directly::
+
+    <path>/ca/<serial>.der            # CA certificate (also as .pem)
+    <path>/crl/<serial>.der           # CRL (also as .pem)
+    <path>/crl/ca/<serial>.der        # CRL for child CAs (also as .pem)
+    <path>/crl/delta/<serial>.der     # delta CRL (also as .pem)
+    <path>/ocsp/<ca-serial>/<serial>.der  # pre-signed OCSP response for a certificate
+"""
+
+import logging
+import os
+
+from cryptography.hazmat.primitives.serialization import Encoding
+
+from django.conf import settings
+from django.dispatch import receiver
+
+from . import ca_settings
+from .crl import build_crls
+from .models import Certificate
+from .models import CertificateAuthority
+from .ocsp import ResponseStore
+from .ocsp import get_responder_cert
+from .ocsp import get_responder_key
+from .ocsp import store_responses
+from .signals import post_create_ca
+from .signals import post_issue_cert
+from .signals import post_revoke_cert
+from .utils import int_to_hex
+from .utils import write_file
+from .views import OCSPView
+
+log = logging.getLogger(__name__)
+
+_extensions = {
+    Encoding.DER: 'der',
+    Encoding.PEM: 'pem',
+}
+
+
+class DirectoryResponseStore(ResponseStore):
+    """Response store writing responses to ``<path>/<serial>.der``, as expected by e.g. nginx'
+    ``ssl_stapling_file`` directive.
+
+    Unlike :py:class:`~django_ca.ocsp.FileSystemResponseStore`, the name of a file does not include the
+    issuers key hash, so a directory may only contain responses for certificates of a single CA.
+    """
+
+    def get_path(self, serial):
+        return os.path.join(self.options['path'], '%s.der' % int_to_hex(serial))
+
+    def get(self, issuer_key_hash, serial):
+        try:
+            with open(self.get_path(serial), 'rb') as stream:
+                return stream.read()
+        except (IOError, OSError):
+            return None
+
+    def set(self, issuer_key_hash, serial, response, expires):
+        write_file(self.get_path(serial), response)
+
+    def delete(self, issuer_key_hash, serial):
+        try:
+            os.remove(self.get_path(serial))
+        except (IOError, OSError):
+            pass
+
+
+def get_crl_path(path, ca, encoding, ca_crl=False, delta=False):
+    """Get the path a CRL is published at."""
+
+    if ca_crl is True:
+        path = os.path.join(path, 'crl', 'ca')
+    elif delta is True:
+        path = os.path.join(path, 'crl', 'delta')
+    else:
+        path = os.path.join(path, 'crl')
+    return os.path.join(path, '%s.%s' % (ca.serial, _extensions[encoding]))
+
+
+def publish_ca_cert(ca, path):
+    """Publish the certificate of the given CA in DER and PEM format.
+
+    Returns
+    -------
+
+    int
+        The number of files written.
+    """
+    for encoding, ext in _extensions.items():
+        write_file(os.path.join(path, 'ca', '%s.%s' % (ca.serial, ext)), ca.dump_certificate(encoding))
+    return len(_extensions)
+
+
+def publish_crls(ca, path, password=None, profiles=None, crls=None):
+    """Publish CRLs of the given CA in DER and PEM format.
+
+    CRLs are generated for all profiles in the :ref:`CA_CRL_PROFILES <settings-ca-crl-profiles>` setting.
+    Since files are named like the URLs of the CRLs, the ``algorithm`` and ``encodings`` of a profile are
+    ignored and profiles for the same kind of CRL overwrite each other.
+
+    Parameters
+    ----------
+
+    ca : :py:class:`~django_ca.models.CertificateAuthority`
+    path : str
+        The directory to publish CRLs to.
+    password : bytes, optional
+        Password used to load the private key of the certificate authority.
+    profiles : list of (str, dict), optional
+        The profiles as returned by :py:func:`~django_ca.crl.get_crl_profiles`. By default, all configured
+        profiles are used.
+    crls : list, optional
+        CRLs as returned by :py:func:`~django_ca.crl.build_crls`. If passed, these CRLs are published instead
+        of generating new ones.
+
+    Returns
+    -------
+
+    int
+        The number of files written.
+    """
+    if crls is None:
+        crls = build_crls(ca, password=password, profiles=profiles)
+
+    count = 0
+    for profile, crl in crls:
+        for encoding in _extensions:
+            crl_path = get_crl_path(path, ca, encoding, ca_crl=profile['ca_crl'], delta=profile['delta'])
+            write_file(crl_path, crl.public_bytes(encoding))
+            count += 1
+
+    return count
+
+
+def get_ocsp_responder(ca):
+    """Get the configuration of the OCSP responder for the given CA from the ``CA_OCSP_URLS`` setting.
+
+    Returns ``None`` if no responder is configured for the CA.
+    """
+    for name, kwargs in sorted(getattr(settings, 'CA_OCSP_URLS', {}).items()):
+        if kwargs.get('ca_ocsp'):
+            continue
+
+        try:
+            responder_ca = CertificateAuthority.objects.get_by_serial_or_cn(kwargs.get('ca', name))
+        except CertificateAuthority.DoesNotExist:
+            continue
+
+        if responder_ca.pk == ca.pk:
+            return kwargs
+
+
+def publish_ocsp_responses(ca, path, serials=None):
+    """Publish pre-signed OCSP responses for certificates of the given CA.
+
+    Responses are signed with the key of the OCSP responder configured for the CA in the ``CA_OCSP_URLS``
+    setting.
+
+    Parameters
+    ----------
+
+    ca : :py:class:`~django_ca.models.CertificateAuthority`
+    path : str
+        The directory to publish responses to. Responses are written to ``ocsp/<ca-serial>/``.
+    serials : list of str, optional
+        Only publish responses for certificates with the given serials.
+
+    Returns
+    -------
+
+    int
+        The number of files written.
+    """
+    kwargs = get_ocsp_responder(ca)
+    if kwargs is None:
+        raise ValueError('No OCSP responder configured.')
+
+    responder_key = get_responder_key(kwargs['responder_key'])
+    responder_cert = get_responder_cert(kwargs['responder_cert'])
+
+    store = DirectoryResponseStore(path=os.path.join(path, 'ocsp', ca.serial))
+    return store_responses(ca, store, responder_key, responder_cert,
+                           expires=kwargs.get('expires', OCSPView.expires), serials=serials)
+
+
+@receiver(post_create_ca)
+def _publish_new_ca(sender, ca, **kwargs):
+    if not ca_settings.CA_PUBLISH_DIR:
+        return
+
+    try:
+        publish_ca_cert(ca, ca_settings.CA_PUBLISH_DIR)
+        publish_crls(ca, ca_settings.CA_PUBLISH_DIR)
+    except Exception as e:
+        log.exception('%s: Could not publish CA: %s', ca.serial, e)
+
+
+@receiver(post_issue_cert)
+def _publish_new_cert(sender, cert, **kwargs):
+    if not ca_settings.CA_PUBLISH_DIR or not ca_settings.CA_PUBLISH_OCSP:
+        return
+
+    try:
+        publish_ocsp_responses(cert.ca, ca_settings.CA_PUBLISH_DIR, serials=[cert.serial])
+    except Exception as e:
+        log.exception('%s: Could not publish OCSP response: %s', cert.serial, e)
+
+
+@receiver(post_revoke_cert, sender=Certificate)
+def _publish_revocation(sender, cert, **kwargs):
+    # CRLs are published together with the cached CRLs by django_ca.crl, so they are only built once
+    if not ca_settings.CA_PUBLISH_DIR or not ca_settings.CA_PUBLISH_OCSP:
+        return
+
+    try:
+        publish_ocsp_responses(cert.ca, ca_settings.CA_PUBLISH_DIR, serials=[cert.serial])
+    except Exception as e:
+        log.exception('%s: Could not publish revocation: %s', cert.ca.serial, e)
@@ -17,13 +17,15 @@ from django.db import models
 from django.db.models import Q
 from django.utils import timezone
 
+from .utils import normalize_serial
+
 
 class DjangoCAMixin(object):
     def get_by_serial_or_cn(self, identifier):
         identifier = identifier.strip()
-        serial = identifier.upper()
+        serial = normalize_serial(identifier)
 
-        return self.get(Q(serial__startswith=serial) | Q(cn=identifier))
+        return self.get(Q(serial_hex__startswith=serial) | Q(cn=identifier))
 
     def revoked(self):
         """Return revoked certificates."""
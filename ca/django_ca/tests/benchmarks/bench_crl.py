@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of django-ca (https://github.com/mathiasertl/django-ca).
+#
+# django-ca is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# django-ca is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with django-ca.  If not,
+# see <http://www.gnu.org/licenses/>.
+
+"""Benchmark CRL generation depending on the number of revoked certificates.
+
+Run with ``python setup.py benchmark --suite=bench_crl``.
+"""
+
+from __future__ import print_function
+
+import timeit
+from datetime import datetime
+from datetime import timedelta
+
+from cryptography import x509
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.serialization import Encoding
+
+from ...crl import get_crl
+from ...models import Certificate
+from ...utils import int_to_hex
+from ..base import DjangoCAWithCertTestCase
+
+
+def get_crl_parsed(ca, qs):
+    """The previous implementation that loads every revoked certificate, used as reference."""
+
+    now = datetime.utcnow()
+    builder = x509.CertificateRevocationListBuilder()
+    builder = builder.issuer_name(ca.x509.subject)
+    builder = builder.last_update(now)
+    builder = builder.next_update(now + timedelta(seconds=600))
+
+    for cert in qs.revoked():
+        revoked_cert = x509.RevokedCertificateBuilder().serial_number(
+            cert.x509.serial_number).revocation_date(cert.revoked_date)
+        builder = builder.add_revoked_certificate(revoked_cert.build(default_backend()))
+
+    crl = builder.sign(private_key=ca.key(None), algorithm=hashes.SHA512(), backend=default_backend())
+    return crl.public_bytes(Encoding.DER)
+
+
+class CRLBenchmark(DjangoCAWithCertTestCase):
+    counts = [0, 100, 1000, 10000]
+    repeat = 3
+
+    def revoke(self, count):
+        """Add revoked certificates until the CA has ``count`` revoked certificates."""
+
+        existing = Certificate.objects.filter(ca=self.ca).revoked().count()
+        now = datetime.utcnow()
+        Certificate.objects.bulk_create([
+            Certificate(ca=self.ca, csr='none', pub=self.cert.pub, cn=self.cert.cn, expires=self.cert.expires,
+                        serial=int_to_hex(i + 1), revoked=True, revoked_date=now,
+                        revoked_reason='key_compromise')
+            for i in range(existing, count)
+        ], batch_size=500)
+
+    def time(self, func):
+        return min(timeit.repeat(func, number=1, repeat=self.repeat))
+
+    def test_crl(self):
+        qs = Certificate.objects.filter(ca=self.ca)
+
+        print('\n%10s %12s %12s' % ('revoked', 'get_crl', 'parsed'))
+        for count in self.counts:
+            self.revoke(count)
+
+            crl = get_crl(self.ca, encoding=Encoding.DER, expires=600, algorithm=hashes.SHA512(),
+                          password=None)
+            self.assertEqual(len(x509.load_der_x509_crl(crl, default_backend())), count)
+
+            new = self.time(lambda: get_crl(self.ca, encoding=Encoding.DER, expires=600,
+                                            algorithm=hashes.SHA512(), password=None))
+            old = self.time(lambda: get_crl_parsed(self.ca, qs))
+            print('%10s %11.3fs %11.3fs' % (count, new, old))
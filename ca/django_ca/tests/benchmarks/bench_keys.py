@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of django-ca (https://github.com/mathiasertl/django-ca).
+#
+# django-ca is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# django-ca is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with django-ca.  If not,
+# see <http://www.gnu.org/licenses/>.
+
+"""Benchmark signing certificates and CRLs depending on the type and size of the private key.
+
+Run with ``python setup.py benchmark --suite=bench_keys``.
+"""
+
+from __future__ import print_function
+
+import timeit
+
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.hazmat.primitives.serialization import Encoding
+
+from ...crl import get_crl
+from ...keys import KEY_TYPES
+from ...models import Certificate
+from ...utils import get_cert_profile_kwargs
+from ..base import DjangoCAWithCSRTestCase
+from ..base import cert2_csr
+from ..base import override_tmpcadir
+
+
+@override_tmpcadir(CA_MIN_KEY_SIZE=1024, CA_PROFILES={}, CA_DEFAULT_SUBJECT={})
+class KeyTypesBenchmark(DjangoCAWithCSRTestCase):
+    repeat = 3
+    number = 20
+
+    key_types = [
+        ('RSA 2048', {'key_type': 'RSA', 'key_size': 2048}),
+        ('RSA 4096', {'key_type': 'RSA', 'key_size': 4096}),
+        ('ECC P-256', {'key_type': 'ECC', 'ecc_curve': ec.SECP256R1()}),
+        ('ECC P-384', {'key_type': 'ECC', 'ecc_curve': ec.SECP384R1()}),
+    ]
+    if 'Ed25519' in KEY_TYPES:  # pragma: no branch
+        key_types.append(('Ed25519', {'key_type': 'Ed25519'}))
+
+    def time(self, func):
+        """Average time of a single call in milliseconds."""
+        return min(timeit.repeat(func, number=self.number, repeat=self.repeat)) / self.number * 1000
+
+    def test_signing(self):
+        kwargs = get_cert_profile_kwargs()
+
+        print('\n%-10s %12s %12s %12s' % ('key', 'generate', 'cert', 'crl'))
+        for name, key_kwargs in self.key_types:
+            start = timeit.default_timer()
+            ca = self.create_ca(name, subject='/CN=%s.example.com' % name.replace(' ', '-'), **key_kwargs)
+            generate = (timeit.default_timer() - start) * 1000
+
+            cert = lambda: Certificate.objects.init(  # NOQA: E731
+                ca, cert2_csr, expires=self.expires(30), algorithm=hashes.SHA256(),
+                subjectAltName=['example.com'], **kwargs)
+            crl = lambda: get_crl(ca, encoding=Encoding.DER, expires=600, algorithm=hashes.SHA256(),  # NOQA
+                                  password=None)
+
+            print('%-10s %10.2fms %10.2fms %10.2fms' % (name, generate, self.time(cert), self.time(crl)))
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of django-ca (https://github.com/mathiasertl/django-ca).
+#
+# django-ca is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# django-ca is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with django-ca.  If not,
+# see <http://www.gnu.org/licenses/>.
+
+"""Benchmark listing certificates depending on the number of certificates.
+
+Run with ``python setup.py benchmark --suite=bench_list_certs``.
+"""
+
+from __future__ import print_function
+
+import timeit
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.utils import six
+from django.utils import timezone
+
+from ...models import Certificate
+from ...utils import int_to_hex
+from ..base import DjangoCAWithCertTestCase
+
+
+def list_certs_models():
+    """The previous implementation that loads a model instance for every certificate, used as reference."""
+
+    stream = six.StringIO()
+    certs = Certificate.objects.filter(expires__gt=timezone.now(), revoked=False)
+    for cert in certs:
+        info = 'expires: %s' % cert.expires.strftime('%Y-%m-%d')
+        stream.write('%s - %s (%s)\n' % (cert.serial, cert.cn, info))
+    return stream
+
+
+class ListCertsBenchmark(DjangoCAWithCertTestCase):
+    counts = [1000, 10000, 100000, 1000000]
+    models_max = 100000  # the previous implementation is too slow for more certificates
+    repeat = 1
+
+    def add_certs(self, count):
+        """Add certificates until there are ``count`` certificates."""
+
+        existing = Certificate.objects.count()
+        expires = timezone.now() + timedelta(days=365)
+
+        # create instances in chunks, so that we never hold a million instances in memory
+        for start in range(existing, count, 10000):
+            Certificate.objects.bulk_create([
+                Certificate(ca=self.ca, csr='none', pub=self.cert.pub, der=self.cert.der, cn=self.cert.cn,
+                            expires=expires - timedelta(seconds=i), valid_from=self.cert.valid_from,
+                            serial=int_to_hex(i + 1), serial_hex='%X' % (i + 1),
+                            distinguished_name=self.cert.distinguished_name)
+                for i in range(start, min(start + 10000, count))
+            ], batch_size=500)
+
+    def time(self, func):
+        return min(timeit.repeat(func, number=1, repeat=self.repeat))
+
+    def list_certs(self, *args):
+        stdout = six.StringIO()
+        call_command('list_certs', *args, stdout=stdout)
+        return stdout
+
+    def test_list_certs(self):
+        # make sure that the certificate from the fixtures is also listed
+        Certificate.objects.filter(pk=self.cert.pk).update(expires=timezone.now() + timedelta(days=365))
+
+        print('\n%10s %12s %12s %12s %12s' % ('certs', 'text', 'json', 'csv', 'models'))
+        for count in self.counts:
+            self.add_certs(count)
+
+            text = self.time(lambda: self.list_certs())
+            json = self.time(lambda: self.list_certs('--format=json'))
+            csv = self.time(lambda: self.list_certs('--format=csv', '--fields=serial,cn,expires,ca'))
+            self.assertEqual(len(self.list_certs().getvalue().splitlines()), count)
+
+            if count <= self.models_max:
+                old = '%11.3fs' % self.time(list_certs_models)
+            else:
+                old = '%12s' % '-'
+            print('%10s %11.3fs %11.3fs %11.3fs %s' % (count, text, json, csv, old))
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of django-ca (https://github.com/mathiasertl/django-ca).
+#
+# django-ca is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# django-ca is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with django-ca.  If not,
+# see <http://www.gnu.org/licenses/>.
+
+"""Benchmark the OCSP responder depending on how the CA and certificate status are looked up.
+
+Run with ``python setup.py benchmark --suite=bench_ocsp``.
+"""
+
+from __future__ import print_function
+
+import os
+import timeit
+
+from asn1crypto import ocsp as asn1_ocsp
+
+from django.conf import settings
+from django.test import RequestFactory
+
+from ... import ocsp
+from ...models import Certificate
+from ...models import CertificateAuthority
+from ...utils import int_to_hex
+from ...views import OCSPView
+from ..base import DjangoCAWithCertTestCase
+
+
+class ModelOCSPView(OCSPView):
+    """The previous implementation that loads the CA and all certificates as models, used as reference."""
+
+    def get_ca(self):
+        return CertificateAuthority.objects.get_by_serial_or_cn(self.ca)
+
+    def get_cert_statuses(self, ca, serials):
+        certs = Certificate.objects.filter(ca=ca).filter(serial_hex__in=serials)
+        return {c.serial_hex: (c.ocsp_status, c.revoked_date) for c in certs}
+
+
+class OCSPBenchmark(DjangoCAWithCertTestCase):
+    counts = [0, 1000, 10000]
+    repeat = 3
+    number = 100
+
+    def add_certs(self, count):
+        """Add certificates until the CA has ``count`` additional certificates."""
+
+        existing = Certificate.objects.filter(ca=self.ca).count() - 1
+        Certificate.objects.bulk_create([
+            Certificate(ca=self.ca, csr='none', pub=self.cert.pub, cn=self.cert.cn, expires=self.cert.expires,
+                        serial=int_to_hex(i + 1), serial_hex='%X' % (i + 1))
+            for i in range(existing, count)
+        ], batch_size=500)
+
+    def get_request(self):
+        """Get a request for ``self.cert`` (the same request is used by the OCSP view tests)."""
+
+        with open(os.path.join(settings.FIXTURES_DIR, 'ocsp', 'req1'), 'rb') as stream:
+            return stream.read()
+
+    def rps(self, view, data):
+        """Requests per second for the given view."""
+
+        factory = RequestFactory()
+
+        def request():
+            return view(factory.post('/ocsp/', data, content_type='application/ocsp-request'))
+
+        response = asn1_ocsp.OCSPResponse.load(request().content)
+        self.assertEqual(response['response_status'].native, 'successful')
+
+        return self.number / min(timeit.repeat(request, number=self.number, repeat=self.repeat))
+
+    def test_ocsp(self):
+        kwargs = {
+            'ca': self.ca.serial,
+            'responder_key': settings.OCSP_KEY_PATH,
+            'responder_cert': settings.OCSP_PEM_PATH,
+        }
+        view = OCSPView.as_view(**kwargs)
+        index_view = OCSPView.as_view(status_index=True, **kwargs)
+        model_view = ModelOCSPView.as_view(**kwargs)
+        data = self.get_request()
+
+        print('\n%10s %14s %14s %14s' % ('certs', 'fast path', 'status index', 'models'))
+        for count in self.counts:
+            self.add_certs(count)
+            ocsp.clear_caches()
+            print('%10s %8.1f req/s %8.1f req/s %8.1f req/s' % (
+                count, self.rps(view, data), self.rps(index_view, data), self.rps(model_view, data)))
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of django-ca (https://github.com/mathiasertl/django-ca).
+#
+# django-ca is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# django-ca is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with django-ca.  If not,
+# see <http://www.gnu.org/licenses/>.
+
+"""Benchmark writing an OCSP index file depending on the number of certificates.
+
+Run with ``python setup.py benchmark --suite=bench_ocsp_index``.
+"""
+
+from __future__ import print_function
+
+import os
+import shutil
+import tempfile
+import timeit
+from datetime import datetime
+
+from django.core.management import call_command
+
+from ...models import Certificate
+from ...ocsp import date_format
+from ...utils import format_name
+from ...utils import int_to_hex
+from ..base import DjangoCAWithCertTestCase
+
+
+def get_index_parsed(ca):
+    """The previous implementation that loads and parses every certificate, used as reference."""
+
+    now = datetime.utcnow()
+    for cert in ca.certificate_set.all():
+        revocation = ''
+        if cert.expires < now:
+            status = 'E'
+        elif cert.revoked:
+            status = 'R'
+            revocation = cert.revoked_date.strftime(date_format)
+            if cert.revoked_reason:
+                revocation += ',%s' % cert.revoked_reason
+        else:
+            status = 'V'
+
+        yield '%s\n' % '\t'.join([
+            status, cert.x509.not_valid_after.strftime(date_format), revocation, cert.serial.replace(':', ''),
+            'unknown', format_name(cert.x509.subject),
+        ])
+
+
+class OCSPIndexBenchmark(DjangoCAWithCertTestCase):
+    counts = [1000, 10000, 100000, 1000000]
+    parsed_max = 100000  # the previous implementation is too slow for more certificates
+    repeat = 1
+
+    def setUp(self):
+        super(OCSPIndexBenchmark, self).setUp()
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'index.txt')
+
+    def tearDown(self):
+        super(OCSPIndexBenchmark, self).tearDown()
+        shutil.rmtree(self.tmpdir)
+
+    def add_certs(self, count):
+        """Add certificates until the CA has ``count`` certificates."""
+
+        existing = Certificate.objects.filter(ca=self.ca).count()
+
+        # create instances in chunks, so that we never hold a million instances in memory
+        for start in range(existing, count, 10000):
+            Certificate.objects.bulk_create([
+                Certificate(ca=self.ca, csr='none', pub=self.cert.pub, der=self.cert.der, cn=self.cert.cn,
+                            expires=self.cert.expires, serial=int_to_hex(i + 1), serial_hex='%X' % (i + 1),
+                            distinguished_name=self.cert.distinguished_name)
+                for i in range(start, min(start + 10000, count))
+            ], batch_size=500)
+
+    def time(self, func):
+        return min(timeit.repeat(func, number=1, repeat=self.repeat))
+
+    def dump_parsed(self):
+        with open(self.path, 'w') as stream:
+            for line in get_index_parsed(self.ca):
+                stream.write(line)
+
+    def test_dump_ocsp_index(self):
+        print('\n%10s %12s %12s' % ('certs', 'streaming', 'parsed'))
+        for count in self.counts:
+            self.add_certs(count)
+
+            new = self.time(lambda: call_command('dump_ocsp_index', self.path))
+            with open(self.path) as stream:
+                self.assertEqual(sum(1 for line in stream), count)
+
+            if count <= self.parsed_max:
+                old = '%11.3fs' % self.time(self.dump_parsed)
+            else:
+                old = '%12s' % '-'
+            print('%10s %11.3fs %s' % (count, new, old))
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of django-ca (https://github.com/mathiasertl/django-ca).
+#
+# django-ca is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# django-ca is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with django-ca.  If not,
+# see <http://www.gnu.org/licenses/>.
+
+from ..management.commands.backfill_metadata import METADATA_FIELDS
+from ..models import Certificate
+from ..models import CertificateAuthority
+from .base import DjangoCAWithCertTestCase
+from .base import certs
+
+
+class BackfillMetadataTestCase(DjangoCAWithCertTestCase):
+    def test_basic(self):
+        expected = Certificate.objects.filter(pk=self.cert.pk).values(*METADATA_FIELDS)[0]
+        self.assertEqual(expected['key_type'], 'RSA')
+        self.assertEqual(expected['distinguished_name'], self.cert.distinguishedName())
+        self.assertEqual(expected['fingerprint_sha256'], certs['cert1']['sha256'])
+
+        Certificate.objects.update(valid_from=None, distinguished_name='', subject_alt_names='', key_type='',
+                                   key_size=None, fingerprint_sha256='', subject_key_identifier='',
+                                   authority_key_identifier='')
+        CertificateAuthority.objects.filter(pk=self.ca.pk).update(fingerprint_sha256='')
+
+        stdout, stderr = self.cmd('backfill_metadata', batch_size=1, verbosity=2)
+        self.assertEqual(stdout, 'Certificate Authorities: Updated 1 rows.\ncertificates: Updated %s rows.\n'
+                         % Certificate.objects.count())
+        self.assertEqual(stderr, '')
+        self.assertEqual(Certificate.objects.filter(pk=self.cert.pk).values(*METADATA_FIELDS)[0], expected)
+
+        # nothing to do anymore
+        stdout, stderr = self.cmd('backfill_metadata', verbosity=2)
+        self.assertEqual(stdout, 'Certificate Authorities: Updated 0 rows.\ncertificates: Updated 0 rows.\n')
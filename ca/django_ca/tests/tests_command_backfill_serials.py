@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of django-ca (https://github.com/mathiasertl/django-ca).
+#
+# django-ca is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# django-ca is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with django-ca.  If not,
+# see <http://www.gnu.org/licenses/>.
+
+from ..models import Certificate
+from ..models import CertificateAuthority
+from .base import DjangoCAWithCertTestCase
+
+
+class BackfillSerialsTestCase(DjangoCAWithCertTestCase):
+    def test_basic(self):
+        Certificate.objects.update(serial_hex='')
+        CertificateAuthority.objects.filter(pk=self.ca.pk).update(serial_hex='')
+
+        stdout, stderr = self.cmd('backfill_serials', batch_size=1, verbosity=2)
+        self.assertEqual(stdout, 'Certificate Authorities: Updated 1 rows.\ncertificates: Updated %s rows.\n'
+                         % Certificate.objects.count())
+        self.assertEqual(stderr, '')
+
+        self.assertEqual(Certificate.objects.get(pk=self.cert.pk).serial_hex,
+                         self.cert.serial.replace(':', ''))
+        self.assertEqual(CertificateAuthority.objects.get(pk=self.ca.pk).serial_hex,
+                         self.ca.serial.replace(':', ''))
+        self.assertEqual(Certificate.objects.get_by_serial_or_cn(self.cert.serial), self.cert)
+
+        # nothing to do anymore
+        stdout, stderr = self.cmd('backfill_serials', verbosity=2)
+        self.assertEqual(stdout, 'Certificate Authorities: Updated 0 rows.\ncertificates: Updated 0 rows.\n')
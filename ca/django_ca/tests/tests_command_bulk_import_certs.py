@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of django-ca (https://github.com/mathiasertl/django-ca).
+#
+# django-ca is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# django-ca is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with django-ca.  If not,
+# see <http://www.gnu.org/licenses/>.
+
+import os
+import shutil
+import tarfile
+import tempfile
+from datetime import datetime
+from datetime import timedelta
+
+from cryptography import x509
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.hazmat.primitives.serialization import Encoding
+from cryptography.x509.oid import NameOID
+
+from django.conf import settings
+from django.core.management.base import CommandError
+
+from ..models import Certificate
+from .base import DjangoCAWithCATestCase
+from .base import certs
+
+
+class BulkImportCertsTestCase(DjangoCAWithCATestCase):
+    def setUp(self):
+        super(BulkImportCertsTestCase, self).setUp()
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        super(BulkImportCertsTestCase, self).tearDown()
+        shutil.rmtree(self.path)
+
+    def fixture(self, name):
+        with open(os.path.join(settings.FIXTURES_DIR, name), 'rb') as stream:
+            return stream.read()
+
+    def write(self, name, data):
+        path = os.path.join(self.path, name)
+        with open(path, 'wb') as stream:
+            stream.write(data)
+        return path
+
+    def assertImported(self, *names):
+        self.assertEqual(sorted(Certificate.objects.values_list('serial', flat=True)),
+                         sorted([certs[name]['serial'] for name in names]))
+        for cert in Certificate.objects.all():
+            self.assertEqual(cert.ca, self.ca)
+            cert.full_clean()
+
+    def test_directory(self):
+        os.mkdir(os.path.join(self.path, 'sub'))
+        self.write('cert1.pem', self.fixture('cert1.pem'))
+        self.write(os.path.join('sub', 'cert2.der'), self.fixture('cert1-pub.der'))
+        self.write(os.path.join('sub', 'cert3.pem'), self.fixture('cert3.pem'))
+
+        stdout, stderr = self.cmd('bulk_import_certs', self.path, processes=1, verbosity=2)
+        self.assertEqual(stdout, '3 certificates processed, 2 imported.\n')
+        self.assertEqual(stderr, '')
+        self.assertImported('cert1', 'cert3')
+
+    def test_bundle(self):
+        bundle = self.fixture('cert1.pem') + self.fixture('cert2.pem') + self.fixture('cert3.pem')
+        path = self.write('bundle.pem', bundle)
+
+        stdout, stderr = self.cmd('bulk_import_certs', path, processes=2, batch_size=2, verbosity=2)
+        self.assertEqual(stdout, '2 certificates processed, 2 imported.\n'
+                                 '3 certificates processed, 3 imported.\n')
+        self.assertEqual(stderr, '')
+        self.assertImported('cert1', 'cert2', 'cert3')
+
+    def test_tarball(self):
+        path = os.path.join(self.path, 'certs.tar.gz')
+        with tarfile.open(path, 'w:gz') as tar:
+            tar.add(os.path.join(settings.FIXTURES_DIR, 'cert1.pem'), 'cert1.pem')
+            tar.add(os.path.join(settings.FIXTURES_DIR, 'cert2.pem'), 'cert2.pem')
+
+        stdout, stderr = self.cmd('bulk_import_certs', path, processes=1)
+        self.assertEqual(stdout, '')
+        self.assertEqual(stderr, '')
+        self.assertImported('cert1', 'cert2')
+
+    def test_checkpoint(self):
+        path = self.write('bundle.pem', self.fixture('cert1.pem') + self.fixture('cert2.pem'))
+        checkpoint = os.path.join(self.path, 'checkpoint')
+        with open(checkpoint, 'w') as stream:
+            stream.write('1')
+
+        self.cmd('bulk_import_certs', path, processes=1, checkpoint=checkpoint)
+        self.assertImported('cert2')
+        with open(checkpoint) as stream:
+            self.assertEqual(stream.read(), '2')
+
+    def test_errors(self):
+        self.write('bundle.pem', self.fixture('cert1.pem') + b'\nfoobar\n' + self.fixture('cert1.pem'))
+        bogus = self.write('bogus.der', b'foobar')
+        existing = self.write('existing.pem', self.fixture('cert2.pem'))
+        self.cmd('bulk_import_certs', existing, processes=1)
+
+        # self-signed certificate by an unknown CA
+        key = ec.generate_private_key(ec.SECP256R1(), default_backend())
+        name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, u'unknown.example.com')])
+        unknown = x509.CertificateBuilder().subject_name(name).issuer_name(name).public_key(
+            key.public_key()).serial_number(1).not_valid_before(datetime.utcnow()).not_valid_after(
+            datetime.utcnow() + timedelta(days=1)).sign(key, hashes.SHA256(), default_backend())
+        unknown = self.write('unknown.pem', unknown.public_bytes(Encoding.PEM))
+
+        stdout, stderr = self.cmd('bulk_import_certs', self.path, processes=1)
+        self.assertEqual(stdout, '')
+        self.assertEqual(stderr, '%s: Unable to load certificate.\n'
+                                 '%s: Issuing certificate authority not found.\n' % (bogus, unknown))
+        self.assertImported('cert1', 'cert2')
+
+        with self.assertRaisesRegex(CommandError, r'^/does/not/exist: No such file or directory\.$'):
+            self.cmd('bulk_import_certs', '/does/not/exist')
@@ -65,6 +65,33 @@ class DumpCRLTestCase(DjangoCAWithCertTestCase):
         with self.assertRaises(CommandError):
             self.cmd('dump_crl', path, stdout=BytesIO(), stderr=BytesIO())
 
+    @override_settings(CA_CRL_PROFILES={})  # do not refresh CRLs on revocation
+    def test_delta(self):
+        with self.assertRaisesRegex(CommandError, r'^root: No base CRL was issued yet\.$'):
+            self.cmd('dump_crl', delta=True, stdout=BytesIO(), stderr=BytesIO())
+        with self.assertRaisesRegex(CommandError, r'^Delta CRLs are not supported for child CAs\.$'):
+            self.cmd('dump_crl', delta=True, ca_crl=True, stdout=BytesIO(), stderr=BytesIO())
+        with self.assertRaisesRegex(CommandError, r'^Delta CRLs are not supported for child CAs\.$'):
+            self.cmd('dump_crl', base=True, ca_crl=True, stdout=BytesIO(), stderr=BytesIO())
+        with self.assertRaisesRegex(CommandError, r'^A delta CRL cannot be a base CRL\.$'):
+            self.cmd('dump_crl', base=True, delta=True, stdout=BytesIO(), stderr=BytesIO())
+
+        # complete CRLs only become the base CRL if requested
+        self.cmd('dump_crl', stdout=BytesIO(), stderr=BytesIO())
+        with self.assertRaisesRegex(CommandError, r'^root: No base CRL was issued yet\.$'):
+            self.cmd('dump_crl', delta=True, stdout=BytesIO(), stderr=BytesIO())
+
+        self.cmd('dump_crl', base=True, stdout=BytesIO(), stderr=BytesIO())  # CRL number 2
+        self.cmd('dump_crl', stdout=BytesIO(), stderr=BytesIO())  # CRL number 3
+        cert = Certificate.objects.get(pk=self.cert.pk)
+        cert.revoke()
+
+        stdout, stderr = self.cmd('dump_crl', delta=True, stdout=BytesIO(), stderr=BytesIO())
+        self.assertEqual(stderr, b'')
+        crl = x509.load_pem_x509_crl(stdout, default_backend())
+        self.assertEqual([e.serial_number for e in crl], [cert.x509.serial_number])
+        self.assertEqual(crl.extensions.get_extension_for_class(x509.DeltaCRLIndicator).value.crl_number, 2)
+
     def test_password(self):
         password = b'testpassword'
         ca = self.create_ca('with password', password=password)
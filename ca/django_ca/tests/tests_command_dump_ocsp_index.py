@@ -19,10 +19,16 @@ from datetime import timedelta
 from django.utils import timezone
 
 from .. import ca_settings
+from ..management.commands.dump_ocsp_index import Command
 from ..models import Certificate
+from ..ocsp import _openssl_reasons
 from ..ocsp import date_format
 from .base import DjangoCAWithCertTestCase
+from .base import cert2_pubkey
+from .base import cert3_pubkey
+from .base import override_settings
 from .base import override_tmpcadir
+from .base import patch
 
 
 @override_tmpcadir(CA_MIN_KEY_SIZE=1024, CA_PROFILES={}, CA_DEFAULT_SUBJECT={})
@@ -35,14 +41,15 @@ class OCSPIndexTestCase(DjangoCAWithCertTestCase):
             status = 'R'
             revocation = cert.revoked_date.strftime(date_format)
 
-            if cert.revoked_reason:
-                revocation += ',%s' % cert.revoked_reason
+            # OpenSSL does not know all reasons, only the date is written for the others
+            if cert.revoked_reason in _openssl_reasons:
+                revocation += ',%s' % _openssl_reasons[cert.revoked_reason]
         else:
             status = 'V'
 
         return '%s\t%s\t%s\t%s\tunknown\t%s' % (
             status,
-            cert.x509.not_valid_after.strftime(date_format),
+            cert.expires.strftime(date_format),
             revocation,
             cert.serial.replace(':', ''),
             cert.distinguishedName(),
@@ -86,3 +93,38 @@ class OCSPIndexTestCase(DjangoCAWithCertTestCase):
         stdout, stderr = self.cmd('dump_ocsp_index')
         self.assertEqual(stdout, '%s\n' % self.line(cert))
         self.assertEqual(stderr, '')
+
+    @override_settings(USE_TZ=True)
+    def test_use_tz(self):
+        cert = Certificate.objects.get(serial=self.cert.serial)
+        cert.revoke('key_compromise')
+
+        stdout, stderr = self.cmd('dump_ocsp_index')
+        self.assertEqual(stdout, '%s\n' % self.line(Certificate.objects.get(pk=cert.pk)))
+        self.assertEqual(stderr, '')
+
+    def test_no_stored_name(self):
+        # rows added before the distinguished name was stored in the database
+        Certificate.objects.filter(pk=self.cert.pk).update(distinguished_name='')
+
+        with self.assertNumQueries(2):  # the CA and all certificates
+            stdout, stderr = self.cmd('dump_ocsp_index')
+        self.assertEqual(stdout, '%s\n' % self.line(self.cert))
+        self.assertEqual(stderr, '')
+
+    def test_chunks(self):
+        cert2 = self.load_cert(ca=self.ca, x509=cert2_pubkey)
+        cert3 = self.load_cert(ca=self.ca, x509=cert3_pubkey)
+        expected = ''.join(['%s\n' % self.line(c) for c in [self.cert, cert2, cert3]])
+        path = os.path.join(ca_settings.CA_DIR, 'ocsp-index.txt')
+
+        with patch.object(Command, 'chunk_size', 2):
+            stdout, stderr = self.cmd('dump_ocsp_index')
+            self.assertEqual(stdout, expected)
+            self.assertEqual(stderr, '')
+
+            # no queries besides the CA and the certificates
+            with self.assertNumQueries(2):
+                self.cmd('dump_ocsp_index', path)
+            with open(path) as stream:
+                self.assertEqual(stream.read(), expected)
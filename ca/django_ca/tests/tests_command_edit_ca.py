@@ -25,10 +25,11 @@ class SignCertTestCase(DjangoCAWithCATestCase):
         ian = 'http://ian-test.example.org'
         ocsp = 'http://ocsp-test.example.org'
         crl = ['http://example.org/crl-test']
+        delta_crl = ['http://example.org/delta-crl-test']
 
         stdout, stderr = self.cmd(
             'edit_ca', self.ca.serial, issuer_url=issuer, issuer_alt_name=ian,
-            ocsp_url=ocsp, crl_url=crl, disable=False)
+            ocsp_url=ocsp, crl_url=crl, delta_crl_url=delta_crl, disable=False)
         self.assertEqual(stdout, '')
         self.assertEqual(stderr, '')
 
@@ -37,14 +38,23 @@ class SignCertTestCase(DjangoCAWithCATestCase):
         self.assertEqual(ca.issuer_alt_name, ian)
         self.assertEqual(ca.ocsp_url, ocsp)
         self.assertEqual(ca.crl_url, '\n'.join(crl))
+        self.assertEqual(ca.delta_crl_url, '\n'.join(delta_crl))
         self.assertFalse(ca.enabled)
 
+        # URLs can also be removed again
+        self.cmd('edit_ca', self.ca.serial, crl_url=[], delta_crl_url=[])
+        ca = CertificateAuthority.objects.get(serial=self.ca.serial)
+        self.assertEqual(ca.crl_url, '')
+        self.assertEqual(ca.delta_crl_url, '')
+
     def test_enable(self):
         ca = CertificateAuthority.objects.get(serial=self.ca.serial)
         ca.enable = False
+        ca.delta_crl_url = 'http://delta-crl.example.com'
         ca.save()
+        self.ca.refresh_from_db()
 
-        # we can also change nothing at all
+        # we can also change nothing at all (a delta CRL URL is not removed by default)
         stdout, stderr = self.cmd('edit_ca', self.ca.serial, enable=True, crl_url=None)
         self.assertEqual(stdout, '')
         self.assertEqual(stderr, '')
@@ -54,4 +64,5 @@ class SignCertTestCase(DjangoCAWithCATestCase):
         self.assertEqual(ca.issuer_alt_name, self.ca.issuer_alt_name)
         self.assertEqual(ca.ocsp_url, self.ca.ocsp_url)
         self.assertEqual(ca.crl_url, self.ca.crl_url)
+        self.assertEqual(ca.delta_crl_url, 'http://delta-crl.example.com')
         self.assertTrue(ca.enabled)
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of django-ca (https://github.com/mathiasertl/django-ca).
+#
+# django-ca is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# django-ca is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with django-ca.  If not,
+# see <http://www.gnu.org/licenses/>.
+
+import os
+
+from cryptography.hazmat.primitives.asymmetric import dsa
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from django.core.management.base import CommandError
+
+from .. import ca_settings
+from ..keys import count_pooled_keys
+from ..keys import get_pooled_key
+from .base import DjangoCATestCase
+from .base import override_tmpcadir
+
+
+@override_tmpcadir(CA_MIN_KEY_SIZE=1024)
+class FillKeyPoolTestCase(DjangoCATestCase):
+    def test_basic(self):
+        path = os.path.join(ca_settings.CA_DIR, 'pool')
+        stdout, stderr = self.cmd('fill_key_pool', key_size=1024, count=2, path=path, verbosity=2)
+        self.assertEqual(stdout, 'Generated 2 RSA keys with 1024 bits.\n')
+        self.assertEqual(stderr, '')
+        self.assertEqual(count_pooled_keys(1024, 'RSA', path=path), 2)
+
+        # keys are only generated until the requested number is available
+        stdout, stderr = self.cmd('fill_key_pool', key_size=1024, count=3, processes=1, path=path,
+                                  verbosity=2)
+        self.assertEqual(stdout, 'Generated 1 RSA keys with 1024 bits.\n')
+        self.assertEqual(count_pooled_keys(1024, 'RSA', path=path), 3)
+
+        for i in range(3):
+            key = get_pooled_key(1024, 'RSA', path=path)
+            self.assertIsInstance(key, rsa.RSAPrivateKey)
+            self.assertEqual(key.key_size, 1024)
+        self.assertIsNone(get_pooled_key(1024, 'RSA', path=path))
+        self.assertEqual(count_pooled_keys(1024, 'RSA', path=path), 0)
+
+    def test_setting(self):
+        path = os.path.join(ca_settings.CA_DIR, 'pool')
+        with self.settings(CA_KEY_POOL_DIR=path):
+            stdout, stderr = self.cmd('fill_key_pool', key_type='DSA', key_size=1024)
+            self.assertEqual(stdout, '')
+            self.assertEqual(stderr, '')
+
+            self.assertIsNone(get_pooled_key(1024, 'RSA'))
+            self.assertIsInstance(get_pooled_key(1024, 'DSA'), dsa.DSAPrivateKey)
+
+    def test_no_path(self):
+        with self.assertRaisesRegex(CommandError, r'^No directory given and CA_KEY_POOL_DIR is not set\.$'):
+            self.cmd('fill_key_pool', key_size=1024)
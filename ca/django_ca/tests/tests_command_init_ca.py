@@ -13,10 +13,12 @@
 # You should have received a copy of the GNU General Public License along with django-ca.  If not,
 # see <http://www.gnu.org/licenses/>.
 
+import os
 from datetime import timedelta
 
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.asymmetric import dsa
+from cryptography.hazmat.primitives.asymmetric import ec
 from cryptography.hazmat.primitives.asymmetric.rsa import RSAPrivateKey
 
 from django.core.management.base import CommandError
@@ -24,6 +26,9 @@ from django.core.management.base import CommandError
 from django_ca.models import CertificateAuthority
 
 from .. import ca_settings
+from ..keys import count_pooled_keys
+from ..keys import ed25519
+from ..keys import fill_key_pool
 from ..signals import post_create_ca
 from ..signals import pre_create_ca
 from ..utils import int_to_hex
@@ -512,3 +517,77 @@ class InitCATest(DjangoCATestCase):
             self.init_ca(key_size=2049)
         self.assertFalse(pre.called)
         self.assertFalse(post.called)
+
+    @override_tmpcadir(CA_MIN_KEY_SIZE=1024)
+    def test_key_pool(self):
+        path = os.path.join(ca_settings.CA_DIR, 'pool')
+        fill_key_pool(1024, 'RSA', 1, path=path)
+
+        with self.settings(CA_KEY_POOL_DIR=path):
+            out, err = self.init_ca(key_size=1024)
+            self.assertEqual(out, '')
+            self.assertEqual(err, '')
+            self.assertEqual(count_pooled_keys(1024, 'RSA'), 0)
+
+            # pool is empty now, but we can still create a CA
+            out, err = self.init_ca(name='Test CA 2', key_size=1024)
+            self.assertEqual(CertificateAuthority.objects.count(), 2)
+
+    @override_tmpcadir(CA_MIN_KEY_SIZE=1024)
+    def test_key_timeout(self):
+        with self.assertRaisesRegex(CommandError, r'^Private key was not generated within 0 seconds\.$'), \
+                self.assertSignal(pre_create_ca) as pre, self.assertSignal(post_create_ca) as post:
+            self.init_ca(key_size=4096, key_timeout=0)
+        self.assertTrue(pre.called)
+        self.assertFalse(post.called)
+        self.assertFalse(CertificateAuthority.objects.exists())
+
+    @override_tmpcadir(CA_MIN_KEY_SIZE=1024)
+    def test_ecc(self):
+        out, err = self.init_ca(key_type='ECC', ecc_curve=ec.SECP384R1(), pathlen=1)
+        self.assertEqual(out, '')
+        self.assertEqual(err, '')
+
+        ca = CertificateAuthority.objects.first()
+        ca.full_clean()
+        self.assertPrivateKey(ca)
+        self.assertSignature([ca], ca)
+        self.assertIsInstance(ca.key(None), ec.EllipticCurvePrivateKey)
+        self.assertIsInstance(ca.key(None).curve, ec.SECP384R1)
+        self.assertEqual((ca.key_type, ca.key_size), ('ECC', 384))
+
+        # create an intermediate CA with an RSA key
+        out, err = self.init_ca(name='Child', parent=ca)
+        self.assertEqual(out, '')
+        self.assertEqual(err, '')
+        child = CertificateAuthority.objects.get(name='Child')
+        self.assertSignature([ca, child], child)
+        self.assertEqual(child.key_type, 'RSA')
+
+    @override_tmpcadir(CA_MIN_KEY_SIZE=1024)
+    def test_ecc_default_curve(self):
+        self.init_ca(key_type='ECC', key_size=3)  # key size is ignored
+        ca = CertificateAuthority.objects.first()
+        self.assertIsInstance(ca.key(None).curve, ec.SECP256R1)
+
+    @override_tmpcadir(CA_MIN_KEY_SIZE=1024)
+    def test_ed25519(self):
+        if ed25519 is None:  # pragma: no cover
+            self.skipTest('Ed25519 requires cryptography>=2.8.')
+
+        out, err = self.init_ca(key_type='Ed25519')
+        self.assertEqual(out, '')
+        self.assertEqual(err, '')
+
+        ca = CertificateAuthority.objects.first()
+        ca.full_clean()
+        self.assertSignature([ca], ca)
+        self.assertIsInstance(ca.key(None), ed25519.Ed25519PrivateKey)
+        self.assertEqual((ca.key_type, ca.key_size), ('Ed25519', 256))
+        self.assertIsNone(ca.x509.signature_hash_algorithm)
+
+    @override_tmpcadir()
+    def test_unknown_curve(self):
+        with self.assertRaisesRegex(CommandError, '^Error: Unknown elliptic curve: foo$'):
+            self.call_command('init_ca', '--key-type=ECC', '--ecc-curve=foo', 'wrong_curve', 'subject')
+        self.assertFalse(CertificateAuthority.objects.exists())
@@ -13,15 +13,22 @@
 # You should have received a copy of the GNU General Public License along with django-ca.  If not,
 # see <http://www.gnu.org/licenses/>
 
+import csv
+import json
 from datetime import timedelta
 
+from django.core.management.base import CommandError
+from django.utils import six
 from django.utils import timezone
 
+from ..management.commands.list_certs import Command
 from ..models import Certificate
 from .base import DjangoCAWithCertTestCase
+from .base import cert2_pubkey
 from .base import child_pubkey
 from .base import override_settings
 from .base import override_tmpcadir
+from .base import patch
 
 
 @override_tmpcadir(CA_MIN_KEY_SIZE=1024, CA_PROFILES={}, CA_DEFAULT_SUBJECT={})
@@ -91,3 +98,97 @@ class ListCertsTestCase(DjangoCAWithCertTestCase):
         stdout, stderr = self.cmd('list_certs', ca=child_ca)
         self.assertEqual(stdout, '')
         self.assertEqual(stderr, '')
+
+    def valid_cert(self):
+        # fixture certificates are expired by now, so we make sure that the certificate is still valid
+        cert = Certificate.objects.get(serial=self.cert.serial)
+        cert.expires = (timezone.now() + timedelta(days=10)).replace(microsecond=0)
+        cert.save()
+        return cert
+
+    def test_json(self):
+        cert = self.valid_cert()
+
+        stdout, stderr = self.cmd('list_certs', format='json')
+        self.assertEqual(stderr, '')
+        self.assertEqual(json.loads(stdout), [{
+            'serial': cert.serial,
+            'cn': cert.cn,
+            'expires': cert.expires.isoformat(),
+            'revoked': False,
+        }])
+
+        stdout, stderr = self.cmd('list_certs', format='json', fields='serial,subject_alt_names,ca')
+        self.assertEqual(stderr, '')
+        self.assertEqual(json.loads(stdout), [{
+            'serial': cert.serial,
+            'subject_alt_names': cert.subject_alt_names.splitlines(),
+            'ca': self.ca.serial,
+        }])
+
+        stdout, stderr = self.cmd('list_certs', format='json', expires_within=5)
+        self.assertEqual(stdout, '[]\n')
+        self.assertEqual(stderr, '')
+
+    def test_csv(self):
+        cert = self.valid_cert()
+
+        stdout, stderr = self.cmd('list_certs', format='csv', fields='serial,cn,key_type,revoked_date')
+        self.assertEqual(stderr, '')
+        self.assertEqual(list(csv.reader(six.StringIO(stdout))), [
+            ['serial', 'cn', 'key_type', 'revoked_date'],
+            [cert.serial, cert.cn, cert.key_type, ''],
+        ])
+
+        stdout, stderr = self.cmd('list_certs', format='tsv', fields='serial,key_size')
+        self.assertEqual(stdout, 'serial\tkey_size\n%s\t%s\n' % (cert.serial, cert.key_size))
+        self.assertEqual(stderr, '')
+
+    def test_chunks(self):
+        cert = self.valid_cert()
+        cert2 = self.load_cert(self.ca, x509=cert2_pubkey)
+        cert2.expires = cert.expires + timedelta(days=1)
+        cert2.save()
+
+        with patch.object(Command, 'chunk_size', 1):
+            stdout, stderr = self.cmd('list_certs', format='tsv', fields='serial')
+        self.assertEqual(stdout, 'serial\n%s\n%s\n' % (cert.serial, cert2.serial))
+        self.assertEqual(stderr, '')
+
+    def test_expires_within(self):
+        cert = self.valid_cert()
+
+        stdout, stderr = self.cmd('list_certs', expires_within=11)
+        self.assertEqual(stdout, '%s\n' % self.line(cert))
+        self.assertEqual(stderr, '')
+
+        stdout, stderr = self.cmd('list_certs', expires_within=9)
+        self.assertEqual(stdout, '')
+        self.assertEqual(stderr, '')
+
+    def test_since_until(self):
+        cert = self.valid_cert()
+        day = cert.valid_from.strftime('%Y-%m-%d')
+        next_day = (cert.valid_from + timedelta(days=1)).strftime('%Y-%m-%d')
+
+        stdout, stderr = self.cmd('list_certs', '--since', day, '--until', next_day)
+        self.assertEqual(stdout, '%s\n' % self.line(cert))
+        self.assertEqual(stderr, '')
+
+        stdout, stderr = self.cmd('list_certs', '--since', next_day)
+        self.assertEqual(stdout, '')
+        self.assertEqual(stderr, '')
+
+        stdout, stderr = self.cmd('list_certs', '--until', day)
+        self.assertEqual(stdout, '')
+        self.assertEqual(stderr, '')
+
+    @override_settings(USE_TZ=True)
+    def test_since_until_with_use_tz(self):
+        self.test_since_until()
+
+    def test_errors(self):
+        with self.assertRaisesRegex(CommandError, r'^--fields is only supported with'):
+            self.cmd('list_certs', fields='serial')
+        with self.assertRaisesRegex(CommandError, r'^foo, bar: Unknown field\.$'):
+            self.cmd('list_certs', format='json', fields='serial,foo,bar')
@@ -14,14 +14,20 @@
 # see <http://www.gnu.org/licenses/>
 
 from datetime import timedelta
+from smtplib import SMTPException
 
 from django.core import mail
 from django.utils import timezone
 
+from ..management.commands.notify_expiring_certs import Command
 from ..models import Certificate
+from ..models import ExpiryNotification
 from ..models import Watcher
 from .base import DjangoCAWithCertTestCase
+from .base import cert2_pubkey
+from .base import override_settings
 from .base import override_tmpcadir
+from .base import patch
 
 
 @override_tmpcadir(CA_MIN_KEY_SIZE=1024, CA_PROFILES={}, CA_DEFAULT_SUBJECT={},
@@ -79,3 +85,131 @@ class ViewCertTestCase(DjangoCAWithCertTestCase):
             self.assertEqual(stderr, '')
 
         self.assertEqual(len(mail.outbox), 4)
+
+    def test_digest(self):
+        cert1 = Certificate.objects.get(serial=self.cert.serial)
+        cert1.expires = timezone.now() + timedelta(days=3, hours=1)
+        cert1.save()
+        cert2 = self.load_cert(self.ca, x509=cert2_pubkey)
+        cert2.expires = timezone.now() + timedelta(days=7, hours=1)
+        cert2.save()
+
+        watcher1 = Watcher.from_addr('user1@example.com')
+        watcher2 = Watcher.from_addr('user2@example.com')
+        cert1.watchers.add(watcher1, watcher2)
+        cert2.watchers.add(watcher1)
+
+        # one query for certificates, one for their watchers and one to record notifications, plus the
+        # savepoints of the transaction
+        with self.assertNumQueries(7):
+            stdout, stderr = self.cmd('notify_expiring_certs')
+        self.assertEqual(stdout, '')
+        self.assertEqual(stderr, '')
+
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(mail.outbox[0].to, ['user1@example.com'])
+        self.assertEqual(mail.outbox[0].subject, 'Certificate expiration for 2 certificates')
+        self.assertEqual(mail.outbox[0].body, """The following certificates will expire soon:
+
+* %s on %s
+* %s on %s""" % (cert1.cn, cert1.expires.strftime('%Y-%m-%d'), cert2.cn, cert2.expires.strftime('%Y-%m-%d')))
+        self.assertEqual(mail.outbox[1].to, ['user2@example.com'])
+        self.assertEqual(mail.outbox[1].subject, 'Certificate expiration for %s on %s' % (
+            cert1.cn, cert1.expires.strftime('%Y-%m-%d')))
+
+        # certificates are not notified if the number of days is not configured or they are out of range
+        mail.outbox = []
+        with override_settings(CA_NOTIFICATION_DAYS=[14, 1]):
+            self.cmd('notify_expiring_certs')
+        self.assertEqual(len(mail.outbox), 0)
+        with self.assertNumQueries(0):
+            self.cmd('notify_expiring_certs', days=0)
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_run_twice(self):
+        cert = Certificate.objects.get(serial=self.cert.serial)
+        cert.expires = timezone.now() + timedelta(days=3, hours=1)
+        cert.save()
+        cert.watchers.add(Watcher.from_addr('user1@example.com'))
+
+        self.cmd('notify_expiring_certs')
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(list(cert.expiry_notifications.values_list('threshold', flat=True)), [3])
+
+        self.cmd('notify_expiring_certs')
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(ExpiryNotification.objects.count(), 1)
+
+    def test_missed_threshold(self):
+        cert = Certificate.objects.get(serial=self.cert.serial)
+        cert.expires = timezone.now() + timedelta(days=5, hours=1)
+        cert.save()
+        cert.watchers.add(Watcher.from_addr('user1@example.com'))
+        ExpiryNotification.objects.create(cert=cert, threshold=14)
+
+        # the command did not run when the certificate crossed the threshold of seven days
+        self.cmd('notify_expiring_certs')
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(list(cert.expiry_notifications.order_by('threshold').values_list(
+            'threshold', flat=True)), [7, 14])
+
+        self.cmd('notify_expiring_certs')
+        self.assertEqual(len(mail.outbox), 1)
+
+        # certificates without watchers are also recorded, so they are not read again
+        cert2 = self.load_cert(self.ca, x509=cert2_pubkey)
+        cert2.expires = timezone.now() + timedelta(days=1, hours=1)
+        cert2.save()
+        self.cmd('notify_expiring_certs')
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(list(cert2.expiry_notifications.values_list('threshold', flat=True)), [1])
+
+    def test_concurrent_run(self):
+        cert1 = Certificate.objects.get(serial=self.cert.serial)
+        cert1.expires = timezone.now() + timedelta(days=3, hours=1)
+        cert1.save()
+        cert2 = self.load_cert(self.ca, x509=cert2_pubkey)
+        cert2.expires = timezone.now() + timedelta(days=7, hours=1)
+        cert2.save()
+
+        watcher = Watcher.from_addr('user1@example.com')
+        cert1.watchers.add(watcher)
+        cert2.watchers.add(watcher)
+
+        # Another run notifies watchers of the first certificate after this run selected certificates
+        get_queryset = Command.get_queryset
+
+        def concurrent_get_queryset(cmd, now, thresholds):
+            certs = list(get_queryset(cmd, now, thresholds))
+            ExpiryNotification.objects.create(cert=cert1, threshold=3)
+            return certs
+
+        with patch.object(Command, 'get_queryset', concurrent_get_queryset):
+            self.cmd('notify_expiring_certs')
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].subject, 'Certificate expiration for %s on %s' % (
+            cert2.cn, cert2.expires.strftime('%Y-%m-%d')))
+        self.assertEqual(list(cert1.expiry_notifications.values_list('threshold', flat=True)), [3])
+        self.assertEqual(list(cert2.expiry_notifications.values_list('threshold', flat=True)), [7])
+
+    def test_send_error(self):
+        cert = Certificate.objects.get(serial=self.cert.serial)
+        cert.expires = timezone.now() + timedelta(days=3, hours=1)
+        cert.save()
+        cert.watchers.add(Watcher.from_addr('user1@example.com'))
+
+        with patch('django_ca.management.commands.notify_expiring_certs.send_mass_mail',
+                   side_effect=SMTPException('error')), self.assertRaises(SMTPException):
+            self.cmd('notify_expiring_certs')
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(ExpiryNotification.objects.count(), 0)
+
+        # the next run sends the notification
+        self.cmd('notify_expiring_certs')
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(list(cert.expiry_notifications.values_list('threshold', flat=True)), [3])
+
+    @override_settings(USE_TZ=True)
+    def test_digest_with_use_tz(self):
+        self.test_digest()
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of django-ca (https://github.com/mathiasertl/django-ca).
+#
+# django-ca is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# django-ca is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with django-ca.  If not,
+# see <http://www.gnu.org/licenses/>.
+
+import os
+import shutil
+import stat
+import tempfile
+
+import asn1crypto
+from cryptography import x509
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.serialization import Encoding
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import CommandError
+
+from ..crl import build_crl
+from ..crl import get_crl_cache_key
+from ..models import Certificate
+from ..models import CertificateAuthority
+from ..signals import post_create_ca
+from .base import DjangoCAWithCertTestCase
+from .base import certs
+from .base import override_settings
+from .base import patch
+
+profiles = {
+    'user': {'encodings': ['DER'], 'algorithm': 'SHA256', 'expires': 300, 'base': True},
+    'delta': {'algorithm': 'SHA256', 'delta': True},
+    'ca': {'ca_crl': True},
+}
+responders = {
+    'root': {
+        'ca': certs['root']['serial'],
+        'responder_key': settings.OCSP_KEY_PATH,
+        'responder_cert': settings.OCSP_PEM_PATH,
+    },
+}
+
+
+@override_settings(CA_CRL_PROFILES=profiles)
+class PublishCRLsTestCase(DjangoCAWithCertTestCase):
+    def setUp(self):
+        super(PublishCRLsTestCase, self).setUp()
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        super(PublishCRLsTestCase, self).tearDown()
+        shutil.rmtree(self.path)
+
+    def read(self, *path):
+        with open(os.path.join(self.path, *path), 'rb') as stream:
+            return stream.read()
+
+    def get_crl(self, *path):
+        return x509.load_der_x509_crl(self.read(*path), default_backend())
+
+    def get_ocsp_status(self, cert):
+        data = self.read('ocsp', self.ca.serial, '%s.der' % cert.serial)
+        response = asn1crypto.ocsp.OCSPResponse.load(data)
+        self.assertEqual(response['response_status'].native, 'successful')
+        single = response.basic_ocsp_response['tbs_response_data']['responses'][0]
+        self.assertEqual(single['cert_id']['serial_number'].native, cert.x509.serial_number)
+        return single['cert_status'].name
+
+    def test_basic(self):
+        stdout, stderr = self.cmd('publish_crls', path=self.path)
+        self.assertEqual(stdout, '')
+        self.assertEqual(stderr, '')
+
+        self.assertEqual(self.read('ca', '%s.der' % self.ca.serial), self.ca.dump_certificate(Encoding.DER))
+        self.assertEqual(self.read('ca', '%s.pem' % self.ca.serial), self.ca.dump_certificate(Encoding.PEM))
+
+        crl = self.get_crl('crl', '%s.der' % self.ca.serial)
+        pem = x509.load_pem_x509_crl(self.read('crl', '%s.pem' % self.ca.serial), default_backend())
+        self.assertEqual(crl.public_bytes(Encoding.DER), pem.public_bytes(Encoding.DER))
+        self.assertEqual((crl.next_update - crl.last_update).seconds, 300)
+        self.assertIsNotNone(self.get_crl('crl', 'ca', '%s.der' % self.ca.serial))
+        delta = self.get_crl('crl', 'delta', '%s.der' % self.ca.serial)
+        self.assertIsNotNone(delta.extensions.get_extension_for_class(x509.DeltaCRLIndicator))
+
+        # files are readable by the webserver
+        mode = os.stat(os.path.join(self.path, 'crl', '%s.der' % self.ca.serial)).st_mode
+        self.assertEqual(stat.S_IMODE(mode), 0o644)
+
+        # no OCSP responses by default
+        self.assertFalse(os.path.exists(os.path.join(self.path, 'ocsp')))
+
+    def test_ocsp(self):
+        with self.settings(CA_OCSP_URLS=responders):
+            stdout, stderr = self.cmd('publish_crls', self.ca.serial, path=self.path, ocsp=True, verbosity=2)
+        count = 8 + Certificate.objects.filter(ca=self.ca).count()
+        self.assertEqual(stdout, '%s: Published %s files.\n' % (self.ca.serial, count))
+        self.assertEqual(stderr, '')
+        self.assertEqual(self.get_ocsp_status(self.cert), 'good')
+
+    @override_settings(CA_PUBLISH_OCSP=True, CA_OCSP_URLS=responders)
+    def test_signals(self):
+        with self.settings(CA_PUBLISH_DIR=self.path):
+            post_create_ca.send(sender=CertificateAuthority, ca=self.ca)
+            self.assertEqual(self.read('ca', '%s.pem' % self.ca.serial),
+                             self.ca.dump_certificate(Encoding.PEM))
+            self.assertEqual(list(self.get_crl('crl', '%s.der' % self.ca.serial)), [])
+
+            self.cert.revoke()
+
+        crl = self.get_crl('crl', '%s.der' % self.ca.serial)
+        self.assertEqual([r.serial_number for r in crl], [self.cert.x509.serial_number])
+        self.assertEqual(self.get_ocsp_status(self.cert), 'revoked')
+
+    def test_signals_build_once(self):
+        # Every CRL is built once per revocation and both cached and published
+        self.cmd('publish_crls', path=self.path)  # issue a base CRL, so that a delta CRL is built too
+        with self.settings(CA_PUBLISH_DIR=self.path), \
+                patch('django_ca.crl.build_crl', side_effect=build_crl) as build_mock:
+            self.cert.revoke()
+
+        self.assertEqual(build_mock.call_count, 2)  # complete and delta CRL
+        crl = self.read('crl', '%s.der' % self.ca.serial)
+        cache_key = get_crl_cache_key(self.ca.serial, Encoding.DER, hashes.SHA256())
+        self.assertEqual(cache.get(cache_key), crl)
+
+        delta = self.read('crl', 'delta', '%s.der' % self.ca.serial)
+        cache_key = get_crl_cache_key(self.ca.serial, Encoding.DER, hashes.SHA256(), delta=True)
+        self.assertEqual(cache.get(cache_key), delta)
+
+    def test_errors(self):
+        msg = r'^No path given and the CA_PUBLISH_DIR setting is not set\.$'
+        with self.assertRaisesRegex(CommandError, msg):
+            self.cmd('publish_crls')
+        with self.assertRaisesRegex(CommandError, r'^foo: Certificate authority not found\.$'):
+            self.cmd('publish_crls', 'foo', path=self.path)
+
+        msg = r'^%s: No OCSP responder configured\.$' % self.ca.serial
+        with self.assertRaisesRegex(CommandError, msg), self.settings(CA_OCSP_URLS={}):
+            self.cmd('publish_crls', self.ca.serial, path=self.path, ocsp=True)
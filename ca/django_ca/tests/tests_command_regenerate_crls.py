@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of django-ca (https://github.com/mathiasertl/django-ca).
+#
+# django-ca is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# django-ca is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with django-ca.  If not,
+# see <http://www.gnu.org/licenses/>.
+
+from cryptography import x509
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.serialization import Encoding
+
+from django.core.cache import cache
+from django.core.management.base import CommandError
+
+from ..crl import get_crl_cache_key
+from .base import DjangoCAWithCertTestCase
+from .base import override_settings
+
+profiles = {
+    'user': {'encodings': ['DER', 'PEM'], 'algorithm': 'SHA256', 'expires': 300, 'base': True},
+    'delta': {'algorithm': 'SHA256', 'delta': True},
+    'ca': {'ca_crl': True},
+}
+
+
+@override_settings(CA_CRL_PROFILES=profiles)
+class RegenerateCRLsTestCase(DjangoCAWithCertTestCase):
+    def setUp(self):
+        super(RegenerateCRLsTestCase, self).setUp()
+        cache.clear()
+
+    def tearDown(self):
+        super(RegenerateCRLsTestCase, self).tearDown()
+        cache.clear()
+
+    def get_crl(self, encoding=Encoding.DER, algorithm=hashes.SHA256(), **kwargs):
+        data = cache.get(get_crl_cache_key(self.ca.serial, encoding, algorithm, **kwargs))
+        if data is None:
+            return None
+        if encoding == Encoding.PEM:
+            return x509.load_pem_x509_crl(data, default_backend())
+        return x509.load_der_x509_crl(data, default_backend())
+
+    def assertCRLNumber(self, crl, number):
+        self.assertEqual(crl.extensions.get_extension_for_class(x509.CRLNumber).value.crl_number, number)
+
+    def test_basic(self):
+        stdout, stderr = self.cmd('regenerate_crls')
+        self.assertEqual(stdout, '')
+        self.assertEqual(stderr, '')
+
+        # both encodings are the same signed CRL
+        der = self.get_crl()
+        pem = self.get_crl(Encoding.PEM)
+        self.assertEqual(der.public_bytes(Encoding.DER), pem.public_bytes(Encoding.DER))
+        self.assertIsInstance(der.signature_hash_algorithm, hashes.SHA256)
+        self.assertEqual((der.next_update - der.last_update).seconds, 300)
+
+        # "ca" profile is generated first (sorted by name), delta CRL last
+        self.assertCRLNumber(self.get_crl(algorithm=hashes.SHA512(), ca_crl=True), 1)
+        self.assertCRLNumber(der, 2)
+        delta = self.get_crl(delta=True)
+        self.assertCRLNumber(delta, 3)
+        self.assertEqual(delta.extensions.get_extension_for_class(x509.DeltaCRLIndicator).value.crl_number, 2)
+
+    def test_serial(self):
+        stdout, stderr = self.cmd('regenerate_crls', self.ca.serial, verbosity=2)
+        self.assertEqual(stdout, '%s: Stored 4 CRLs.\n' % self.ca.serial)
+        self.assertEqual(stderr, '')
+        self.assertIsNotNone(self.get_crl())
+
+    def test_profile(self):
+        self.cmd('regenerate_crls', profiles=['ca'])
+        self.assertIsNone(self.get_crl())
+        self.assertIsNotNone(self.get_crl(algorithm=hashes.SHA512(), ca_crl=True))
+
+    def test_errors(self):
+        with self.assertRaisesRegex(CommandError, r'^foo: Certificate authority not found\.$'):
+            self.cmd('regenerate_crls', 'foo')
+        with self.assertRaisesRegex(CommandError, r'^bar, foo: Unknown CRL profile\.$'):
+            self.cmd('regenerate_crls', profiles=['foo', 'bar'])
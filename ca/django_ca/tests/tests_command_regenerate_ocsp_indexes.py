@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of django-ca (https://github.com/mathiasertl/django-ca).
+#
+# django-ca is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# django-ca is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with django-ca.  If not,
+# see <http://www.gnu.org/licenses/>.
+
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.core.management.base import CommandError
+from django.utils import timezone
+
+from ..models import Certificate
+from ..ocsp import OCSPIndexFile
+from ..ocsp import date_format
+from ..ocsp import get_index_path
+from ..signals import post_issue_cert
+from .base import DjangoCAWithCertTestCase
+from .base import cert2_pubkey
+from .base import cert3_pubkey
+from .base import override_settings
+from .base import override_tmpcadir
+from .base import patch
+
+
+class RegenerateOCSPIndexesTestCase(DjangoCAWithCertTestCase):
+    reasons = {  # reasons as understood by OpenSSL
+        'cessation_of_operation': 'cessationOfOperation',
+        'key_compromise': 'keyCompromise',
+    }
+
+    def setUp(self):
+        super(RegenerateOCSPIndexesTestCase, self).setUp()
+        self.tmpdir = tempfile.mkdtemp()
+        self.expires = (timezone.now() + timedelta(days=30)).replace(microsecond=0)
+        Certificate.objects.filter(pk=self.cert.pk).update(expires=self.expires)
+        self.cert.refresh_from_db()
+
+    def tearDown(self):
+        super(RegenerateOCSPIndexesTestCase, self).tearDown()
+        shutil.rmtree(self.tmpdir)
+
+    def load_valid_cert(self, x509):
+        cert = self.load_cert(ca=self.ca, x509=x509)
+        cert.expires = self.expires
+        cert.save()
+        return cert
+
+    def line(self, cert):
+        revocation = ''
+        if cert.revoked:
+            revocation = cert.revoked_date.strftime(date_format)
+            if cert.revoked_reason:
+                revocation += ',%s' % self.reasons.get(cert.revoked_reason, cert.revoked_reason)
+
+        # the file name is padded to the longest possible revocation date and reason
+        return '%s\t%s\t%s\t%s\tunknown%s\t%s\n' % (
+            'R' if cert.revoked else 'V', cert.expires.strftime(date_format), revocation,
+            cert.serial.replace(':', ''), ' ' * (34 - len(revocation)), cert.distinguishedName())
+
+    def read(self):
+        with open(get_index_path(self.ca)) as stream:
+            return stream.read()
+
+    def test_basic(self):
+        expired = self.load_valid_cert(cert2_pubkey)
+        Certificate.objects.filter(pk=expired.pk).update(expires=timezone.now() - timedelta(days=1))
+        revoked = self.load_valid_cert(cert3_pubkey)
+        revoked.revoke('cessation_of_operation')  # longest revocation reason
+
+        with override_settings(CA_OCSP_INDEX_DIR=self.tmpdir):
+            stdout, stderr = self.cmd('regenerate_ocsp_indexes', self.ca.serial, verbosity=2)
+            path = get_index_path(self.ca)
+            self.assertEqual(stdout, '%s: Wrote 2 certificates to %s.\n' % (self.ca.serial, path))
+            self.assertEqual(stderr, '')
+
+            # expired certificates are removed, all lines have the same length
+            self.assertEqual(self.read(), self.line(self.cert) + self.line(revoked))
+
+            # regenerate all indexes
+            stdout, stderr = self.cmd('regenerate_ocsp_indexes')
+            self.assertEqual(stdout, '')
+            self.assertEqual(stderr, '')
+            self.assertEqual(self.read(), self.line(self.cert) + self.line(revoked))
+
+    def test_incremental(self):
+        with override_settings(CA_OCSP_INDEX_DIR=self.tmpdir):
+            # The index is created when the first certificate is issued
+            cert2 = self.load_valid_cert(cert2_pubkey)
+            post_issue_cert.send(sender=Certificate, cert=cert2)
+            self.assertEqual(self.read(), self.line(self.cert) + self.line(cert2))
+
+            # new certificates are appended
+            cert3 = self.load_valid_cert(cert3_pubkey)
+            post_issue_cert.send(sender=Certificate, cert=cert3)
+            expected = self.line(self.cert) + self.line(cert2) + self.line(cert3)
+            self.assertEqual(self.read(), expected)
+
+            # revoking updates the line in place
+            size = os.path.getsize(get_index_path(self.ca))
+            cert2.revoke('key_compromise')
+            expected = self.line(self.cert) + self.line(cert2) + self.line(cert3)
+            self.assertEqual(self.read(), expected)
+            self.assertEqual(os.path.getsize(get_index_path(self.ca)), size)
+
+            # updating a certificate again also works
+            cert2.revoke()
+            self.assertEqual(self.read(), self.line(self.cert) + self.line(cert2) + self.line(cert3))
+
+            # OpenSSL does not know all reasons, so only the date is written
+            cert3.revoke('privilege_withdrawn')
+            self.assertIn('\t%s\t' % cert3.revoked_date.strftime(date_format), self.read())
+            self.assertEqual(os.path.getsize(get_index_path(self.ca)), size)
+
+    def test_rebuild_error(self):
+        index = OCSPIndexFile(os.path.join(self.tmpdir, 'index.txt'))
+        index.rebuild(self.ca)
+        cert2 = self.load_valid_cert(cert2_pubkey)
+
+        # a failed rebuild keeps the old index and offsets
+        with patch('django_ca.ocsp.OCSPIndexFile.get_line', side_effect=Exception('foo')), \
+                self.assertRaisesRegex(Exception, r'^foo$'):
+            index.rebuild(self.ca)
+        self.assertEqual([f for f in os.listdir(self.tmpdir) if '.tmp' in f], [])  # temporary files removed
+
+        size = os.path.getsize(index.path)
+        self.cert.revoke('key_compromise')
+        index.update(self.cert)
+        with open(index.path) as stream:
+            self.assertEqual(stream.read(), self.line(self.cert))
+        self.assertEqual(os.path.getsize(index.path), size)
+
+        # the index is rebuilt if the offsets are missing
+        for name in os.listdir(self.tmpdir):
+            if name.startswith('index.txt.offsets'):
+                os.remove(os.path.join(self.tmpdir, name))
+        index.update(cert2)
+        with open(index.path) as stream:
+            self.assertEqual(stream.read(), self.line(self.cert) + self.line(cert2))
+
+    def test_create_ca(self):
+        with override_tmpcadir(CA_OCSP_INDEX_DIR=self.tmpdir, CA_MIN_KEY_SIZE=1024, CA_PROFILES={},
+                               CA_DEFAULT_SUBJECT={}):
+            ca = self.create_ca('new')
+            with open(get_index_path(ca)) as stream:
+                self.assertEqual(stream.read(), '')
+
+    def test_dump(self):
+        # dump_ocsp_index also writes reasons as understood by OpenSSL
+        self.cert.revoke('key_compromise')
+        stdout, stderr = self.cmd('dump_ocsp_index')
+        self.assertIn('\t%s,keyCompromise\t' % self.cert.revoked_date.strftime(date_format), stdout)
+        self.assertEqual(stderr, '')
+
+    def test_no_stored_name(self):
+        Certificate.objects.filter(pk=self.cert.pk).update(distinguished_name='')
+        path = os.path.join(self.tmpdir, 'sub', 'index.txt')
+        with self.assertNumQueries(1):
+            self.assertEqual(OCSPIndexFile(path).rebuild(self.ca), 1)
+        with open(path) as stream:
+            self.assertEqual(stream.read(), self.line(self.cert))
+
+    def test_not_configured(self):
+        with self.assertRaisesRegex(CommandError, r'^CA_OCSP_INDEX_DIR is not set\.$'):
+            self.cmd('regenerate_ocsp_indexes')
+
+        # no error when a certificate is issued
+        post_issue_cert.send(sender=Certificate, cert=self.cert)
+
+    def test_unknown_ca(self):
+        with override_settings(CA_OCSP_INDEX_DIR=self.tmpdir):
+            with self.assertRaisesRegex(CommandError, r'^unknown: Certificate authority not found\.$'):
+                self.cmd('regenerate_ocsp_indexes', 'unknown')
+
+    def test_error(self):
+        with override_settings(CA_OCSP_INDEX_DIR=os.path.join(self.tmpdir, 'file')):
+            with open(os.path.join(self.tmpdir, 'file'), 'w') as stream:
+                stream.write('not a directory')
+
+            with self.assertRaisesRegex(CommandError, r'^%s: ' % self.ca.serial):
+                self.cmd('regenerate_ocsp_indexes', self.ca.serial)
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of django-ca (https://github.com/mathiasertl/django-ca).
+#
+# django-ca is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# django-ca is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with django-ca.  If not,
+# see <http://www.gnu.org/licenses/>.
+
+import shutil
+import tempfile
+from datetime import timedelta
+
+import asn1crypto
+
+from django.conf import settings
+from django.core.management.base import CommandError
+from django.utils import timezone
+
+from ..models import Certificate
+from ..ocsp import get_issuer_key_hash
+from ..ocsp import get_response_store
+from .base import DjangoCAWithCertTestCase
+from .base import certs
+from .base import override_settings
+
+
+def _responders(path):
+    return {
+        'root': {
+            'ca': certs['root']['serial'],
+            'responder_key': settings.OCSP_KEY_PATH,
+            'responder_cert': settings.OCSP_PEM_PATH,
+            'response_store': {
+                'BACKEND': 'django_ca.ocsp.FileSystemResponseStore',
+                'OPTIONS': {'path': path},
+            },
+        },
+        'no-store': {
+            'ca': certs['root']['serial'],
+            'responder_key': settings.OCSP_KEY_PATH,
+            'responder_cert': settings.OCSP_PEM_PATH,
+        },
+    }
+
+
+class RegenerateOCSPResponsesTestCase(DjangoCAWithCertTestCase):
+    def setUp(self):
+        super(RegenerateOCSPResponsesTestCase, self).setUp()
+        self.path = tempfile.mkdtemp()
+        self.responders = _responders(self.path)
+        self.store = get_response_store(self.responders['root']['response_store'])
+
+    def tearDown(self):
+        super(RegenerateOCSPResponsesTestCase, self).tearDown()
+        shutil.rmtree(self.path)
+
+    def get_stored(self, cert):
+        return self.store.get(get_issuer_key_hash(self.ca), cert.x509.serial_number)
+
+    def test_basic(self):
+        with self.settings(CA_OCSP_URLS=self.responders):
+            stdout, stderr = self.cmd('regenerate_ocsp_responses')
+        self.assertEqual(stdout, '')
+        self.assertEqual(stderr, '')
+
+        response = asn1crypto.ocsp.OCSPResponse.load(self.get_stored(self.cert))
+        self.assertEqual(response['response_status'].native, 'successful')
+        single = response.basic_ocsp_response['tbs_response_data']['responses'][0]
+        self.assertEqual(single['cert_id']['serial_number'].native, self.cert.x509.serial_number)
+        self.assertIsNone(single['cert_status'].native)
+
+    def test_named(self):
+        with self.settings(CA_OCSP_URLS=self.responders):
+            stdout, stderr = self.cmd('regenerate_ocsp_responses', 'root', verbosity=2)
+        self.assertEqual(stdout, 'root: Stored 1 responses.\n')
+        self.assertEqual(stderr, '')
+        self.assertIsNotNone(self.get_stored(self.cert))
+
+    def test_expired(self):
+        cert = Certificate.objects.get(pk=self.cert.pk)
+        cert.expires = timezone.now() - timedelta(days=1)
+        cert.save()
+
+        with self.settings(CA_OCSP_URLS=self.responders):
+            self.cmd('regenerate_ocsp_responses')
+        self.assertIsNone(self.get_stored(self.cert))
+
+    def test_errors(self):
+        with self.settings(CA_OCSP_URLS=self.responders):
+            with self.assertRaisesRegex(CommandError, r'^foo: OCSP responder not found\.$'):
+                self.cmd('regenerate_ocsp_responses', 'foo')
+            with self.assertRaisesRegex(CommandError, r'^no-store: OCSP responder has no response store\.$'):
+                self.cmd('regenerate_ocsp_responses', 'no-store')
+
+        self.responders['root']['ca'] = 'unknown'
+        with override_settings(CA_OCSP_URLS=self.responders):
+            with self.assertRaisesRegex(CommandError, r'^root: '):
+                self.cmd('regenerate_ocsp_responses')
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of django-ca (https://github.com/mathiasertl/django-ca).
+#
+# django-ca is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# django-ca is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with django-ca.  If not,
+# see <http://www.gnu.org/licenses/>.
+
+import os
+import shutil
+import tempfile
+from collections import OrderedDict
+
+from django.core.management.base import CommandError
+from django.utils import six
+
+from ..models import Certificate
+from ..models import Watcher
+from .base import DjangoCAWithCSRTestCase
+from .base import cert2_csr
+from .base import cert3_csr
+from .base import override_tmpcadir
+
+
+@override_tmpcadir(CA_MIN_KEY_SIZE=1024, CA_PROFILES={}, CA_DEFAULT_SUBJECT={})
+class SignCertsTestCase(DjangoCAWithCSRTestCase):
+    def setUp(self):
+        super(SignCertsTestCase, self).setUp()
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        super(SignCertsTestCase, self).tearDown()
+        shutil.rmtree(self.path)
+
+    def write(self, name, data):
+        path = os.path.join(self.path, name)
+        with open(path, 'w') as stream:
+            stream.write(data)
+        return path
+
+    def assertCerts(self, *cns):
+        certs = list(Certificate.objects.order_by('cn'))
+        self.assertEqual([c.cn for c in certs], list(cns))
+        for cert in certs:
+            self.assertSignature([self.ca], cert)
+        return certs
+
+    def test_directory(self):
+        self.write('cert2.csr', cert2_csr)
+        self.write('cert3.csr', cert3_csr)
+
+        stdout, stderr = self.cmd('sign_certs', self.path, expires=self.expires(30), threads=2)
+        self.assertEqual(stderr, '')
+        certs = self.assertCerts('cert2-csr.example.com', 'cert3-csr.example.com')
+        self.assertEqual(stdout, ''.join([c.pub for c in certs]))
+
+    def test_stdin(self):
+        stdin = six.StringIO('%s\n%s\n' % (cert2_csr, cert3_csr))
+
+        watchers = ['user@example.com', 'user@example.net']
+        stdout, stderr = self.cmd('sign_certs', '-', stdin=stdin, expires=self.expires(30), watch=watchers)
+        self.assertEqual(stderr, '')
+        certs = self.assertCerts('cert2-csr.example.com', 'cert3-csr.example.com')
+        for cert in certs:
+            self.assertEqual(list(cert.watchers.all()), list(Watcher.objects.order_by('pk')))
+
+    def test_out(self):
+        path = self.write('bundle.csr', '%s\n%s\n' % (cert2_csr, cert3_csr))
+        out = os.path.join(self.path, 'out')
+
+        subject = OrderedDict([('CN', 'example.com')])
+        stdout, stderr = self.cmd('sign_certs', path, out=out, subject=subject, expires=self.expires(30))
+        self.assertEqual(stdout, '')
+        self.assertEqual(stderr, '')
+
+        certs = self.assertCerts('example.com', 'example.com')
+        self.assertEqual(sorted(os.listdir(out)), sorted(['%s.pem' % c.serial_hex for c in certs]))
+        for cert in certs:
+            with open(os.path.join(out, '%s.pem' % cert.serial_hex)) as stream:
+                self.assertEqual(stream.read(), cert.pub)
+
+    def test_errors(self):
+        with self.assertRaisesRegex(CommandError, r'^/does/not/exist: No such file or directory\.$'):
+            self.cmd('sign_certs', '/does/not/exist', expires=self.expires(30))
+
+        # cert1 has no CommonName
+        path = self.write('cert1.csr', self.csr_pem)
+        with self.assertRaisesRegex(CommandError, r'^Must name at least a CN or a subjectAltName\.$'):
+            self.cmd('sign_certs', path, expires=self.expires(30))
+        self.assertFalse(Certificate.objects.exists())
+
+        with self.assertRaisesRegex(CommandError, r'^Certificate would outlive CA'):
+            self.cmd('sign_certs', path, expires=self.expires(36500))
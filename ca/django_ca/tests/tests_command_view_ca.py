@@ -56,6 +56,7 @@ subjectKeyIdentifier:
 
 X509 v3 certificate extensions for signed certificates:
 * Certificate Revokation List (CRL): None
+* Delta CRL: None
 * Issuer URL: None
 * OCSP URL: None
 * Issuer Alternative Name: None
@@ -99,6 +100,7 @@ subjectKeyIdentifier:
 
 X509 v3 certificate extensions for signed certificates:
 * Certificate Revokation List (CRL): None
+* Delta CRL: None
 * Issuer URL: None
 * OCSP URL: None
 * Issuer Alternative Name: None
@@ -133,6 +135,7 @@ subjectKeyIdentifier:
 
 X509 v3 certificate extensions for signed certificates:
 * Certificate Revokation List (CRL): None
+* Delta CRL: None
 * Issuer URL: None
 * OCSP URL: None
 * Issuer Alternative Name: None
@@ -194,6 +197,7 @@ subjectKeyIdentifier:
 
 X509 v3 certificate extensions for signed certificates:
 * Certificate Revokation List (CRL): None
+* Delta CRL: None
 * Issuer URL: None
 * OCSP URL: None
 * Issuer Alternative Name: None
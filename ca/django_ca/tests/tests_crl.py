@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of django-ca (https://github.com/mathiasertl/django-ca).
+#
+# django-ca is free software: you can redistribute it and/or modify it under the terms of the GNU
+# General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# django-ca is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with django-ca.  If not,
+# see <http://www.gnu.org/licenses/>.
+
+import threading
+import time
+
+from django.core.cache import cache
+
+from ..crl import get_cached_crl
+from ..crl import set_cached_crl
+from .base import DjangoCATestCase
+from .base import Mock
+from .base import patch
+
+
+class GetCachedCRLTestCase(DjangoCATestCase):
+    key = 'crl_test'
+    count = 10  # number of concurrent threads
+    timeout = 10  # upper bound when waiting for events, so a broken test does not hang forever
+
+    def setUp(self):
+        super(GetCachedCRLTestCase, self).setUp()
+        cache.clear()
+        self.calls = 0
+        self.calls_lock = threading.Lock()
+
+        # Events to coordinate threads: generate() blocks until "ready" is set and sets "generated" when done
+        self.ready = threading.Event()
+        self.generated = threading.Event()
+        self.waiting = set()  # threads waiting for the CRL to be generated
+        self.waiting_done = threading.Event()  # set when all other threads are waiting
+        self.returned_done = threading.Event()  # set when all other threads have returned
+
+    def tearDown(self):
+        super(GetCachedCRLTestCase, self).tearDown()
+        cache.clear()
+
+    def generate(self):
+        with self.calls_lock:
+            self.calls += 1
+        self.assertTrue(self.ready.wait(self.timeout))
+        self.generated.set()
+        return b'new'
+
+    def sleep(self, seconds):
+        # replaces time.sleep() in get_cached_crl(): record that the thread waits for the CRL
+        with self.calls_lock:
+            self.waiting.add(threading.current_thread())
+            if len(self.waiting) == self.count - 1:
+                self.waiting_done.set()
+        self.generated.wait(self.timeout)
+
+    def run_concurrently(self, **kwargs):
+        kwargs.setdefault('expires', 600)
+        start = threading.Event()
+        results = []
+
+        def run():
+            start.wait()
+            result = get_cached_crl(self.key, self.generate, **kwargs)
+            with self.calls_lock:
+                results.append(result)
+                if len(results) == self.count - 1:
+                    self.returned_done.set()
+
+        threads = [threading.Thread(target=run) for i in range(self.count)]
+        # only replace sleep() in django_ca.crl, so other code is not affected
+        with patch('django_ca.crl.time', Mock(time=time.time, sleep=self.sleep)):
+            for thread in threads:
+                thread.start()
+            start.set()
+            for thread in threads:
+                thread.join(self.timeout)
+        return results
+
+    def test_cached(self):
+        self.ready.set()
+        set_cached_crl(self.key, b'old', 600)
+        self.assertEqual(get_cached_crl(self.key, self.generate, expires=600), b'old')
+        self.assertEqual(self.calls, 0)
+
+    def test_concurrent(self):
+        # Nothing in the cache: Only one thread generates the CRL, all others wait for it
+        self.ready = self.waiting_done
+        results = self.run_concurrently()
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(len(self.waiting), self.count - 1)
+        self.assertEqual(results, [b'new'] * self.count)
+        self.assertEqual(cache.get(self.key), b'new')
+
+    def test_concurrent_stale(self):
+        # CRL is due for regeneration: Only one thread generates the CRL, all others get the old one
+        set_cached_crl(self.key, b'old', 600)
+        cache.delete(self.key)
+
+        self.ready = self.returned_done
+        results = self.run_concurrently()
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(self.waiting, set())
+        self.assertEqual(sorted(results), [b'new'] + [b'old'] * (self.count - 1))
+        self.assertEqual(cache.get(self.key), b'new')
+        self.assertEqual(cache.get('%s_stale' % self.key), b'new')
+
+    def test_lock_timeout(self):
+        # if the lock is never released, the CRL is generated after the timeout
+        self.ready.set()
+        cache.add('%s_lock' % self.key, True, 600)
+        with patch('django_ca.crl.time', Mock(time=Mock(side_effect=[0, 5, 10]))) as clock, \
+                patch('django_ca.crl.log') as log:
+            self.assertEqual(get_cached_crl(self.key, self.generate, expires=600, lock_timeout=10), b'new')
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(clock.sleep.call_count, 1)
+        log.warning.assert_called_once_with('%s: Timeout waiting for CRL to be generated.', self.key)
+
+    def test_generate_error(self):
+        def generate():
+            raise ValueError('foo')
+
+        with self.assertRaisesRegex(ValueError, '^foo$'):
+            get_cached_crl(self.key, generate, expires=600)
+
+        # lock was released
+        self.ready.set()
+        self.assertEqual(get_cached_crl(self.key, self.generate, expires=600), b'new')
@@ -220,6 +220,7 @@ class CertificateActionTestCase(DjangoCAWithCertTestCase):
         # Create a second cert and manually set almost the same serial
         cert2 = self.create_cert(self.ca, self.csr_pem, {'CN': 'example.com'})
         cert2.serial = self.cert.serial[:-1] + 'X'
+        cert2.serial_hex = cert2.serial.replace(':', '')
         cert2.save()
 
         serial = cert2.serial[:8]
@@ -252,6 +253,7 @@ class CertificateAuthorityActionTestCase(DjangoCAWithCATestCase):
         # Create a second CA and manually set (almost) the same serial
         ca2 = self.load_ca(name='child', x509=child_pubkey)
         ca2.serial = self.ca.serial[:-1] + 'X'
+        ca2.serial_hex = ca2.serial.replace(':', '')
         ca2.save()
 
         serial = ca2.serial[:8]
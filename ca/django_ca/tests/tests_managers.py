@@ -13,12 +13,22 @@
 # You should have received a copy of the GNU General Public License along with django-ca.  If not,
 # see <http://www.gnu.org/licenses/>.
 
+from cryptography import x509
+from cryptography.hazmat.backends import default_backend
 from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.hazmat.primitives.serialization import Encoding
 
+from ..crl import get_crl
+from ..keys import KEY_TYPES
 from ..models import Certificate
 from ..models import CertificateAuthority
+from ..signals import post_issue_cert
+from ..signals import pre_issue_cert
 from ..utils import get_cert_profile_kwargs
 from .base import DjangoCAWithCSRTestCase
+from .base import cert2_csr
+from .base import cert3_csr
 from .base import override_tmpcadir
 
 
@@ -185,6 +195,18 @@ class GetCertTestCase(DjangoCAWithCSRTestCase):
         expected = ['Full Name: URI:%s' % url for url in ca.crl_url.splitlines()]
         self.assertEqual(self.get_extensions(cert.x509)['crlDistributionPoints'], (False, expected))
 
+    def test_delta_crl(self):
+        ca = CertificateAuthority.objects.first()
+        ca.delta_crl_url = 'http://crl.example.com/delta\nhttp://crl.example.org/delta'
+
+        kwargs = get_cert_profile_kwargs()
+        cert = Certificate.objects.init(
+            ca, self.csr_pem, expires=self.expires(720), algorithm=hashes.SHA256(),
+            subjectAltName=['example.com'], **kwargs)
+
+        expected = ['Full Name: URI:%s' % url for url in ca.delta_crl_url.splitlines()]
+        self.assertEqual(self.get_extensions(cert.x509)['freshestCRL'], (False, expected))
+
     def test_issuer_alt_name(self):
         ca = CertificateAuthority.objects.first()
         ca.issuer_alt_name = 'http://ian.example.com'
@@ -227,3 +249,80 @@ class GetCertTestCase(DjangoCAWithCSRTestCase):
 
         self.assertEqual(self.get_extensions(cert.x509)['authorityInfoAccess'],
                          (False, ['CA Issuers - URI:%s' % ca.issuer_url]))
+
+
+@override_tmpcadir(CA_PROFILES={}, CA_DEFAULT_SUBJECT={})
+class BulkInitTestCase(DjangoCAWithCSRTestCase):
+    def test_basic(self):
+        kwargs = get_cert_profile_kwargs()
+        with self.assertSignal(pre_issue_cert) as pre, self.assertSignal(post_issue_cert) as post:
+            certs = Certificate.objects.bulk_init(
+                self.ca, [cert2_csr, cert3_csr], expires=self.expires(720), algorithm=hashes.SHA256(),
+                threads=2, **kwargs)
+
+        self.assertEqual(pre.call_count, 2)
+        self.assertEqual(post.call_count, 2)
+        self.assertEqual([c.cn for c in certs], ['cert2-csr.example.com', 'cert3-csr.example.com'])
+        self.assertEqual(list(Certificate.objects.order_by('cn')), certs)
+
+        for cert in certs:
+            cert.full_clean()
+            self.assertSignature([self.ca], cert)
+            self.assertEqual(cert.subjectAltName(), (False, ['DNS:%s' % cert.cn]))
+
+    def test_subject(self):
+        kwargs = get_cert_profile_kwargs()
+        kwargs['subject']['CN'] = 'example.com'
+        certs = Certificate.objects.bulk_init(
+            self.ca, [cert2_csr, cert3_csr], expires=self.expires(720), algorithm=hashes.SHA256(), **kwargs)
+
+        self.assertEqual([c.cn for c in certs], ['example.com', 'example.com'])
+        self.assertNotEqual(certs[0].serial, certs[1].serial)
+
+    def test_no_names(self):
+        kwargs = get_cert_profile_kwargs()
+        del kwargs['subject']
+
+        with self.assertRaises(ValueError):
+            Certificate.objects.bulk_init(self.ca, [self.csr_pem], expires=self.expires(720),
+                                          algorithm=hashes.SHA256(), **kwargs)
+        self.assertFalse(Certificate.objects.exists())
+
+
+@override_tmpcadir(CA_MIN_KEY_SIZE=1024, CA_PROFILES={}, CA_DEFAULT_SUBJECT={})
+class KeyTypesTestCase(DjangoCAWithCSRTestCase):
+    def assertKeyType(self, key_type, name=None, **kwargs):
+        ca = self.create_ca(name or '%s CA' % key_type, key_type=key_type,
+                            subject='/CN=%s.example.com' % key_type, **kwargs)
+        self.assertEqual(ca.key_type, key_type)
+        self.assertSignature([ca], ca)
+
+        cert = Certificate.objects.init(
+            ca, cert2_csr, expires=self.expires(720), algorithm=hashes.SHA256(),
+            subjectAltName=['example.com'], **get_cert_profile_kwargs())
+        self.assertSignature([ca], cert)
+        cert.revoke()
+
+        crl = get_crl(ca, encoding=Encoding.DER, expires=600, algorithm=hashes.SHA256(), password=None)
+        crl = x509.load_der_x509_crl(crl, default_backend())
+        if key_type == 'Ed25519':
+            # CertificateRevocationList.is_signature_valid() does not support Ed25519 keys
+            ca.x509.public_key().verify(crl.signature, crl.tbs_certlist_bytes)
+        else:
+            self.assertTrue(crl.is_signature_valid(ca.x509.public_key()))
+        self.assertEqual([e.serial_number for e in crl], [cert.x509.serial_number])
+
+    def test_rsa(self):
+        self.assertKeyType('RSA')
+
+    def test_dsa(self):
+        self.assertKeyType('DSA', key_size=2048)
+
+    def test_ecc(self):
+        self.assertKeyType('ECC')
+        self.assertKeyType('ECC', ecc_curve=ec.SECP521R1(), name='ECC 521')
+
+    def test_ed25519(self):
+        if 'Ed25519' not in KEY_TYPES:  # pragma: no cover
+            self.skipTest('Ed25519 requires cryptography>=2.8.')
+        self.assertKeyType('Ed25519')
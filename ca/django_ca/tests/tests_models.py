@@ -13,11 +13,20 @@
 # You should have received a copy of the GNU General Public License along with django-ca.  If not,
 # see <http://www.gnu.org/licenses/>.
 
+import os
+
+from cryptography.hazmat.primitives.serialization import Encoding
+
 from django.core.exceptions import ValidationError
 from django.test import TestCase
 
 from ..models import Certificate
+from ..models import CertificateAuthority
 from ..models import Watcher
+from ..models import _key_cache
+from ..models import clear_key_cache
+from ..utils import format_name
+from .base import DjangoCATestCase
 from .base import DjangoCAWithCertTestCase
 from .base import cert2_pubkey
 from .base import cert3_csr
@@ -25,6 +34,8 @@ from .base import cert3_pubkey
 from .base import certs
 from .base import child_pubkey
 from .base import ocsp_pubkey
+from .base import override_settings
+from .base import override_tmpcadir
 
 
 class TestWatcher(TestCase):
@@ -75,6 +86,69 @@ class TestWatcher(TestCase):
         self.assertEqual(str(w), '%s <%s>' % (name, mail))
 
 
+@override_tmpcadir(CA_MIN_KEY_SIZE=1024)
+class KeyCacheTestCase(DjangoCATestCase):
+    def setUp(self):
+        super(KeyCacheTestCase, self).setUp()
+        clear_key_cache()
+        self.ca = self.create_ca('root', password=b'foobar')
+
+    def tearDown(self):
+        super(KeyCacheTestCase, self).tearDown()
+        clear_key_cache()
+
+    def load(self, ca=None):
+        return CertificateAuthority.objects.get(pk=(ca or self.ca).pk)
+
+    def test_cache(self):
+        key = self.load().key(b'foobar')
+        self.assertIs(self.load().key(b'foobar'), key)
+
+        clear_key_cache(self.ca.serial)
+        self.assertIsNot(self.load().key(b'foobar'), key)
+
+    def test_password(self):
+        key = self.load().key(b'foobar')
+
+        with self.assertRaises(ValueError):
+            self.load().key(b'wrong')
+        with self.assertRaises(TypeError):
+            self.load().key(None)
+
+        self.assertIsNot(self.load().key(b'foobar'), key)
+
+    def test_modified(self):
+        key = self.load().key(b'foobar')
+        mtime = os.path.getmtime(self.ca.private_key_path)
+        os.utime(self.ca.private_key_path, (mtime + 10, mtime + 10))
+        self.assertIsNot(self.load().key(b'foobar'), key)
+
+    def test_timeout(self):
+        with override_settings(CA_KEY_CACHE_TIMEOUT=0):
+            key = self.load().key(b'foobar')
+            self.assertIsNot(self.load().key(b'foobar'), key)
+
+    def test_size(self):
+        child = self.create_ca('child', parent=self.ca, parent_password=b'foobar')
+
+        with override_settings(CA_KEY_CACHE_SIZE=1):
+            key = self.load().key(b'foobar')
+            child_key = self.load(child).key(None)
+            self.assertIs(self.load(child).key(None), child_key)
+            self.assertIsNot(self.load().key(b'foobar'), key)
+
+    def test_disabled(self):
+        with override_settings(CA_KEY_CACHE=False):
+            key = self.load().key(b'foobar')
+            self.assertIsNot(self.load().key(b'foobar'), key)
+
+    def test_delete(self):
+        self.load().key(b'foobar')
+        self.assertIn(self.ca.serial, _key_cache)
+        self.ca.delete()
+        self.assertNotIn(self.ca.serial, _key_cache)
+
+
 class CertificateTests(DjangoCAWithCertTestCase):
     @classmethod
     def setUpClass(cls):
@@ -213,6 +287,62 @@ class CertificateTests(DjangoCAWithCertTestCase):
     def test_nameConstraints(self):
         self.assertEqual(self.ca.nameConstraints(), None)
 
+    def test_metadata(self):
+        for cert in [self.ca, self.ca2, self.cert, self.cert2, self.cert3, self.full]:
+            cert = cert.__class__.objects.get(pk=cert.pk)  # make sure that no parsed cert is cached
+
+            self.assertEqual(cert.not_before, cert.x509.not_valid_before)
+            self.assertEqual(cert.distinguished_name, format_name(cert.x509.subject))
+            self.assertEqual(cert.key_type, 'RSA')
+            self.assertEqual(cert.key_size, cert.x509.public_key().key_size)
+            self.assertEqual(cert.subject_key_identifier, cert.subjectKeyIdentifier()[1])
+            self.assertEqual('keyid:%s' % cert.authority_key_identifier, cert.authorityKeyIdentifier()[1])
+
+            san = cert.subjectAltName()
+            self.assertEqual(cert.subject_alt_names, '\n'.join(san[1]) if san else '')
+
+        self.assertEqual(self.cert.fingerprint_sha256, certs['cert1']['sha256'])
+
+    def test_metadata_accessors(self):
+        for cert in [self.ca, self.ca2, self.cert, self.cert2, self.cert3, self.full]:
+            # accessors fall back to parsing the certificate if the values are not stored
+            parsed = cert.__class__.objects.get(pk=cert.pk)
+            parsed.subject_alt_names = parsed.subject_key_identifier = parsed.authority_key_identifier = ''
+
+            # accessors do not parse the certificate if the values are stored
+            stored = cert.__class__.objects.get(pk=cert.pk)
+            stored.der = None
+            stored.pub = 'foobar'
+
+            self.assertEqual(stored.subjectKeyIdentifier(), parsed.subjectKeyIdentifier())
+            self.assertEqual(stored.authorityKeyIdentifier(), parsed.authorityKeyIdentifier())
+            if parsed.subjectAltName() is not None:
+                self.assertEqual(stored.subjectAltName(), parsed.subjectAltName())
+
+    def test_der(self):
+        cert = Certificate.objects.get(pk=self.cert.pk)
+        self.assertEqual(bytes(cert.der), self.cert.x509.public_bytes(Encoding.DER))
+
+        # PEM is not used if the certificate is stored as DER
+        cert.pub = 'foobar'
+        self.assertEqual(cert.x509.serial_number, self.cert.x509.serial_number)
+        self.assertEqual(cert.dump_certificate(Encoding.DER), self.cert.x509.public_bytes(Encoding.DER))
+
+        # the stored buffer is converted only once
+        self.assertIs(cert.dump_certificate(Encoding.DER), cert.dump_certificate(Encoding.DER))
+
+        # certificates without DER are still loaded from PEM
+        cert = Certificate.objects.get(pk=self.cert.pk)
+        cert.der = None
+        self.assertEqual(cert.dump_certificate(Encoding.DER), self.cert.x509.public_bytes(Encoding.DER))
+
+    def test_revoked_reason_code(self):
+        self.cert.revoke()
+        self.assertIsNone(self.cert.revoked_reason_code)
+
+        self.cert2.revoke('key_compromise')
+        self.assertEqual(Certificate.objects.get(pk=self.cert2.pk).revoked_reason_code, 1)
+
     def test_hpkp_pin(self):
 
         # get hpkp pins using
@@ -15,13 +15,21 @@
 
 """Test querysets."""
 
+import unittest
+from datetime import timedelta
+
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.asymmetric.rsa import RSAPublicKey
 
+from django.db import connection
+from django.utils import timezone
+
 from django_ca.tests.base import DjangoCATestCase
 
 from .. import ca_settings
+from ..models import Certificate
 from ..models import CertificateAuthority
+from .base import DjangoCAWithCertTestCase
 from .base import override_tmpcadir
 
 
@@ -93,3 +101,38 @@ class CertificateAuthorityQuerySetTestCase(DjangoCATestCase):
             CertificateAuthority.objects.init(key_size=int(key_size / 2), **kwargs)
         with self.assertRaises(RuntimeError):
             CertificateAuthority.objects.init(key_size=int(key_size / 4), **kwargs)
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'Query plans are only tested with SQLite.')
+class CertificateQuerySetIndexTestCase(DjangoCAWithCertTestCase):
+    """Make sure that common queries use the indexes defined for certificates."""
+
+    def setUp(self):
+        super(CertificateQuerySetIndexTestCase, self).setUp()
+        self.indexes = {tuple(i.fields): i.name for i in Certificate._meta.indexes}
+
+    def assertIndex(self, qs, fields):
+        sql, params = qs.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN %s' % sql, params)
+            plan = ' '.join([str(row) for row in cursor.fetchall()])
+        self.assertIn(self.indexes[fields], plan)
+
+    def test_valid(self):
+        self.assertIndex(Certificate.objects.valid(), ('expires', ))
+        self.assertIndex(Certificate.objects.filter(ca=self.ca).valid(), ('ca', 'revoked', 'expires'))
+
+    def test_expired(self):
+        self.assertIndex(Certificate.objects.expired(), ('expires', ))
+        self.assertIndex(Certificate.objects.filter(ca=self.ca).expired(), ('ca', 'revoked', 'expires'))
+
+    def test_revoked(self):
+        self.assertIndex(Certificate.objects.filter(ca=self.ca).revoked(), ('ca', 'revoked', 'expires'))
+
+    def test_crl(self):
+        qs = Certificate.objects.filter(ca=self.ca, expires__gt=timezone.now()).revoked()
+        self.assertIndex(qs, ('ca', 'revoked', 'expires'))
+
+    def test_expiring(self):
+        qs = Certificate.objects.valid().filter(expires__lt=timezone.now() + timedelta(days=3))
+        self.assertIndex(qs, ('expires', ))
@@ -389,6 +389,17 @@ class IntToHexTestCase(TestCase):
         self.assertEqual(utils.int_to_hex(long(1513282104)), '5A:32:DA:38')  # NOQA
 
 
+class HexToIntTestCase(TestCase):
+    def test_basic(self):
+        self.assertEqual(utils.hex_to_int('0'), 0)
+        self.assertEqual(utils.hex_to_int('F'), 15)
+        self.assertEqual(utils.hex_to_int('5A:32:DA:34'), 1513282100)
+
+    def test_roundtrip(self):
+        for i in [0, 1, 255, 256, 1513282100, 2 ** 159 + 12345]:
+            self.assertEqual(utils.hex_to_int(utils.int_to_hex(i)), i)
+
+
 class MultilineURLValidatorTestCase(TestCase):
     def test_basic(self):
         multiline_url_validator('')
@@ -23,14 +23,17 @@ from django.core.cache import cache
 from django.test import Client
 from django.urls import reverse
 
+from ..crl import get_crl_cache_key
 from ..models import Certificate
 from ..views import CertificateRevocationListView
 from .base import DjangoCAWithCertTestCase
+from .base import cert2_pubkey
 from .base import override_settings
 from .base import override_tmpcadir
+from .base import patch
 
 urlpatterns = [
-    url(r'^crl/(?P<serial>[0-9A-F:]+)/$', CertificateRevocationListView.as_view(),
+    url(r'^crl/(?P<serial>[0-9A-F:]+)/$', CertificateRevocationListView.as_view(base=True),
         name='default'),
     url(r'^adv/(?P<serial>[0-9A-F:]+)/$',
         CertificateRevocationListView.as_view(
@@ -43,6 +46,8 @@ urlpatterns = [
     url(r'^crl/ca/(?P<serial>[0-9A-F:]+)/$', CertificateRevocationListView.as_view(
         ca_crl=True, type=Encoding.PEM
     ), name='ca_crl'),
+    url(r'^crl/delta/(?P<serial>[0-9A-F:]+)/$', CertificateRevocationListView.as_view(delta=True),
+        name='delta'),
 ]
 
 
@@ -52,6 +57,7 @@ class GenericCRLViewTests(DjangoCAWithCertTestCase):
     def setUp(self):
         self.client = Client()
         super(GenericCRLViewTests, self).setUp()
+        cache.clear()  # revoking certificates in other tests fills the cache
 
     def tearDown(self):
         cache.clear()
@@ -66,17 +72,17 @@ class GenericCRLViewTests(DjangoCAWithCertTestCase):
         self.assertIsInstance(crl.signature_hash_algorithm, hashes.SHA512)
         self.assertEqual(list(crl), [])
 
-        # revoke a certificate
+        # revoke a certificate - the cached CRL is refreshed right away
         cert = Certificate.objects.get(serial=self.cert.serial)
         cert.revoke()
 
-        # fetch again - we should see a cached response
         response = self.client.get(reverse('default', kwargs={'serial': self.ca.serial}))
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response['Content-Type'], 'application/pkix-crl')
         crl = x509.load_der_x509_crl(response.content, default_backend())
         self.assertIsInstance(crl.signature_hash_algorithm, hashes.SHA512)
-        self.assertEqual(list(crl), [])
+        self.assertEqual(len(list(crl)), 1)
+        self.assertEqual(crl[0].serial_number, cert.x509.serial_number)
 
         # clear the cache and fetch again
         cache.clear()
@@ -92,6 +98,148 @@ class GenericCRLViewTests(DjangoCAWithCertTestCase):
     def test_basic_with_use_tz(self):
         self.test_basic()
 
+    def test_no_certificate_parsing(self):
+        # revoked certificates are added to the CRL without loading them
+        cert = Certificate.objects.get(serial=self.cert.serial)
+        cert.revoke('key_compromise')
+        cache.clear()  # revoking refreshes the cached CRL
+
+        def fail(*args, **kwargs):
+            raise AssertionError('Certificate was loaded.')
+
+        # neither are certificates parsed nor are any model instances created
+        with patch.object(Certificate, 'x509', property(fail)), \
+                patch.object(Certificate, 'from_db', side_effect=fail):
+            response = self.client.get(reverse('default', kwargs={'serial': self.ca.serial}))
+        self.assertEqual(response.status_code, 200)
+
+        crl = x509.load_der_x509_crl(response.content, default_backend())
+        self.assertEqual(len(list(crl)), 1)
+        self.assertEqual(crl[0].serial_number, self.cert.x509.serial_number)
+        self.assertEqual(crl[0].revocation_date, cert.revoked_date.replace(microsecond=0, tzinfo=None))
+        self.assertEqual(crl[0].extensions.get_extension_for_class(x509.CRLReason).value.reason,
+                         x509.ReasonFlags.key_compromise)
+
+    @override_settings(USE_TZ=True)
+    def test_no_certificate_parsing_with_use_tz(self):
+        self.test_no_certificate_parsing()
+
+    def get_crl(self, name):
+        cache.clear()
+        response = self.client.get(reverse(name, kwargs={'serial': self.ca.serial}))
+        self.assertEqual(response.status_code, 200)
+        return x509.load_der_x509_crl(response.content, default_backend())
+
+    def assertCRLNumber(self, crl, number):
+        self.assertEqual(crl.extensions.get_extension_for_class(x509.CRLNumber).value.crl_number, number)
+
+    def assertDeltaCRLIndicator(self, crl, number):
+        ext = crl.extensions.get_extension_for_class(x509.DeltaCRLIndicator)
+        self.assertTrue(ext.critical)
+        self.assertEqual(ext.value.crl_number, number)
+
+    @override_settings(CA_CRL_PROFILES={})  # do not refresh CRLs on revocation
+    def test_delta(self):
+        crl = self.get_crl('default')
+        self.assertCRLNumber(crl, 1)
+        self.assertEqual(list(crl), [])
+        with self.assertRaises(x509.ExtensionNotFound):
+            crl.extensions.get_extension_for_class(x509.DeltaCRLIndicator)
+
+        # revoke a certificate, delta CRL contains the certificate
+        cert = Certificate.objects.get(serial=self.cert.serial)
+        cert.revoke()
+        crl = self.get_crl('delta')
+        self.assertCRLNumber(crl, 2)
+        self.assertDeltaCRLIndicator(crl, 1)
+        self.assertEqual([e.serial_number for e in crl], [cert.x509.serial_number])
+
+        # new base CRL contains the certificate
+        crl = self.get_crl('default')
+        self.assertCRLNumber(crl, 3)
+        self.assertEqual([e.serial_number for e in crl], [cert.x509.serial_number])
+
+        # ... and the next delta CRL refers to it and is empty again
+        crl = self.get_crl('delta')
+        self.assertCRLNumber(crl, 4)
+        self.assertDeltaCRLIndicator(crl, 3)
+        self.assertEqual(list(crl), [])
+
+    @override_settings(USE_TZ=True)
+    def test_delta_with_use_tz(self):
+        self.test_delta()
+
+    def test_refresh_on_revoke(self):
+        base = self.get_crl('default')
+        self.assertCRLNumber(base, 1)
+        self.get_crl('delta')  # number 2, clears the cache before fetching
+
+        cert = Certificate.objects.get(serial=self.cert.serial)
+        cert.revoke()
+
+        # revoking refreshed the delta CRL first, so it still refers to the complete CRL ...
+        response = self.client.get(reverse('delta', kwargs={'serial': self.ca.serial}))
+        crl = x509.load_der_x509_crl(response.content, default_backend())
+        self.assertCRLNumber(crl, 3)
+        self.assertDeltaCRLIndicator(crl, 1)
+        self.assertEqual([e.serial_number for e in crl], [cert.x509.serial_number])
+
+        # ... and the complete CRL afterwards
+        response = self.client.get(reverse('default', kwargs={'serial': self.ca.serial}))
+        crl = x509.load_der_x509_crl(response.content, default_backend())
+        self.assertCRLNumber(crl, 4)
+        self.assertEqual([e.serial_number for e in crl], [cert.x509.serial_number])
+
+    def test_refresh_on_revoke_encrypted_key(self):
+        ca = self.create_ca(name='with password', password=b'testpassword')
+        cert = self.load_cert(ca=ca, x509=cert2_pubkey)
+
+        # CRLs cannot be refreshed without the password, but revoking still works
+        with patch('django_ca.crl.log') as log:
+            cert.revoke()
+        self.assertEqual(log.warning.call_count, 1)
+        self.assertEqual(log.warning.call_args[0][1], ca.serial)
+        self.assertFalse(log.exception.called)
+        self.assertIsNone(cache.get(get_crl_cache_key(ca.serial, Encoding.DER, hashes.SHA512())))
+        self.assertTrue(Certificate.objects.get(pk=cert.pk).revoked)
+
+    def test_refresh_on_revoke_child_ca(self):
+        child = self.create_ca(name='child', parent=self.ca)
+        child.revoke()
+
+        cache_key = get_crl_cache_key(self.ca.serial, Encoding.DER, hashes.SHA512(), ca_crl=True)
+        crl = x509.load_der_x509_crl(cache.get(cache_key), default_backend())
+        self.assertEqual([e.serial_number for e in crl], [child.x509.serial_number])
+
+    def test_stale(self):
+        # While another process regenerates the CRL, the previous CRL is served
+        response = self.client.get(reverse('default', kwargs={'serial': self.ca.serial}))
+        cache_key = get_crl_cache_key(self.ca.serial, Encoding.DER, hashes.SHA512())
+        cache.delete(cache_key)
+        cache.add('%s_lock' % cache_key, True, 10)
+
+        with patch('django_ca.views.get_crl', side_effect=AssertionError('CRL was generated.')):
+            stale = self.client.get(reverse('default', kwargs={'serial': self.ca.serial}))
+        self.assertEqual(stale.status_code, 200)
+        self.assertEqual(stale.content, response.content)
+
+    def test_delta_without_base(self):
+        response = self.client.get(reverse('delta', kwargs={'serial': self.ca.serial}))
+        self.assertEqual(response.status_code, 404)
+
+        # other complete CRLs do not become the base CRL
+        self.client.get(reverse('advanced', kwargs={'serial': self.ca.serial}))
+        response = self.client.get(reverse('delta', kwargs={'serial': self.ca.serial}))
+        self.assertEqual(response.status_code, 404)
+
+        base = self.get_crl('default')
+        self.assertCRLNumber(base, 2)
+        self.client.get(reverse('advanced', kwargs={'serial': self.ca.serial}))  # CRL number 3
+
+        crl = self.get_crl('delta')
+        self.assertCRLNumber(crl, 4)
+        self.assertDeltaCRLIndicator(crl, 2)
+
     def test_ca_crl(self):
         child = self.create_ca(name='child', parent=self.ca)
         self.assertIsNotNone(child.key(password=None))
@@ -14,26 +14,52 @@
 # see <http://www.gnu.org/licenses/>
 
 import base64
+import json
 import logging
 import os
+import shutil
+import tempfile
+import time
+import unittest
+from datetime import datetime
 from datetime import timedelta
 
 import asn1crypto
+from cryptography import x509
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.hazmat.primitives.serialization import Encoding
+from cryptography.hazmat.primitives.serialization import NoEncryption
+from cryptography.hazmat.primitives.serialization import PrivateFormat
+from cryptography.x509.oid import NameOID
 from oscrypto import asymmetric
 
 from django.conf import settings
 from django.conf.urls import url
+from django.core.cache import cache
 from django.test import Client
 from django.urls import reverse
 from django.utils.encoding import force_text
+from django.utils.http import http_date
+from django.utils.http import parse_http_date
 
+from .. import ocsp
+from ..keys import KEY_TYPES
+from ..keys import generate_private_key
 from ..models import Certificate
+from ..models import CertificateAuthority
+from ..signals import post_issue_cert
 from ..utils import int_to_hex
 from ..views import OCSPView
 from .base import DjangoCAWithCertTestCase
+from .base import cert2_pubkey
+from .base import cert3_pubkey
 from .base import certs
+from .base import child_pubkey
 from .base import ocsp_pubkey
 from .base import override_settings
+from .base import patch
 
 
 # openssl ocsp -issuer django_ca/tests/fixtures/root.pem -serial <serial> \
@@ -52,6 +78,8 @@ no_nonce_req = _load_req('req-no-nonce')
 unknown_req = _load_req('unknown-serial')
 multiple_req = _load_req('multiple-serial')
 
+stored_config = {'BACKEND': 'django_ca.ocsp.CacheResponseStore'}
+
 urlpatterns = [
     url(r'^ocsp/$', OCSPView.as_view(
         ca=certs['root']['serial'],
@@ -79,6 +107,33 @@ urlpatterns = [
         responder_cert=settings.OCSP_PEM_PATH,
     ), name='unknown'),
 
+    url(r'^ocsp/serial/(?P<data>[a-zA-Z0-9=+/]+)$', OCSPView.as_view(
+        ca=certs['root']['serial'],
+        responder_key=settings.OCSP_KEY_PATH,
+        responder_cert=settings.OCSP_SERIAL,
+    ), name='get-serial'),
+
+    url(r'^ocsp/index/$', OCSPView.as_view(
+        ca=certs['root']['serial'],
+        responder_key=settings.OCSP_KEY_PATH,
+        responder_cert=settings.OCSP_PEM_PATH,
+        status_index=True,
+    ), name='post-index'),
+
+    url(r'^ocsp/stored/$', OCSPView.as_view(
+        ca=certs['root']['serial'],
+        responder_key=settings.OCSP_KEY_PATH,
+        responder_cert=settings.OCSP_PEM_PATH,
+        response_store=stored_config,
+    ), name='post-stored'),
+
+    url(r'^ocsp/stored/(?P<data>[a-zA-Z0-9=+/]+)$', OCSPView.as_view(
+        ca=certs['root']['serial'],
+        responder_key=settings.OCSP_KEY_PATH,
+        responder_cert=settings.OCSP_PEM_PATH,
+        response_store=stored_config,
+    ), name='get-stored'),
+
     url(r'^ocsp/false-key/(?P<data>[a-zA-Z0-9=+/]+)$', OCSPView.as_view(
         ca=certs['root']['serial'],
         responder_key='/false/foobar',
@@ -141,6 +196,26 @@ class OCSPViewTestMixin(object):
         # used for verifying signatures
         cls.ocsp_private_key = asymmetric.load_private_key(force_text(settings.OCSP_KEY_PATH))
 
+    def ocsp_request(self, certs, nonce=None):
+        """Get a DER encoded OCSP request for the given certificates."""
+
+        issuer = asn1crypto.x509.Certificate.load(self.ca.dump_certificate(Encoding.DER))
+        tbs_request = {
+            'request_list': [{
+                'req_cert': {
+                    'hash_algorithm': {'algorithm': 'sha1'},
+                    'issuer_name_hash': issuer.subject.sha1,
+                    'issuer_key_hash': issuer.public_key.sha1,
+                    'serial_number': cert.x509.serial_number,
+                },
+            } for cert in certs],
+        }
+        if nonce is not None:
+            tbs_request['request_extensions'] = [
+                {'extn_id': 'nonce', 'critical': False, 'extn_value': nonce},
+            ]
+        return asn1crypto.ocsp.OCSPRequest({'tbs_request': tbs_request}).dump()
+
     def assertOCSPSubject(self, got, expected):
         translated = {}
         for frm, to in self._subject_mapping.items():
@@ -276,6 +351,10 @@ class OCSPTestGenericView(OCSPViewTestMixin, DjangoCAWithCertTestCase):
 
 @override_settings(ROOT_URLCONF=__name__)
 class OCSPTestView(OCSPViewTestMixin, DjangoCAWithCertTestCase):
+    def setUp(self):
+        super(OCSPTestView, self).setUp()
+        ocsp.clear_caches()  # tests modify cached CAs without sending any signal
+
     def test_get(self):
         data = base64.b64encode(req1).decode('utf-8')
         response = self.client.get(reverse('get', kwargs={'data': data}))
@@ -303,6 +382,45 @@ class OCSPTestView(OCSPViewTestMixin, DjangoCAWithCertTestCase):
         # TODO: this should fail
         self.assertOCSP(response, requested=[self.cert], nonce=req1_nonce)
 
+    def test_get_cache_headers(self):
+        data = base64.b64encode(self.ocsp_request([self.cert])).decode('utf-8')
+        response = self.client.get(reverse('get', kwargs={'data': data}))
+        self.assertEqual(response.status_code, 200)
+        self.assertOCSP(response, requested=[self.cert])
+        self.assertRegex(response['Cache-Control'],
+                         r'^max-age=(59[0-9]|600), public, no-transform, must-revalidate$')
+        self.assertRegex(response['ETag'], r'^"[0-9a-f]{40}"$')
+        self.assertIn('Expires', response)
+        self.assertIn('Last-Modified', response)
+
+        # responses produced before If-Modified-Since are not modified
+        last_modified = parse_http_date(response['Last-Modified'])
+        response = self.client.get(reverse('get', kwargs={'data': data}),
+                                   HTTP_IF_MODIFIED_SINCE=http_date(last_modified + 60))
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+        # ... but a response produced afterwards is
+        response = self.client.get(reverse('get', kwargs={'data': data}),
+                                   HTTP_IF_MODIFIED_SINCE=http_date(last_modified - 60))
+        self.assertEqual(response.status_code, 200)
+        self.assertOCSP(response, requested=[self.cert])
+
+    def test_get_nonce_cache_headers(self):
+        # Responses with a nonce are unique to the request and thus not cacheable
+        data = base64.b64encode(req1).decode('utf-8')
+        response = self.client.get(reverse('get', kwargs={'data': data}))
+        self.assertEqual(response.status_code, 200)
+        for header in ['Cache-Control', 'ETag', 'Expires', 'Last-Modified']:
+            self.assertNotIn(header, response)
+
+    def test_post_cache_headers(self):
+        response = self.client.post(reverse('post'), self.ocsp_request([self.cert]),
+                                    content_type='application/ocsp-request')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Cache-Control', response)
+        self.assertNotIn('ETag', response)
+
     def test_revoked(self):
         cert = Certificate.objects.get(pk=self.cert.pk)
         cert.revoke()
@@ -351,16 +469,59 @@ class OCSPTestView(OCSPViewTestMixin, DjangoCAWithCertTestCase):
         ocsp_response = asn1crypto.ocsp.OCSPResponse.load(response.content)
         self.assertEqual(ocsp_response['response_status'].native, 'malformed_request')
 
-    def test_multiple(self):
+    def test_multiple_unknown(self):
         data = base64.b64encode(multiple_req).decode('utf-8')
         response = self.client.get(reverse('get', kwargs={'data': data}))
         self.assertEqual(response.status_code, 200)
         ocsp_response = asn1crypto.ocsp.OCSPResponse.load(response.content)
-        self.assertEqual(ocsp_response['response_status'].native, 'malformed_request')
+        self.assertEqual(ocsp_response['response_status'].native, 'internal_error')
+
+    def test_multiple(self):
+        cert2 = self.load_cert(ca=self.ca, x509=cert2_pubkey)
+        cert3 = self.load_cert(ca=self.ca, x509=cert3_pubkey)
+        cert3.revoke('key_compromise')
+        requested = [self.cert, cert2, cert3]
+        nonce = b'multiple-nonce'
+
+        # Two queries: One for the CA and one for all requested certificates
+        ocsp.clear_caches()
+        with self.assertNumQueries(2):
+            response = self.client.post(reverse('post'), self.ocsp_request(requested, nonce=nonce),
+                                        content_type='application/ocsp-request')
+        self.assertEqual(response.status_code, 200)
+        self.assertOCSP(response, requested=requested, nonce=nonce, expires=1200)
+
+        # The CA is now cached, so only the certificates are fetched
+        with self.assertNumQueries(1):
+            response = self.client.post(reverse('post'), self.ocsp_request(requested, nonce=nonce),
+                                        content_type='application/ocsp-request')
+        self.assertEqual(response.status_code, 200)
+        self.assertOCSP(response, requested=requested, nonce=nonce, expires=1200)
+
+    def test_multiple_partly_unknown(self):
+        cert2 = Certificate(ca=self.ca)
+        cert2.x509 = cert2_pubkey  # not saved to the database
+
+        response = self.client.post(reverse('post'), self.ocsp_request([self.cert, cert2]),
+                                    content_type='application/ocsp-request')
+        self.assertEqual(response.status_code, 200)
+        ocsp_response = asn1crypto.ocsp.OCSPResponse.load(response.content)
+        self.assertEqual(ocsp_response['response_status'].native, 'successful')
+
+        # only the certificate that was not found is reported as unknown
+        responses = ocsp_response['response_bytes']['response'].parsed['tbs_response_data']['responses']
+        statuses = {r['cert_id']['serial_number'].native: r['cert_status'].name for r in responses}
+        self.assertEqual(statuses, {
+            self.cert.x509.serial_number: 'good',
+            cert2.x509.serial_number: 'unknown',
+        })
 
     def test_bad_ca_cert(self):
-        self.ca.pub = 'foobar'
-        self.ca.save()
+        # load a new instance, so that other tests still have a valid CA
+        ca = CertificateAuthority.objects.get(pk=self.ca.pk)
+        ca.pub = 'foobar'
+        ca.der = b'foobar'
+        ca.save()
 
         data = base64.b64encode(req1).decode('utf-8')
         response = self.client.get(reverse('get', kwargs={'data': data}))
@@ -383,3 +544,396 @@ class OCSPTestView(OCSPViewTestMixin, DjangoCAWithCertTestCase):
         self.assertEqual(response.status_code, 200)
         ocsp_response = asn1crypto.ocsp.OCSPResponse.load(response.content)
         self.assertEqual(ocsp_response['response_status'].native, 'internal_error')
+
+    def test_responder_cert_serial(self):
+        data = base64.b64encode(req1).decode('utf-8')
+        response = self.client.get(reverse('get-serial', kwargs={'data': data}))
+        self.assertEqual(response.status_code, 200)
+        self.assertOCSP(response, requested=[self.cert], nonce=req1_nonce)
+
+
+@override_settings(ROOT_URLCONF=__name__, CA_OCSP_URLS={
+    'stored': {
+        'ca': certs['root']['serial'],
+        'responder_key': settings.OCSP_KEY_PATH,
+        'responder_cert': settings.OCSP_PEM_PATH,
+        'response_store': stored_config,
+    },
+})
+class OCSPResponseStoreTestCase(OCSPViewTestMixin, DjangoCAWithCertTestCase):
+    def setUp(self):
+        super(OCSPResponseStoreTestCase, self).setUp()
+        self.store = ocsp.get_response_store(stored_config)
+        self.issuer_key_hash = ocsp.get_issuer_key_hash(self.ca)
+        self.serial = self.cert.x509.serial_number
+
+    def tearDown(self):
+        super(OCSPResponseStoreTestCase, self).tearDown()
+        cache.clear()
+
+    def store_responses(self):
+        return ocsp.store_responses(self.ca, self.store, ocsp.get_responder_key(settings.OCSP_KEY_PATH),
+                                    ocsp.get_responder_cert(settings.OCSP_PEM_PATH), expires=600)
+
+    def test_stored(self):
+        self.assertEqual(self.store_responses(), Certificate.objects.filter(ca=self.ca).count())
+        stored = self.store.get(self.issuer_key_hash, self.serial)
+        self.assertIsNotNone(stored)
+
+        with self.assertNumQueries(0):
+            response = self.client.post(reverse('post-stored'), self.ocsp_request([self.cert]),
+                                        content_type='application/ocsp-request')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, stored)
+        self.assertOCSP(response, requested=[self.cert])
+
+    def test_not_stored(self):
+        response = self.client.post(reverse('post-stored'), self.ocsp_request([self.cert]),
+                                    content_type='application/ocsp-request')
+        self.assertEqual(response.status_code, 200)
+        self.assertOCSP(response, requested=[self.cert])
+
+    def test_nonce(self):
+        # requests with a nonce are always signed on the fly
+        self.store_responses()
+        response = self.client.post(reverse('post-stored'), req1, content_type='application/ocsp-request')
+        self.assertEqual(response.status_code, 200)
+        self.assertOCSP(response, requested=[self.cert], nonce=req1_nonce)
+
+    def test_revoke(self):
+        self.store_responses()
+        cert = Certificate.objects.get(pk=self.cert.pk)
+        cert.revoke('key_compromise')
+        self.assertIsNone(self.store.get(self.issuer_key_hash, self.serial))
+
+        response = self.client.post(reverse('post-stored'), self.ocsp_request([self.cert]),
+                                    content_type='application/ocsp-request')
+        self.assertEqual(response.status_code, 200)
+        self.assertOCSP(response, requested=[self.cert])
+
+        # revoked response is stored again
+        self.store_responses()
+        self.assertIsNotNone(self.store.get(self.issuer_key_hash, self.serial))
+        self.assertOCSP(response, requested=[self.cert])
+
+    def test_get_etag(self):
+        self.store_responses()
+        data = base64.b64encode(self.ocsp_request([self.cert])).decode('utf-8')
+        response = self.client.get(reverse('get-stored', kwargs={'data': data}))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, self.store.get(self.issuer_key_hash, self.serial))
+        etag = response['ETag']
+
+        response = self.client.get(reverse('get-stored', kwargs={'data': data}), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+        # Revoking the certificate changes the response
+        cert = Certificate.objects.get(pk=self.cert.pk)
+        cert.revoke('key_compromise')
+        response = self.client.get(reverse('get-stored', kwargs={'data': data}), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_revoke_own_urlconf(self):
+        # stores passed to as_view() in your own URL configuration are also invalidated
+        path = tempfile.mkdtemp()
+        try:
+            config = {'BACKEND': 'django_ca.ocsp.FileSystemResponseStore', 'OPTIONS': {'path': path}}
+            OCSPView.as_view(ca=self.ca.serial, responder_key=settings.OCSP_KEY_PATH,
+                             responder_cert=settings.OCSP_PEM_PATH, response_store=config)
+            store = ocsp.get_response_store(config)
+            store.set(self.issuer_key_hash, self.serial, b'foo', 600)
+
+            with self.settings(CA_OCSP_URLS={}):
+                Certificate.objects.get(pk=self.cert.pk).revoke('key_compromise')
+            self.assertIsNone(store.get(self.issuer_key_hash, self.serial))
+        finally:
+            ocsp._response_stores.pop(json.dumps(config, sort_keys=True))
+            shutil.rmtree(path)
+
+    def test_url_configuration_loaded(self):
+        # the URL configuration is loaded so that all views registered their store
+        with patch('django_ca.ocsp.get_resolver') as resolver:
+            stores = ocsp.get_response_stores()
+        resolver.assert_called_once_with()
+        self.assertTrue([s for s in stores if isinstance(s, ocsp.CacheResponseStore)])
+
+        # errors loading the URL configuration are logged, configured stores are still returned
+        with patch('django_ca.ocsp.get_resolver', side_effect=Exception('foo')), \
+                patch('django_ca.ocsp.log') as log:
+            self.assertTrue(ocsp.get_response_stores())
+        self.assertEqual(log.exception.call_count, 1)
+
+    def test_not_shared_cache(self):
+        ocsp._warned_cache_aliases.clear()
+        with patch('django_ca.ocsp.log') as log:
+            ocsp.CacheResponseStore()
+            ocsp.CacheResponseStore(alias='default')
+        log.warning.assert_called_once_with(
+            '%s: Cache is not shared between processes, stored OCSP responses may not be removed when a '
+            'certificate is revoked.', 'default')
+
+    def test_filesystem_store(self):
+        path = tempfile.mkdtemp()
+        try:
+            store = ocsp.FileSystemResponseStore(path=path)
+            self.assertIsNone(store.get(self.issuer_key_hash, self.serial))
+            store.set(self.issuer_key_hash, self.serial, b'foo', 600)
+            self.assertEqual(store.get(self.issuer_key_hash, self.serial), b'foo')
+
+            # expired responses are not returned
+            store.set(self.issuer_key_hash, self.serial, b'foo', -1)
+            self.assertIsNone(store.get(self.issuer_key_hash, self.serial))
+
+            store.delete(self.issuer_key_hash, self.serial)
+            self.assertEqual(os.listdir(path), [])
+            store.delete(self.issuer_key_hash, self.serial)  # no error if file does not exist
+        finally:
+            shutil.rmtree(path)
+
+
+class OCSPCacheTestCase(DjangoCAWithCertTestCase):
+    def setUp(self):
+        super(OCSPCacheTestCase, self).setUp()
+        ocsp.clear_caches()
+        self.tmpdir = tempfile.mkdtemp()
+        self.key_path = os.path.join(self.tmpdir, 'ocsp.key')
+        self.pem_path = os.path.join(self.tmpdir, 'ocsp.pem')
+        shutil.copy(settings.OCSP_KEY_PATH, self.key_path)
+        shutil.copy(settings.OCSP_PEM_PATH, self.pem_path)
+
+    def tearDown(self):
+        super(OCSPCacheTestCase, self).tearDown()
+        ocsp.clear_caches()
+        shutil.rmtree(self.tmpdir)
+
+    def touch(self, path):
+        mtime = os.path.getmtime(path) + 10
+        os.utime(path, (time.time(), mtime))
+
+    def test_responder_key(self):
+        with patch('django_ca.ocsp.load_private_key', side_effect=asymmetric.load_private_key) as load:
+            key = ocsp.get_responder_key(self.key_path)
+            self.assertIs(ocsp.get_responder_key(self.key_path), key)
+            self.assertEqual(load.call_count, 1)
+
+            # modifying the file loads the key again
+            self.touch(self.key_path)
+            self.assertIsNot(ocsp.get_responder_key(self.key_path), key)
+            self.assertEqual(load.call_count, 2)
+
+    def test_responder_cert(self):
+        with patch('django_ca.ocsp.load_certificate', side_effect=asymmetric.load_certificate) as load:
+            cert = ocsp.get_responder_cert(self.pem_path)
+            self.assertIs(ocsp.get_responder_cert(self.pem_path), cert)
+            self.assertEqual(load.call_count, 1)
+
+            self.touch(self.pem_path)
+            self.assertIsNot(ocsp.get_responder_cert(self.pem_path), cert)
+            self.assertEqual(load.call_count, 2)
+
+    def test_responder_cert_serial(self):
+        ocsp_cert = self.load_cert(ca=self.ca, x509=ocsp_pubkey)
+
+        with patch('django_ca.ocsp.load_certificate', side_effect=asymmetric.load_certificate) as load:
+            cert = ocsp.get_responder_cert(ocsp_cert.serial)
+            self.assertEqual(cert.asn1.dump(), ocsp_pubkey.public_bytes(Encoding.DER))
+            with self.assertNumQueries(0):
+                self.assertIs(ocsp.get_responder_cert(ocsp_cert.serial), cert)
+            self.assertEqual(load.call_count, 1)
+
+            # saving the certificate invalidates the cache
+            ocsp_cert.save()
+            self.assertIsNot(ocsp.get_responder_cert(ocsp_cert.serial), cert)
+            self.assertEqual(load.call_count, 2)
+
+            # serials without colons or in lowercase share the same cache entry
+            cert = ocsp.get_responder_cert(ocsp_cert.serial_hex.lower())
+            with self.assertNumQueries(0):
+                self.assertIs(ocsp.get_responder_cert(ocsp_cert.serial), cert)
+            ocsp_cert.save()
+            self.assertIsNot(ocsp.get_responder_cert(ocsp_cert.serial_hex.lower()), cert)
+            self.assertEqual(load.call_count, 3)
+
+    def test_ca(self):
+        ca = ocsp.get_ca(self.ca.serial)
+        self.assertEqual(ca, self.ca)
+        with self.assertNumQueries(0):
+            self.assertIs(ocsp.get_ca(self.ca.serial), ca)
+
+        # CAs are also found by common name
+        self.assertEqual(ocsp.get_ca(self.ca.cn), self.ca)
+
+        # saving any CA invalidates the cache
+        self.ca.save()
+        with self.assertNumQueries(1):
+            self.assertIsNot(ocsp.get_ca(self.ca.serial), ca)
+
+        # changes made by other processes are seen once the cached CA expires
+        ca = ocsp.get_ca(self.ca.serial)
+        CertificateAuthority.objects.filter(pk=self.ca.pk).update(enabled=False)
+        self.assertTrue(ocsp.get_ca(self.ca.serial).enabled)
+        with patch('django_ca.ocsp.time.time', return_value=time.time() + 60):
+            self.assertFalse(ocsp.get_ca(self.ca.serial).enabled)
+
+        with self.assertRaises(CertificateAuthority.DoesNotExist):
+            ocsp.get_ca('unknown')
+
+    def test_cert_statuses(self):
+        cert2 = self.load_cert(ca=self.ca, x509=cert2_pubkey)
+        cert2.revoke('key_compromise')
+        cert3 = self.load_cert(ca=self.ca, x509=cert3_pubkey)
+        cert3.revoke()
+        serials = [self.cert.serial_hex, cert2.serial_hex, cert3.serial_hex, 'ABC']
+
+        with self.assertNumQueries(1):
+            statuses = ocsp.get_cert_statuses(self.ca, serials)
+        self.assertEqual(statuses, {
+            self.cert.serial_hex: ('good', None),
+            cert2.serial_hex: ('key_compromise', cert2.revoked_date),
+            cert3.serial_hex: ('revoked', cert3.revoked_date),
+        })
+
+        # certificates are not child CAs
+        self.assertEqual(ocsp.get_cert_statuses(self.ca, serials, ca_ocsp=True), {})
+
+    def test_ca_cert(self):
+        with patch('django_ca.ocsp.load_certificate', side_effect=asymmetric.load_certificate) as load:
+            cert = ocsp.get_ca_cert(self.ca)
+            self.assertIs(ocsp.get_ca_cert(self.ca), cert)
+            self.assertEqual(load.call_count, 1)
+
+            self.ca.save()
+            self.assertIsNot(ocsp.get_ca_cert(self.ca), cert)
+            self.assertEqual(load.call_count, 2)
+
+
+class ResponderKeyTypeTestCase(DjangoCAWithCertTestCase):
+    def setUp(self):
+        super(ResponderKeyTypeTestCase, self).setUp()
+        ocsp.clear_caches()
+        self.tmpdir = tempfile.mkdtemp()
+        self.key_path = os.path.join(self.tmpdir, 'ocsp.key')
+
+    def tearDown(self):
+        super(ResponderKeyTypeTestCase, self).tearDown()
+        ocsp.clear_caches()
+        shutil.rmtree(self.tmpdir)
+
+    def write_key(self, key):
+        with open(self.key_path, 'wb') as stream:
+            stream.write(key.private_bytes(Encoding.PEM, PrivateFormat.PKCS8, NoEncryption()))
+
+    def test_ec(self):
+        key = generate_private_key(None, 'ECC', ec.SECP256R1())
+        self.write_key(key)
+        subject = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, 'ocsp.example.com')])
+        now = datetime.utcnow()
+        cert = x509.CertificateBuilder().subject_name(subject).issuer_name(subject).public_key(
+            key.public_key()).serial_number(1).not_valid_before(now).not_valid_after(
+            now + timedelta(days=1)).sign(key, hashes.SHA256(), default_backend())
+
+        responder_key = ocsp.get_responder_key(self.key_path)
+        responder_cert = asymmetric.load_certificate(cert.public_bytes(Encoding.DER))
+        response = ocsp.build_response([(self.cert.x509.serial_number, 'good', None)],
+                                       ca_cert=ocsp.get_ca_cert(self.ca), responder_key=responder_key,
+                                       responder_cert=responder_cert, expires=600)
+
+        basic = response['response_bytes']['response'].parsed
+        self.assertEqual(basic['signature_algorithm']['algorithm'].native, 'sha256_ecdsa')
+        asymmetric.ecdsa_verify(responder_cert.public_key, basic['signature'].native,
+                                basic['tbs_response_data'].dump(), 'sha256')
+
+    @unittest.skipUnless('Ed25519' in KEY_TYPES, 'Ed25519 requires cryptography>=2.8.')
+    def test_ed25519(self):
+        self.write_key(generate_private_key(None, 'Ed25519'))
+        msg = r'^OCSP responder keys must be RSA, DSA or elliptic curve keys: '
+        with self.assertRaisesRegex(ValueError, msg):
+            ocsp.get_responder_key(self.key_path)
+
+
+class StatusIndexTestCase(DjangoCAWithCertTestCase):
+    def setUp(self):
+        super(StatusIndexTestCase, self).setUp()
+        ocsp.clear_caches()
+
+    def tearDown(self):
+        super(StatusIndexTestCase, self).tearDown()
+        ocsp.clear_caches()
+
+    def test_load(self):
+        cert2 = self.load_cert(ca=self.ca, x509=cert2_pubkey)
+        cert2.revoke('key_compromise')
+        serials = [self.cert.serial_hex, cert2.serial_hex, 'ABC']
+
+        index = ocsp.get_status_index(self.ca)
+        self.assertIs(ocsp.get_status_index(self.ca), index)
+        self.assertIsNone(index.loaded)
+
+        with self.assertNumQueries(1):
+            statuses = index.get_statuses(serials)
+        self.assertEqual(statuses, ocsp.get_cert_statuses(self.ca, serials))
+        self.assertEqual(statuses, {
+            self.cert.serial_hex: ('good', None),
+            cert2.serial_hex: ('key_compromise', cert2.revoked_date),
+        })
+
+        with self.assertNumQueries(0):
+            self.assertEqual(index.get_statuses(serials), statuses)
+
+    def test_signals(self):
+        index = ocsp.get_status_index(self.ca)
+        index.load()
+
+        cert2 = self.load_cert(ca=self.ca, x509=cert2_pubkey)
+        self.assertEqual(index.get_statuses([cert2.serial_hex]), {})  # saving a cert does not add it
+        post_issue_cert.send(sender=Certificate, cert=cert2)
+        self.assertEqual(index.get_statuses([cert2.serial_hex]), {cert2.serial_hex: ('good', None)})
+
+        cert2.revoke()
+        with self.assertNumQueries(0):
+            self.assertEqual(index.get_statuses([cert2.serial_hex]),
+                             {cert2.serial_hex: ('revoked', cert2.revoked_date)})
+
+        cert2.delete()
+        self.assertEqual(index.get_statuses([cert2.serial_hex]), {})
+
+    def test_reconcile(self):
+        index = ocsp.get_status_index(self.ca, timeout=10)
+        index.load()
+
+        # Changes made without signals (e.g. in other processes) are only visible after the timeout
+        Certificate.objects.filter(pk=self.cert.pk).update(revoked=True, revoked_reason='superseded')
+        self.assertEqual(index.get_statuses([self.cert.serial_hex]), {self.cert.serial_hex: ('good', None)})
+
+        index.loaded -= 10
+        statuses = index.get_statuses([self.cert.serial_hex])
+        self.assertEqual(statuses, {self.cert.serial_hex: ('superseded', None)})
+
+    def test_ca_ocsp(self):
+        index = ocsp.get_status_index(self.ca, ca_ocsp=True)
+        child = self.load_ca(name='child', x509=child_pubkey, parent=self.ca)
+        self.assertEqual(index.get_statuses([child.serial_hex, self.cert.serial_hex]),
+                         {child.serial_hex: ('good', None)})
+
+        child.revoke()
+        self.assertEqual(index.get_statuses([child.serial_hex]),
+                         {child.serial_hex: ('revoked', child.revoked_date)})
+
+        # deleting the CA removes its index (load a new instance, so that other tests still have a valid CA)
+        CertificateAuthority.objects.get(pk=self.ca.pk).delete()
+        self.assertNotIn((self.ca.pk, True), ocsp._status_indexes)
+
+    @override_settings(ROOT_URLCONF=__name__)
+    def test_view(self):
+        client = Client()
+        response = client.post(reverse('post-index'), req1, content_type='application/ocsp-request')
+        self.assertEqual(response.status_code, 200)
+
+        # CA and index are now loaded, so no database query is required
+        with self.assertNumQueries(0):
+            response = client.post(reverse('post-index'), req1, content_type='application/ocsp-request')
+        self.assertEqual(response.status_code, 200)
+        ocsp_response = asn1crypto.ocsp.OCSPResponse.load(response.content)
+        self.assertEqual(ocsp_response['response_status'].native, 'successful')
@@ -25,8 +25,11 @@ urlpatterns = []
 
 if ca_settings.CA_PROVIDE_GENERIC_CRL is True:  # pragma: no branch
     urlpatterns.append(
-        url(r'^crl/(?P<serial>[0-9A-F:]+)/$', views.CertificateRevocationListView.as_view(),
+        url(r'^crl/(?P<serial>[0-9A-F:]+)/$', views.CertificateRevocationListView.as_view(base=True),
             name='crl'))
+    urlpatterns.append(
+        url(r'^crl/delta/(?P<serial>[0-9A-F:]+)/$', views.CertificateRevocationListView.as_view(delta=True),
+            name='crl-delta'))
     urlpatterns.append(
         url(r'^crl/ca/(?P<serial>[0-9A-F:]+)/$', views.CertificateRevocationListView.as_view(ca_crl=True),
             name='ca-crl'))
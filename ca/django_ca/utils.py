@@ -15,7 +15,9 @@
 
 """Central functions to load CA key and cert as PKey/X509 objects."""
 
+import os
 import re
+import tempfile
 from collections import Iterable
 from collections import OrderedDict
 from copy import deepcopy
@@ -232,6 +234,51 @@ def int_to_hex(i):
     return add_colons(s)
 
 
+def hex_to_int(s):
+    """Get the integer value of a serial as created by :py:func:`int_to_hex`.
+
+    >>> hex_to_int('BC:61:4E')
+    12345678
+    """
+    return int(s.replace(':', ''), 16)
+
+
+def write_file(path, data, mode=0o644):
+    """Atomically write ``data`` to ``path``, creating parent directories if necessary.
+
+    The data is first written to a temporary file in the same directory that is then renamed, so readers
+    (e.g. a webserver) never see a partially written file.
+    """
+    dirname = os.path.dirname(os.path.abspath(path))
+    if not os.path.exists(dirname):
+        os.makedirs(dirname)
+
+    fd, tmp_path = tempfile.mkstemp(dir=dirname)
+    try:
+        with os.fdopen(fd, 'wb') as stream:
+            stream.write(data)
+        os.chmod(tmp_path, mode)
+        os.rename(tmp_path, path)
+    except Exception:
+        os.remove(tmp_path)
+        raise
+
+
+def normalize_serial(serial):
+    """Get the normalized form of a serial, as stored in the ``serial_hex`` field of certificates.
+
+    ``serial`` may either be an ``int`` or a serial as created by :py:func:`int_to_hex`.
+
+    >>> normalize_serial(12345678)
+    'BC614E'
+    >>> normalize_serial('BC:61:4E')
+    'BC614E'
+    """
+    if isinstance(serial, six.integer_types):
+        return '%X' % serial
+    return serial.replace(':', '').upper()
+
+
 def parse_name(name):
     """Parses a subject string as used in OpenSSLs command line utilities.
 
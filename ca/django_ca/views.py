@@ -14,36 +14,47 @@
 # <http://www.gnu.org/licenses/>.
 
 import base64
+import calendar
+import hashlib
 import logging
-import os
-from datetime import datetime
-from datetime import timedelta
+import time
 
 import asn1crypto
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.serialization import Encoding
 from ocspbuilder import OCSPResponseBuilder
-from oscrypto.asymmetric import load_certificate
-from oscrypto.asymmetric import load_private_key
 
-from django.core.cache import cache
 from django.core.exceptions import PermissionDenied
+from django.http import Http404
 from django.http import HttpResponse
 from django.http import HttpResponseServerError
 from django.urls import reverse
+from django.utils.cache import get_conditional_response
 from django.utils.decorators import method_decorator
-from django.utils.encoding import force_bytes
 from django.utils.encoding import force_text
+from django.utils.http import http_date
+from django.utils.http import quote_etag
 from django.views.decorators.csrf import csrf_exempt
 from django.views.generic.base import View
 from django.views.generic.detail import SingleObjectMixin
 from django.views.generic.edit import UpdateView
 
+from .crl import get_cached_crl
 from .crl import get_crl
+from .crl import get_crl_cache_key
 from .forms import RevokeCertificateForm
 from .models import Certificate
 from .models import CertificateAuthority
-from .utils import int_to_hex
+from .ocsp import build_response
+from .ocsp import get_ca
+from .ocsp import get_ca_cert
+from .ocsp import get_cert_statuses
+from .ocsp import get_responder_cert
+from .ocsp import get_responder_key
+from .ocsp import get_response_store
+from .ocsp import get_status_index
+from .ocsp import register_response_store
+from .utils import normalize_serial
 
 log = logging.getLogger(__name__)
 
@@ -53,7 +64,7 @@ class CertificateRevocationListView(View, SingleObjectMixin):
 
     slug_field = 'serial'
     slug_url_kwarg = 'serial'
-    queryset = CertificateAuthority.objects.all().prefetch_related('certificate_set')
+    queryset = CertificateAuthority.objects.all()
 
     password = None
     """Password used to load the private key of the certificate authority. If not set, the private key is
@@ -66,27 +77,33 @@ class CertificateRevocationListView(View, SingleObjectMixin):
     ca_crl = False
     """If set to ``True``, return a CRL for child CAs instead."""
 
+    delta = False
+    """If set to ``True``, return a delta CRL that only lists certificates revoked since the base CRL."""
+
+    base = False
+    """If set to ``True``, CRLs returned by this view become the base CRL that delta CRLs refer to. Set this
+    only for the view that serves the complete CRL to clients that also use delta CRLs."""
+
     expires = 600
     """CRL expires in this many seconds."""
 
     digest = hashes.SHA512()
     """Digest used for generating the CRL."""
 
+    lock_timeout = 10
+    """Only one process generates a CRL at a time. Other processes serve the previous CRL in the meantime or
+    wait up to this many seconds for the new CRL. CRLs are regenerated this many seconds before they
+    expire."""
+
     # header used in the request
     content_type = None
     """Value of the Content-Type header used in the response. For CRLs in PEM format, use ``text/plain``."""
 
     def get(self, request, serial):
-        cache_key = 'crl_%s_%s_%s' % (serial, self.type, self.digest.name)
-        if self.ca_crl is True:
-            cache_key += '_ca'
+        cache_key = get_crl_cache_key(serial, self.type, self.digest, ca_crl=self.ca_crl, delta=self.delta)
 
-        crl = cache.get(cache_key)
-        if crl is None:
-            ca = self.get_object()
-            crl = get_crl(ca, encoding=self.type, expires=self.expires, algorithm=self.digest,
-                          password=self.password, ca_crl=self.ca_crl)
-            cache.set(cache_key, crl, self.expires)
+        crl = get_cached_crl(cache_key, self.generate_crl, expires=self.expires,
+                             lock_timeout=self.lock_timeout)
 
         content_type = self.content_type
         if content_type is None:
@@ -100,6 +117,16 @@ class CertificateRevocationListView(View, SingleObjectMixin):
 
         return HttpResponse(crl, content_type=content_type)
 
+    def generate_crl(self):
+        ca = self.get_object()
+
+        # A delta CRL always refers to a base CRL, which is issued by the view serving the complete CRL
+        if self.delta is True and ca.base_crl_number is None:
+            raise Http404('%s: No base CRL was issued yet.' % ca.serial)
+
+        return get_crl(ca, encoding=self.type, expires=self.expires, algorithm=self.digest,
+                       password=self.password, ca_crl=self.ca_crl, delta=self.delta, base=self.base)
+
 
 class RevokeCertificateView(UpdateView):
     admin_site = None
@@ -154,12 +181,32 @@ class OCSPView(View):
     ca_ocsp = False
     """If set to ``True``, validate child CAs instead."""
 
+    response_store = None
+    """Configuration for a store of pre-generated responses, see :ref:`ocsp-response-store`. If set, responses
+    to requests without a nonce are served from the store if available."""
+
+    status_index = False
+    """If set to ``True``, look up the status of certificates in a per-process in-memory index instead of the
+    database, see :ref:`ocsp-status-index`."""
+
+    status_index_timeout = 60
+    """Time in seconds after which the in-memory index is reloaded from the database."""
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # register the store, so that stored responses are removed when a certificate is revoked
+        response_store = initkwargs.get('response_store', cls.response_store)
+        if response_store:
+            register_response_store(response_store)
+        return super(OCSPView, cls).as_view(**initkwargs)
+
     @method_decorator(csrf_exempt)
     def dispatch(self, *args, **kwargs):
         return super(OCSPView, self).dispatch(*args, **kwargs)
 
     def get(self, request, data):
-        return self.process_ocsp_request(base64.b64decode(data))
+        response = self.process_ocsp_request(base64.b64decode(data))
+        return self.add_cache_headers(request, response)
 
     def post(self, request):
         return self.process_ocsp_request(request.body)
@@ -171,31 +218,105 @@ class OCSPView(View):
     def process_ocsp_request(self, data):
         status = 200
         try:
-            response = self.get_ocsp_response(data)
+            response = self.get_stored_response(data)
+            if response is None:
+                response = self.get_ocsp_response(data).dump()
         except Exception as e:  # pragma: no cover
             # all exceptions in the function should be covered.
             log.exception(e)
-            response = self.fail(u'internal_error')
+            response = self.fail(u'internal_error').dump()
             status = 500
 
-        return HttpResponse(response.dump(), status=status,
-                            content_type='application/ocsp-response')
+        return HttpResponse(response, status=status, content_type='application/ocsp-response')
 
-    def get_responder_key(self):
-        with open(self.responder_key, 'rb') as stream:
-            responder_key = stream.read()
+    def add_cache_headers(self, request, response):
+        """Add HTTP caching headers as described in RFC 5019, section 6.2.
+
+        Headers are only added to successful responses without a nonce, as only those can be served to
+        multiple clients. Conditional requests (``If-None-Match``/``If-Modified-Since``) are answered with
+        ``304 Not Modified`` if the response did not change.
+        """
+        if response.status_code != 200:
+            return response
+
+        try:
+            ocsp_response = asn1crypto.ocsp.OCSPResponse.load(response.content)
+            if ocsp_response['response_status'].native != 'successful':
+                return response
+
+            tbs_response = ocsp_response.basic_ocsp_response['tbs_response_data']
+            for extension in tbs_response['response_extensions']:
+                if extension['extn_id'].native == 'nonce':
+                    return response
+
+            produced_at = tbs_response['produced_at'].native
+            next_updates = [r['next_update'].native for r in tbs_response['responses']]
+        except Exception as e:  # pragma: no cover
+            log.exception('Error parsing OCSP response: %s', e)
+            return response
+
+        if None in next_updates:  # pragma: no cover - we always set nextUpdate
+            return response
+        next_update = min(next_updates)
+
+        last_modified = calendar.timegm(produced_at.utctimetuple())
+        expires = calendar.timegm(next_update.utctimetuple())
+        max_age = max(0, int(expires - time.time()))
+
+        response['ETag'] = quote_etag(hashlib.sha1(response.content).hexdigest())
+        response['Last-Modified'] = http_date(last_modified)
+        response['Expires'] = http_date(expires)
+        response['Cache-Control'] = 'max-age=%s, public, no-transform, must-revalidate' % max_age
 
-        # try to load responder key and cert with oscrypto, to make sure they are actually usable
-        return load_private_key(responder_key)
+        return get_conditional_response(request, etag=response['ETag'], last_modified=last_modified,
+                                        response=response)
+
+    def get_stored_response(self, data):
+        """Get a pre-generated response from the response store, if configured.
+
+        Only requests for a single certificate without a nonce can be answered with a stored response.
+        Returns ``None`` if no response could be found.
+        """
+        if not self.response_store or self.ca_ocsp is True:
+            return None
+
+        try:
+            tbs_request = asn1crypto.ocsp.OCSPRequest.load(data)['tbs_request']
+            request_list = tbs_request['request_list']
+            if len(request_list) != 1:
+                return None
+
+            for extension in tbs_request['request_extensions']:
+                if extension['extn_id'].native == 'nonce':
+                    return None
+
+            req_cert = request_list[0]['req_cert']
+            if req_cert['hash_algorithm']['algorithm'].native != 'sha1':
+                return None  # stored responses use sha1 (just like OCSPResponseBuilder)
+
+            store = get_response_store(self.response_store)
+            return store.get(req_cert['issuer_key_hash'].native, req_cert['serial_number'].native)
+        except Exception as e:
+            log.exception('Error reading stored OCSP response: %s', e)
+            return None
+
+    def get_responder_key(self):
+        # key is cached per process until the file is modified
+        return get_responder_key(self.responder_key)
 
     def get_responder_cert(self):
-        if os.path.exists(self.responder_cert):
-            with open(self.responder_cert, 'rb') as stream:
-                responder_cert = stream.read()
-        else:
-            responder_cert = Certificate.objects.get(serial=self.responder_cert)
+        # cert is cached per process until the file (or the certificate in the database) is modified
+        return get_responder_cert(self.responder_cert)
+
+    def get_ca(self):
+        # CA is cached per process until a CA is modified
+        return get_ca(self.ca)
 
-        return load_certificate(responder_cert)
+    def get_cert_statuses(self, ca, serials):
+        if self.status_index is True:
+            index = get_status_index(ca, ca_ocsp=self.ca_ocsp, timeout=self.status_index_timeout)
+            return index.get_statuses(serials)
+        return get_cert_statuses(ca, serials, ca_ocsp=self.ca_ocsp)
 
     def get_ocsp_response(self, data):
         try:
@@ -203,39 +324,30 @@ class OCSPView(View):
 
             tbs_request = ocsp_request['tbs_request']
             request_list = tbs_request['request_list']
-            if len(request_list) != 1:
-                log.error('Received OCSP request with multiple sub requests')
-                raise NotImplemented('Combined requests not yet supported')
-            single_request = request_list[0]  # TODO: Support more than one request
-            req_cert = single_request['req_cert']
-            serial = int_to_hex(req_cert['serial_number'].native)
+            if len(request_list) < 1:
+                raise ValueError('Received OCSP request without any sub requests')
+            serials = [req['req_cert']['serial_number'].native for req in request_list]
         except Exception as e:
             log.exception('Error parsing OCSP request: %s', e)
             return self.fail(u'malformed_request')
 
-        # Get CA and certificate
+        # Get CA (cached per process) and the status of all requested certificates with a single query
         try:
-            ca = CertificateAuthority.objects.get_by_serial_or_cn(self.ca)
+            ca = self.get_ca()
         except CertificateAuthority.DoesNotExist:
-            log.error('%s: Certificate Authority could not be found.')
+            log.error('%s: Certificate Authority could not be found.', self.ca)
             return self.fail(u'internal_error')
 
-        if self.ca_ocsp is True:
-            try:
-                cert = CertificateAuthority.objects.filter(parent=ca).get(serial=serial)
-            except CertificateAuthority.DoesNotExist:
-                log.warn('OCSP request for unknown CA received.')
-                return self.fail(u'internal_error')
-        else:
-            try:
-                cert = Certificate.objects.filter(ca=ca).get(serial=serial)
-            except Certificate.DoesNotExist:
-                log.warn('OCSP request for unknown cert received.')
-                return self.fail(u'internal_error')
+        hex_serials = {serial: normalize_serial(serial) for serial in serials}
+        cert_statuses = self.get_cert_statuses(ca, set(hex_serials.values()))
+
+        if not cert_statuses:
+            log.warn('OCSP request for unknown cert received.')
+            return self.fail(u'internal_error')
 
         # load ca cert and responder key/cert
         try:
-            ca_cert = load_certificate(force_bytes(ca.pub))
+            ca_cert = get_ca_cert(ca)
         except Exception:
             log.error('Could not load CA certificate.')
             return self.fail(u'internal_error')
@@ -247,12 +359,7 @@ class OCSPView(View):
             log.error('Could not read responder key/cert.')
             return self.fail(u'internal_error')
 
-        builder = OCSPResponseBuilder(
-            response_status=u'successful',  # ResponseStatus.successful.value,
-            certificate=load_certificate(force_bytes(cert.pub)),
-            certificate_status=force_text(cert.ocsp_status),
-            revocation_date=cert.revoked_date,
-        )
+        nonce = None
 
         # Parse extensions
         for extension in tbs_request['request_extensions']:
@@ -265,7 +372,7 @@ class OCSPView(View):
 
             # Handle nonce extension
             if extn_id == 'nonce':
-                builder.nonce = value.native
+                nonce = value.native
 
             # That's all we know
             else:  # pragma: no cover
@@ -277,12 +384,17 @@ class OCSPView(View):
             if unknown is True and critical is True:  # pragma: no cover
                 log.warning('Could not parse unknown critical extension: %r',
                             dict(extension.native))
-                return self._fail('internal_error')
+                return self.fail(u'internal_error')
 
             # If it's an unknown non-critical extension, we can safely ignore it.
             elif unknown is True:  # pragma: no cover
                 log.info('Ignored unknown non-critical extension: %r', dict(extension.native))
 
-        builder.certificate_issuer = ca_cert
-        builder.next_update = datetime.utcnow() + timedelta(seconds=self.expires)
-        return builder.build(responder_key, responder_cert)
+        # Certificates that are not found get an "unknown" response (RFC 6960, section 2.2)
+        statuses = []
+        for serial in serials:
+            status, revoked_date = cert_statuses.get(hex_serials[serial], ('unknown', None))
+            statuses.append((serial, force_text(status), revoked_date))
+
+        return build_response(statuses, ca_cert=ca_cert, responder_key=responder_key,
+                              responder_cert=responder_cert, expires=self.expires, nonce=nonce)